@@ -0,0 +1,8 @@
+from . import broadcast, dispatch, protocol, transfer
+
+SUITES = [
+    ('protocol', protocol),
+    ('dispatch', dispatch),
+    ('broadcast', broadcast),
+    ('transfer', transfer),
+]
\ No newline at end of file
@@ -0,0 +1,57 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import SUITES
+from benchmarks.harness import Harness, compare, default_baseline_path, load, save
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Server hot path benchmarks")
+    parser.add_argument("-k", "--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="fewer, shorter repeats")
+    parser.add_argument("--save", nargs="?", const=default_baseline_path(), metavar="PATH",
+                        help="store the results as a baseline (default: baselines/<hostname>.json)")
+    parser.add_argument("--compare", nargs="?", const=default_baseline_path(), metavar="BASELINE",
+                        help="compare against a baseline and exit 1 on regressions")
+    parser.add_argument("--against", metavar="RESULTS",
+                        help="with --compare, use these saved results instead of running")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown that counts as a regression (default 0.10)")
+    args = parser.parse_args()
+
+    if args.against:
+        if not args.compare:
+            parser.error("--against needs --compare")
+        current = load(args.against)
+    else:
+        harness = Harness(
+            repeats=3 if args.quick else 5,
+            min_time=0.02 if args.quick else 0.1,
+            pattern=args.filter
+        )
+        for name, suite in SUITES:
+            print(name)
+            suite.run(harness)
+        current = harness.to_json()
+
+        if args.save:
+            save(args.save, current)
+            print(f"Saved {len(current['results'])} results to {args.save}")
+
+    if args.compare:
+        baseline = load(args.compare)
+        if args.filter:
+            baseline['results'] = {name: result for name, result in baseline['results'].items() if args.filter in name}
+        print()
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
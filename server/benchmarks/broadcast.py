@@ -0,0 +1,42 @@
+from core.codec import encode_message
+from core.models import MessageType
+from .fixtures import OfflineServer
+
+DEVICE_COUNTS = (10, 100, 1000)
+
+
+def run(harness):
+    for count in DEVICE_COUNTS:
+        name = f"broadcast.round_trip.{count}"
+        if not harness.wants(name) and not harness.wants(f"broadcast.send.{count}"):
+            continue
+
+        bench = OfflineServer(device_count=count)
+        try:
+            _run(harness, bench, count)
+        finally:
+            bench.close()
+
+
+def _run(harness, bench: OfflineServer, count: int):
+    server = bench.server
+    devices = bench.devices
+
+    def send():
+        server.broadcast_command(MessageType.LAUNCH_APP, "com.combatica.arena")
+        bench.run_pending()
+        server.broadcaster._in_flight.clear()
+
+    def round_trip():
+        # Send, fan out, flush, then every device answers with the echoed request ID
+        broadcast = server.broadcast_command(MessageType.LAUNCH_APP, "com.combatica.arena")
+        bench.run_pending()
+        response = memoryview(bytes(encode_message(
+            MessageType.COMMAND_RESPONSE, True, "Launched", request_id=broadcast.request_id
+        )))
+        for device in devices:
+            server._process_message(device, response)
+        assert broadcast.done()
+
+    harness.time(f"broadcast.send.{count}", send)
+    harness.time(f"broadcast.round_trip.{count}", round_trip)
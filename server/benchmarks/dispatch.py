@@ -0,0 +1,56 @@
+import uuid
+
+from core.codec import encode_message
+from core.models import MessageType
+from utils.event_bus import Dispatcher, EventBus, EventType
+from .fixtures import OfflineServer
+
+SUBSCRIBER_COUNTS = (1, 10, 100)
+
+
+def run(harness):
+    _process_message(harness)
+    _event_bus(harness)
+
+
+def _process_message(harness):
+    bench = OfflineServer(device_count=1)
+    device = bench.devices[0]
+    operation_id = uuid.uuid4().bytes
+    messages = {
+        MessageType.DEVICE_CONNECTED: ("Quest 3", device.get_id()),
+        MessageType.HEARTBEAT: (),
+        MessageType.BATTERY_STATUS: (87, False),
+        MessageType.COMMAND_RESPONSE: (True, "OK"),
+        MessageType.VOLUME_STATUS: (50, 7, 15),
+        MessageType.ERROR: ("Something went wrong",),
+        MessageType.APK_DOWNLOAD_PROGRESS: (operation_id, 1, 42.5),
+    }
+    try:
+        for message_type, values in messages.items():
+            frame = memoryview(bytes(encode_message(message_type, *values)))
+            harness.time(
+                f"server.process_message.{message_type.name.lower()}",
+                lambda: bench.server._process_message(device, frame)
+            )
+    finally:
+        bench.close()
+
+
+def _event_bus(harness):
+    for count in SUBSCRIBER_COUNTS:
+        bus = EventBus()
+        dispatcher = Dispatcher()
+        for _ in range(count):
+            bus.subscribe(EventType.DEVICE_UPDATED, lambda data: None, dispatcher)
+            bus.subscribe(EventType.COMMAND_EXECUTED, lambda data: None, dispatcher)
+
+        device = object()
+        harness.time(f"event_bus.emit.coalesced.{count}", lambda: bus.emit(EventType.DEVICE_UPDATED, device))
+        dispatcher.drain()
+
+        def emit_and_drain():
+            bus.emit(EventType.COMMAND_EXECUTED, device)
+            dispatcher.drain()
+
+        harness.time(f"event_bus.emit_drain.{count}", emit_and_drain)
@@ -0,0 +1,73 @@
+import asyncio
+import tempfile
+
+from core.battery_poller import BatteryPoller
+from core.codec import encode_message
+from core.device import QuestDevice
+from core.liveness import LivenessMonitor
+from core.models import MessageType
+from core.server import QuestControlServer
+
+
+class NullTransport:
+    """Stands in for a socket: accepts writes and counts the bytes."""
+
+    def __init__(self):
+        self.bytes_written = 0
+        self.closing = False
+
+    def write(self, data):
+        self.bytes_written += len(data)
+
+    def writelines(self, buffers):
+        for data in buffers:
+            self.bytes_written += len(data)
+
+    def is_closing(self) -> bool:
+        return self.closing
+
+    def abort(self):
+        self.closing = True
+
+    def get_extra_info(self, name, default=None):
+        return default
+
+    def set_write_buffer_limits(self, high=None, low=None):
+        pass
+
+
+class OfflineServer:
+    """A QuestControlServer wired to a loop it never serves on.
+
+    The loop is stepped by hand with run_pending(), so benchmarks measure
+    the server's own code without sockets or thread hand-offs.
+    """
+
+    def __init__(self, device_count: int = 0):
+        self.apk_directory = tempfile.TemporaryDirectory(prefix="bench-apks-")
+        self.server = QuestControlServer(host='127.0.0.1', port=0, apk_directory=self.apk_directory.name)
+        self.loop = asyncio.new_event_loop()
+        server = self.server
+        server.loop = self.loop
+        server.broadcaster.bind(self.loop)
+        server.liveness = LivenessMonitor(self.loop)
+        server.battery_poller = BatteryPoller(self.loop)
+        server.running = True
+        self.devices = [self.connect(f"BENCH{index:05d}") for index in range(device_count)]
+
+    def connect(self, serial: str) -> QuestDevice:
+        device = QuestDevice(NullTransport(), ('127.0.0.1', 0), self.loop)
+        self.server._connections.add(device)
+        self.server._process_message(device, memoryview(encode_message(MessageType.DEVICE_CONNECTED, "Quest 3", serial)))
+        return device
+
+    def run_pending(self, rounds: int = 2):
+        # Each round runs the callbacks that were ready when it started
+        for _ in range(rounds):
+            self.loop.call_soon(self.loop.stop)
+            self.loop.run_forever()
+
+    def close(self):
+        self.server.battery_poller.stop()
+        self.loop.close()
+        self.apk_directory.cleanup()
@@ -0,0 +1,137 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+class Harness:
+    """Times benchmark bodies and collects the results for one run.
+
+    time() calibrates the loop count so one repeat takes at least
+    min_time, runs `repeats` repeats and keeps the median per-operation
+    cost. record() is for benchmarks that measure themselves, like
+    transfer rates.
+    """
+
+    def __init__(self, repeats: int = 5, min_time: float = 0.1, pattern: Optional[str] = None):
+        self.repeats = repeats
+        self.min_time = min_time
+        self.pattern = pattern
+        self.results: Dict[str, dict] = {}
+
+    def wants(self, name: str) -> bool:
+        return not self.pattern or self.pattern in name
+
+    def time(self, name: str, func: Callable[[], object], ops_per_call: int = 1):
+        if not self.wants(name):
+            return
+
+        number = 1
+        while True:
+            elapsed = self._run(func, number)
+            if elapsed >= self.min_time or number >= 1 << 24:
+                break
+            number *= max(2, min(10, int(self.min_time / max(elapsed, 1e-9)) + 1))
+
+        samples = [elapsed] + [self._run(func, number) for _ in range(self.repeats - 1)]
+        ops = number * ops_per_call
+        self.record(name, statistics.median(samples) * 1e9 / ops, "ns/op", best=min(samples) * 1e9 / ops)
+
+    @staticmethod
+    def _run(func: Callable[[], object], number: int) -> float:
+        loop = range(number)
+        start = time.perf_counter()
+        for _ in loop:
+            func()
+        return time.perf_counter() - start
+
+    def record(self, name: str, value: float, unit: str, higher_is_better: bool = False, best: Optional[float] = None):
+        result = {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+        if best is not None:
+            result['best'] = best
+        self.results[name] = result
+        print(f"  {name:<48} {_format(value, unit):>14}")
+
+    def to_json(self) -> dict:
+        return {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'commit': _git_commit(),
+            'results': self.results
+        }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _format(value: float, unit: str) -> str:
+    if unit == "ns/op":
+        if value >= 1e6:
+            return f"{value / 1e6:.2f} ms/op"
+        if value >= 1e3:
+            return f"{value / 1e3:.2f} us/op"
+        return f"{value:.0f} ns/op"
+    return f"{value:.1f} {unit}"
+
+
+def save(path: str, data: dict):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def load(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Print a comparison table and return the names that regressed by more than threshold."""
+    regressions = []
+    base_results = baseline['results']
+    current_results = current['results']
+
+    print(f"Baseline: {baseline.get('created')} ({baseline.get('commit') or 'unknown commit'}, {baseline.get('platform')})")
+    print(f"Current:  {current.get('created')} ({current.get('commit') or 'unknown commit'}, {current.get('platform')})")
+    print(f"  {'benchmark':<48} {'baseline':>14} {'current':>14} {'change':>9}")
+
+    for name in sorted(set(base_results) | set(current_results)):
+        before = base_results.get(name)
+        after = current_results.get(name)
+        if before is None or after is None:
+            status = "new" if before is None else "missing"
+            print(f"  {name:<48} {_format(before['value'], before['unit']) if before else '-':>14} "
+                  f"{_format(after['value'], after['unit']) if after else '-':>14} {status:>9}")
+            continue
+
+        change = after['value'] / before['value'] - 1 if before['value'] else 0.0
+        worse = -change if after.get('higher_is_better') else change
+        marker = ""
+        if worse > threshold:
+            regressions.append(name)
+            marker = "  REGRESSION"
+        elif worse < -threshold:
+            marker = "  faster"
+        print(f"  {name:<48} {_format(before['value'], before['unit']):>14} "
+              f"{_format(after['value'], after['unit']):>14} {change * 100:>+8.1f}%{marker}")
+
+    return regressions
+
+
+def default_baseline_path() -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", f"{platform.node() or 'local'}.json")
+
@@ -0,0 +1,64 @@
+import uuid
+
+from core.codec import decode_message, encode_cached, encode_message
+from core.models import MessageType
+from core.packet import FrameDecoder, PacketReader, PacketWriter
+
+
+def run(harness):
+    def write_packet():
+        writer = PacketWriter()
+        writer.write_u8(87)
+        writer.write_u8(1)
+        writer.write_string("com.combatica.arena")
+        writer.write_u32(12345)
+        return writer.to_bytes()
+
+    packet = write_packet()
+
+    def read_packet():
+        reader = PacketReader(packet)
+        reader.read_u8()
+        reader.read_u8()
+        reader.read_string()
+        reader.read_u32()
+
+    harness.time("packet.writer", write_packet)
+    harness.time("packet.reader", read_packet)
+
+    operation_id = uuid.uuid4().bytes
+    messages = {
+        MessageType.HEARTBEAT: (),
+        MessageType.BATTERY_STATUS: (87, True),
+        MessageType.DEVICE_CONNECTED: ("Quest 3", "2G0YC5ZF8B0123"),
+        MessageType.COMMAND_RESPONSE: (True, "com.oculus.browser:3400,com.combatica.arena:120"),
+        MessageType.APK_DOWNLOAD_PROGRESS: (operation_id, 1, 42.5),
+    }
+    for message_type, values in messages.items():
+        request_id = 7 if message_type == MessageType.COMMAND_RESPONSE else None
+        frame = memoryview(bytes(encode_message(message_type, *values, request_id=request_id)))
+        name = message_type.name.lower()
+        harness.time(f"codec.encode.{name}", lambda: encode_message(message_type, *values, request_id=request_id))
+        harness.time(f"codec.decode.{name}", lambda: decode_message(frame))
+
+    harness.time("codec.encode_cached.launch_app", lambda: encode_cached(MessageType.LAUNCH_APP, "com.combatica.arena"))
+
+    # 64 KB of mixed client traffic through the stream decoder, in 1460 byte segments
+    stream = b''.join(
+        bytes(encode_message(message_type, *values)) for message_type, values in messages.items()
+        if message_type != MessageType.COMMAND_RESPONSE
+    )
+    stream = stream * (65536 // len(stream))
+    harness.time("packet.frame_decoder.64k", lambda: _decode_all(stream))
+
+
+def _decode_all(stream: bytes):
+    decoder = FrameDecoder()
+    frames = []
+    for offset in range(0, len(stream), 1460):
+        segment = stream[offset:offset + 1460]
+        buffer = decoder.get_buffer()
+        buffer[:len(segment)] = segment
+        decoder.buffer_updated(len(segment))
+        frames.extend(len(frame) for frame in decoder.frames())
+    return frames
@@ -0,0 +1,93 @@
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+from core.http_server import APKHttpServer
+
+LARGE_SIZE = 64 * 1024 * 1024
+SMALL_SIZE = 4096
+CLIENT_COUNTS = (1, 8)
+REQUEST_COUNT = 200
+
+
+def run(harness):
+    names = [f"http.throughput.{count}_clients" for count in CLIENT_COUNTS] + ["http.small_requests"]
+    if not any(harness.wants(name) for name in names):
+        return
+
+    with tempfile.TemporaryDirectory(prefix="bench-http-") as directory:
+        _write_file(os.path.join(directory, "large.apk"), LARGE_SIZE)
+        _write_file(os.path.join(directory, "small.apk"), SMALL_SIZE)
+
+        http = APKHttpServer(host='127.0.0.1', port=0, apk_directory=directory)
+        http.start()
+        try:
+            address = http.server.server_address
+            _get(address, "/large.apk")  # warm the page cache and the ETag hash
+
+            for count in CLIENT_COUNTS:
+                if harness.wants(f"http.throughput.{count}_clients"):
+                    rates = [_throughput(address, count) for _ in range(harness.repeats)]
+                    harness.record(f"http.throughput.{count}_clients", statistics.median(rates), "MB/s",
+                                   higher_is_better=True)
+
+            if harness.wants("http.small_requests"):
+                rates = []
+                for _ in range(harness.repeats):
+                    start = time.perf_counter()
+                    for _ in range(REQUEST_COUNT):
+                        _get(address, "/small.apk")
+                    rates.append(REQUEST_COUNT / (time.perf_counter() - start))
+                harness.record("http.small_requests", statistics.median(rates), "req/s", higher_is_better=True)
+        finally:
+            http.stop()
+
+
+def _write_file(path: str, size: int):
+    block = os.urandom(1024 * 1024)
+    with open(path, 'wb') as f:
+        for offset in range(0, size, len(block)):
+            f.write(block[:size - offset])
+
+
+def _throughput(address, clients: int) -> float:
+    received = [0] * clients
+
+    def download(index: int):
+        received[index] = _get(address, "/large.apk")
+
+    threads = [threading.Thread(target=download, args=(index,)) for index in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(received) / (time.perf_counter() - start) / (1024 * 1024)
+
+
+def _get(address, path: str) -> int:
+    """Fetch path over a fresh connection and return the body size."""
+    with socket.create_connection(address) as sock:
+        sock.sendall(f"GET {path} HTTP/1.1\r\nHost: {address[0]}\r\nConnection: close\r\n\r\n".encode('ascii'))
+        buffer = bytearray(1024 * 1024)
+        view = memoryview(buffer)
+        head = b''
+        while b"\r\n\r\n" not in head:
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("Connection closed before headers")
+            head += chunk
+
+        head, _, body = head.partition(b"\r\n\r\n")
+        status = int(head.split(b" ", 2)[1])
+        if status != 200:
+            raise ConnectionError(f"HTTP {status} for {path}")
+        total = len(body)
+        while True:
+            count = sock.recv_into(view)
+            if not count:
+                return total
+            total += count
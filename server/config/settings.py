@@ -4,19 +4,63 @@ class Config:
 
     DEFAULT_HOST = "0.0.0.0"
     DEFAULT_PORT = 8888
+    SERVER_BACKLOG = 512
     
     WINDOW_WIDTH = 1400
     WINDOW_HEIGHT = 800
     REFRESH_RATE = 60
+    DEVICE_LIST_ROW_HEIGHT = 24
     
     DEVICE_LIST_UPDATE_INTERVAL = 1.0
     BATTERY_UPDATE_INTERVAL = 60.0
+    BATTERY_POLL_JITTER = 0.1  # fraction of the interval
     
     COMMAND_TIMEOUT = 3.0
     
+    HEARTBEAT_INTERVAL = 15.0  # must match the client's heartbeat period
+    LIVENESS_STALE_MISSES = 2
+    LIVENESS_DEAD_MISSES = 4
+    LIVENESS_TICK = 1.0
+    LIVENESS_WHEEL_SLOTS = 128
+    
+    TELEMETRY_CAPACITY = 720  # samples per device, 12h of battery reports at the default interval
+    TELEMETRY_RTT_CAPACITY = 256
+    TELEMETRY_SEEN_RESOLUTION = 60.0
+    
+    SEND_QUEUE_HIGH_WATER = 256 * 1024
+    SEND_QUEUE_LOW_WATER = 64 * 1024
+    PACKET_CACHE_SIZE = 128
+    
+    APK_HTTP_MAX_TRANSFERS = 16
+    APK_HTTP_QUEUE_TIMEOUT = 30.0
+    APK_HTTP_RETRY_AFTER = 10
+    APK_STORE_POLL_INTERVAL = 2.0
+    INSTALLED_APPS_MAX_AGE = 300.0
+    
+    ROLLOUT_INITIAL_WINDOW = 4
+    ROLLOUT_MAX_WINDOW = 16
+    ROLLOUT_TARGET_THROUGHPUT = 40 * 1024 * 1024  # bytes/s across all downloads
+    ROLLOUT_ADAPT_INTERVAL = 2.0
+    ROLLOUT_STALL_TIMEOUT = 120.0
+    ROLLOUT_INSTALL_TIMEOUT = 30 * 60.0  # clients answer the install command only once it finished
+    
+    METRICS_ENABLED = True
+    METRICS_HOST = "127.0.0.1"  # Prometheus endpoint on server port + 2
+    
     USE_DARK_THEME = True
     
+    PROFILER_INTERVAL = 0.01
+    PROFILER_DURATION = 30.0
+    PROFILER_MAX_DEPTH = 128
+    PROFILER_DIRECTORY = "profiles"
+    
     LOG_LEVEL = "INFO"
     LOG_FILE = "quest_control.log"
+    LOG_JSON_FILE = "quest_control.jsonl"
+    LOG_MAX_BYTES = 10 * 1024 * 1024
+    LOG_BACKUP_COUNT = 5
+    
+    DEVICE_NAMES_FILE = "device_names.json"
+    DEVICE_NAMES_SAVE_DELAY = 1.0  # seconds to batch name changes before writing
     
     PROTECTED_PACKAGES = ["com.b3n00n.snorlax"]
\ No newline at end of file
@@ -1,6 +1,7 @@
 from .models import MessageType, DeviceInfo, BatteryInfo, CommandResult
 from .device import QuestDevice
 from .server import QuestControlServer
+from .broadcast import Broadcast
 from .packet import PacketReader, PacketWriter
 
 __all__ = [
@@ -10,6 +11,7 @@ __all__ = [
     'CommandResult',
     'QuestDevice',
     'QuestControlServer',
+    'Broadcast',
     'PacketReader',
     'PacketWriter'
 ]
\ No newline at end of file
@@ -0,0 +1,137 @@
+import struct
+import zipfile
+from typing import Dict, List
+
+from .models import APKMetadata
+
+MANIFEST_PATH = "AndroidManifest.xml"
+
+# Binary XML chunk types
+RES_STRING_POOL_TYPE = 0x0001
+RES_XML_TYPE = 0x0003
+RES_XML_START_ELEMENT_TYPE = 0x0102
+RES_XML_RESOURCE_MAP_TYPE = 0x0180
+
+UTF8_FLAG = 1 << 8
+
+# Typed value data types
+TYPE_STRING = 0x03
+TYPE_INT_DEC = 0x10
+TYPE_INT_HEX = 0x11
+
+# android:versionCode / android:versionName, for manifests whose attribute
+# names were stripped and only survive in the resource map
+ATTR_VERSION_CODE = 0x0101021B
+ATTR_VERSION_NAME = 0x0101021C
+
+_CHUNK_HEADER = struct.Struct('<HHI')
+_STRING_POOL_HEADER = struct.Struct('<IIIII')
+_START_ELEMENT = struct.Struct('<IIIIHHHHHH')
+_ATTRIBUTE = struct.Struct('<IIIHBBI')
+
+
+def read_apk_metadata(path: str, size: int) -> APKMetadata:
+    with zipfile.ZipFile(path) as apk:
+        manifest = apk.read(MANIFEST_PATH)
+    attributes = parse_manifest_attributes(manifest)
+
+    package_name = attributes.get('package')
+    if not package_name:
+        raise ValueError("Manifest has no package name")
+
+    version_code = attributes.get('versionCode')
+    version_name = attributes.get('versionName')
+    return APKMetadata(
+        package_name=package_name,
+        version_code=int(version_code) if version_code is not None else 0,
+        version_name=str(version_name) if version_name is not None else None,
+        size=size
+    )
+
+
+def parse_manifest_attributes(data: bytes) -> Dict[str, object]:
+    """Attributes of the root <manifest> element of a binary AndroidManifest.xml."""
+    chunk_type, header_size, total_size = _CHUNK_HEADER.unpack_from(data, 0)
+    if chunk_type != RES_XML_TYPE:
+        raise ValueError("Not a binary XML file")
+
+    strings: List[str] = []
+    resource_ids: List[int] = []
+    offset = header_size
+    end = min(total_size, len(data))
+
+    while offset + _CHUNK_HEADER.size <= end:
+        chunk_type, header_size, chunk_size = _CHUNK_HEADER.unpack_from(data, offset)
+        if chunk_size < _CHUNK_HEADER.size:
+            break
+
+        if chunk_type == RES_STRING_POOL_TYPE:
+            strings = _read_string_pool(data, offset)
+        elif chunk_type == RES_XML_RESOURCE_MAP_TYPE:
+            count = (chunk_size - header_size) // 4
+            resource_ids = list(struct.unpack_from(f'<{count}I', data, offset + header_size))
+        elif chunk_type == RES_XML_START_ELEMENT_TYPE:
+            # The first element is always <manifest>
+            return _read_attributes(data, offset, strings, resource_ids)
+
+        offset += chunk_size
+
+    raise ValueError("Manifest element not found")
+
+
+def _read_string_pool(data: bytes, offset: int) -> List[str]:
+    count, _, flags, strings_start, _ = _STRING_POOL_HEADER.unpack_from(data, offset + _CHUNK_HEADER.size)
+    header_size = _CHUNK_HEADER.unpack_from(data, offset)[1]
+    offsets = struct.unpack_from(f'<{count}I', data, offset + header_size)
+    base = offset + strings_start
+    utf8 = bool(flags & UTF8_FLAG)
+
+    strings = []
+    for string_offset in offsets:
+        position = base + string_offset
+        if utf8:
+            _, position = _read_utf8_length(data, position)  # length in UTF-16 units
+            length, position = _read_utf8_length(data, position)
+            strings.append(data[position:position + length].decode('utf-8', errors='replace'))
+        else:
+            length = struct.unpack_from('<H', data, position)[0]
+            position += 2
+            if length & 0x8000:
+                length = ((length & 0x7FFF) << 16) | struct.unpack_from('<H', data, position)[0]
+                position += 2
+            strings.append(data[position:position + length * 2].decode('utf-16-le', errors='replace'))
+    return strings
+
+
+def _read_utf8_length(data: bytes, position: int):
+    length = data[position]
+    position += 1
+    if length & 0x80:
+        length = ((length & 0x7F) << 8) | data[position]
+        position += 1
+    return length, position
+
+
+def _read_attributes(data: bytes, offset: int, strings: List[str], resource_ids: List[int]) -> Dict[str, object]:
+    header_size = _CHUNK_HEADER.unpack_from(data, offset)[1]
+    (_, _, _, _, attribute_start, attribute_size, attribute_count,
+     _, _, _) = _START_ELEMENT.unpack_from(data, offset + _CHUNK_HEADER.size)
+    position = offset + header_size + attribute_start
+
+    attributes = {}
+    for index in range(attribute_count):
+        _, name_index, raw_index, _, _, data_type, value = _ATTRIBUTE.unpack_from(data, position + index * attribute_size)
+
+        name = strings[name_index] if name_index < len(strings) else ''
+        if name_index < len(resource_ids):
+            name = {ATTR_VERSION_CODE: 'versionCode', ATTR_VERSION_NAME: 'versionName'}.get(
+                resource_ids[name_index], name
+            )
+
+        if raw_index != 0xFFFFFFFF and raw_index < len(strings):
+            attributes[name] = strings[raw_index]
+        elif data_type == TYPE_STRING and value < len(strings):
+            attributes[name] = strings[value]
+        elif data_type in (TYPE_INT_DEC, TYPE_INT_HEX):
+            attributes[name] = value
+    return attributes
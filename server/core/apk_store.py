@@ -0,0 +1,411 @@
+import hashlib
+import json
+import os
+import shutil
+import stat
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional
+
+from config.settings import Config
+from utils.logger import logger
+from .apk_metadata import read_apk_metadata
+from .models import APKMetadata
+
+STORE_DIRNAME = ".store"
+INDEX_FILENAME = "index.json"
+METADATA_FILENAME = "metadata.json"
+
+
+def file_sha256(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(1024 * 1024):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _clone_file(source: str, dest: str):
+    # Copy-on-write clone where the filesystem supports it (Btrfs, XFS),
+    # a regular copy everywhere else
+    try:
+        import fcntl
+        with open(source, 'rb') as src, open(dest, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), 0x40049409, src.fileno())  # FICLONE
+        return
+    except (ImportError, OSError):
+        pass
+    shutil.copyfile(source, dest)
+
+
+def _link_or_clone(source: str, dest: str):
+    """Read-only hardlink to source at dest, or a read-only copy where links aren't supported."""
+    temp_path = dest + ".tmp"
+    if os.path.lexists(temp_path):
+        _remove_read_only(temp_path)
+    try:
+        os.link(source, temp_path)
+    except OSError:
+        _clone_file(source, temp_path)
+    os.chmod(temp_path, stat.S_IREAD)
+    os.replace(temp_path, dest)
+
+
+def _store_blob(source: str, blob: str, link: bool):
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+    if link:
+        _link_or_clone(source, blob)
+        return
+    # An outside file stays the caller's to edit, so it is copied rather than linked
+    temp_blob = blob + ".tmp"
+    _clone_file(source, temp_blob)
+    os.chmod(temp_blob, stat.S_IREAD)
+    os.replace(temp_blob, blob)
+
+
+def _remove_read_only(path: str):
+    try:
+        os.remove(path)
+    except PermissionError:
+        # Windows refuses to delete read-only files
+        os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+        os.remove(path)
+
+
+class APKStore:
+    """Content-addressed APK repository.
+
+    Every distinct build is stored once as a read-only .store/<xx>/<sha256>
+    blob, and each name in the APK directory is a hardlink to its blob, so
+    the HTTP server keeps serving plain filenames without duplicating
+    data. Names are read-only for that reason: replace a file rather than
+    write into it. A forced in-place rewrite changes every name sharing
+    the inode; the stat check catches that and re-hashes all of them, so
+    the index and the blob names never disagree with the content.
+
+    The name -> hash index is persisted in .store/index.json. A watcher
+    thread re-stats the indexed files and scans the folder when its mtime
+    moves, and hashes only what changed.
+
+    Manifest metadata is read on demand by a single background worker and
+    cached per content hash in .store/metadata.json, so a build is parsed
+    once no matter how many names point at it.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.store_directory = os.path.join(directory, STORE_DIRNAME)
+        self.index_path = os.path.join(self.store_directory, INDEX_FILENAME)
+        self.metadata_path = os.path.join(self.store_directory, METADATA_FILENAME)
+        self.entries: Dict[str, dict] = {}  # name -> {'hash', 'size', 'mtime_ns'}
+        self.metadata: Dict[str, APKMetadata] = {}  # hash -> metadata
+        self._lock = threading.RLock()
+        self.listeners: List[Callable[[], None]] = []
+        self._names: List[str] = []
+        self._dir_mtime_ns: Optional[int] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._metadata_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="apk-metadata")
+        self._metadata_loads: Dict[str, Future] = {}
+
+        os.makedirs(self.store_directory, exist_ok=True)
+        self._load_index()
+        self._load_metadata()
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r') as f:
+                self.entries = json.load(f)
+            self._names = sorted(self.entries)
+        except Exception as e:
+            logger.error("Error loading APK index: %s", e)
+            self.entries = {}
+
+    def _save_index(self):
+        temp_path = self.index_path + ".tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(temp_path, self.index_path)
+        except Exception as e:
+            logger.error("Error saving APK index: %s", e)
+
+    def _load_metadata(self):
+        if not os.path.exists(self.metadata_path):
+            return
+        try:
+            with open(self.metadata_path, 'r') as f:
+                self.metadata = {digest: APKMetadata(**fields) for digest, fields in json.load(f).items()}
+        except Exception as e:
+            logger.error("Error loading APK metadata: %s", e)
+            self.metadata = {}
+
+    def _save_metadata(self):
+        temp_path = self.metadata_path + ".tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump({digest: asdict(meta) for digest, meta in self.metadata.items()}, f, indent=2)
+            os.replace(temp_path, self.metadata_path)
+        except Exception as e:
+            logger.error("Error saving APK metadata: %s", e)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.store_directory, digest[:2], digest)
+
+    def start(self):
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=self._watch, name="apk-store-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._watcher and self._watcher.is_alive():
+            self._watcher.join(timeout=5)
+        self._watcher = None
+
+    def _watch(self):
+        while not self._stop_event.is_set():
+            try:
+                self.refresh()
+                self.hash_pending()
+            except Exception as e:
+                logger.error("APK store watcher error: %s", e)
+            self._stop_event.wait(Config.APK_STORE_POLL_INTERVAL)
+
+    def refresh(self) -> bool:
+        """Sync the index with the directory. Cheap when nothing changed.
+
+        Overwriting a file in place leaves the directory mtime alone, so the
+        indexed files are re-stat'ed on every call; the folder itself is
+        only scanned when its mtime moved or an indexed file changed.
+        """
+        try:
+            dir_mtime_ns = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return False
+        if dir_mtime_ns == self._dir_mtime_ns and not self._entries_changed():
+            return False
+
+        changed = False
+        with self._lock:
+            seen = set()
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.apk') or not entry.is_file():
+                        continue
+                    seen.add(entry.name)
+                    st = entry.stat()
+                    known = self.entries.get(entry.name)
+                    if known and known['size'] == st.st_size and known['mtime_ns'] == st.st_mtime_ns:
+                        continue
+                    self.entries[entry.name] = {'hash': None, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+                    changed = True
+
+            for name in [name for name in self.entries if name not in seen]:
+                self._forget(name)
+                changed = True
+
+            self._dir_mtime_ns = dir_mtime_ns
+            if changed:
+                self._names = sorted(self.entries)
+                self._save_index()
+
+        if changed:
+            self._notify()
+        return changed
+
+    def _entries_changed(self) -> bool:
+        for name, known in list(self.entries.items()):
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                return True
+            if known['size'] != st.st_size or known['mtime_ns'] != st.st_mtime_ns:
+                return True
+        return False
+
+    def hash_pending(self):
+        with self._lock:
+            pending = [name for name, entry in self.entries.items() if entry['hash'] is None]
+        for name in pending:
+            if self._stop_event.is_set():
+                break
+            try:
+                self._adopt(name)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error("Error indexing APK %s: %s", name, e)
+
+    def _adopt(self, name: str):
+        path = os.path.join(self.directory, name)
+        st = os.stat(path)
+        digest = file_sha256(path)
+        blob = self._blob_path(digest)
+
+        with self._lock:
+            current = os.stat(path)
+            if (current.st_size, current.st_mtime_ns) != (st.st_size, st.st_mtime_ns) or name not in self.entries:
+                # Still being written, or gone; the next pass picks it up
+                return
+
+            if not os.path.exists(blob):
+                # The dropped file itself becomes the blob, without a copy
+                _store_blob(path, blob, link=True)
+            elif not os.path.samefile(blob, path):
+                # Same build already stored under another name
+                self._replace_with_link(blob, path)
+            else:
+                # A forced rewrite of a linked name; keep it read-only
+                os.chmod(blob, stat.S_IREAD)
+            st = os.stat(path)
+
+            self.entries[name] = {'hash': digest, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+            self._collect_garbage()
+            self._save_index()
+        logger.info("Indexed APK %s (%s)", name, digest[:12])
+
+    def _replace_with_link(self, blob: str, path: str):
+        _link_or_clone(blob, path)
+        self._dir_mtime_ns = None
+
+    def import_file(self, source_path: str, name: Optional[str] = None) -> str:
+        """Add an APK under name, storing its content only if it is new."""
+        name = name or os.path.basename(source_path)
+        digest = file_sha256(source_path)
+        blob = self._blob_path(digest)
+        path = os.path.join(self.directory, name)
+
+        with self._lock:
+            if not os.path.exists(blob):
+                _store_blob(source_path, blob, link=False)
+            else:
+                logger.info("%s is already stored, reusing existing copy", name)
+
+            if not (os.path.exists(path) and os.path.samefile(blob, path)):
+                self._replace_with_link(blob, path)
+
+            st = os.stat(path)
+            self.entries[name] = {'hash': digest, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+            self._names = sorted(self.entries)
+            self._collect_garbage()
+            self._save_index()
+
+        self._notify()
+        return digest
+
+    def remove(self, name: str) -> bool:
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            if os.path.exists(path):
+                _remove_read_only(path)
+                entry = self.entries.get(name)
+                if entry and entry['hash'] and os.path.exists(self._blob_path(entry['hash'])):
+                    # On Windows the unlock above also unlocked the shared blob
+                    os.chmod(self._blob_path(entry['hash']), stat.S_IREAD)
+            elif name not in self.entries:
+                return False
+            self._forget(name)
+            self._names = sorted(self.entries)
+            self._save_index()
+        self._notify()
+        return True
+
+    def _forget(self, name: str):
+        entry = self.entries.pop(name, None)
+        if entry and entry['hash']:
+            self._collect_garbage()
+
+    def _collect_garbage(self):
+        referenced = {entry['hash'] for entry in self.entries.values() if entry['hash']}
+        for prefix in os.listdir(self.store_directory):
+            prefix_dir = os.path.join(self.store_directory, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            blobs = os.listdir(prefix_dir)
+            for digest in blobs:
+                if digest not in referenced:
+                    _remove_read_only(os.path.join(prefix_dir, digest))
+            if all(digest not in referenced for digest in blobs):
+                os.rmdir(prefix_dir)
+
+        stale = [digest for digest in self.metadata if digest not in referenced]
+        for digest in stale:
+            del self.metadata[digest]
+        if stale:
+            self._save_metadata()
+
+    def _notify(self):
+        for listener in self.listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error("Error in APK store listener: %s", e)
+
+    def list_names(self) -> List[str]:
+        if not (self._watcher and self._watcher.is_alive()):
+            self.refresh()
+        return list(self._names)
+
+    def get_entry(self, name: str) -> Optional[dict]:
+        return self.entries.get(name)
+
+    def lookup_hash(self, path: str, st: os.stat_result) -> Optional[str]:
+        """Indexed hash for a file in the store directory, if still current."""
+        if os.path.dirname(path) != self.directory:
+            return None
+        entry = self.entries.get(os.path.basename(path))
+        if entry and entry['hash'] and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            return entry['hash']
+        return None
+
+    def get_metadata(self, name: str) -> Optional[APKMetadata]:
+        """Cached metadata for name, or None while it is still being read."""
+        entry = self.entries.get(name)
+        if not entry or not entry['hash']:
+            return None
+        metadata = self.metadata.get(entry['hash'])
+        if metadata is None:
+            self.load_metadata(name)
+        return metadata
+
+    def load_metadata(self, name: str) -> Future:
+        """Future resolving to the APK's metadata, or None if it can't be read."""
+        entry = self.entries.get(name)
+        if not entry or not entry['hash']:
+            future = Future()
+            future.set_result(None)
+            return future
+
+        digest = entry['hash']
+        with self._lock:
+            if digest in self.metadata:
+                future = Future()
+                future.set_result(self.metadata[digest])
+                return future
+            future = self._metadata_loads.get(digest)
+            if future is None:
+                future = self._metadata_worker.submit(self._read_metadata, name, digest, entry['size'])
+                self._metadata_loads[digest] = future
+        return future
+
+    def _read_metadata(self, name: str, digest: str, size: int) -> Optional[APKMetadata]:
+        try:
+            metadata = read_apk_metadata(self._blob_path(digest), size)
+        except Exception as e:
+            # Remembered in _metadata_loads, so a bad APK is only tried once
+            logger.warning("Could not read manifest of %s: %s", name, e)
+            return None
+
+        with self._lock:
+            self.metadata[digest] = metadata
+            self._metadata_loads.pop(digest, None)
+            self._save_metadata()
+        logger.info("%s: %s %s (%s)", name, metadata.package_name, metadata.version_name, metadata.version_code)
+        self._notify()
+        return metadata
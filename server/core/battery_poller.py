@@ -0,0 +1,51 @@
+import random
+from typing import Dict
+
+from config.settings import Config
+from .device import QuestDevice
+from .models import MessageType
+
+
+class BatteryPoller:
+    """Polls battery levels on the network loop, spread across the interval.
+
+    Each device gets its own timer starting at a random phase in
+    [0, BATTERY_UPDATE_INTERVAL), and every later poll is jittered by
+    BATTERY_POLL_JITTER, so requests (and the replies and GUI updates
+    they cause) arrive evenly instead of in one burst. Devices that pushed
+    a BATTERY_STATUS within the last half interval are skipped.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.interval = Config.BATTERY_UPDATE_INTERVAL
+        self._handles: Dict[QuestDevice, object] = {}
+
+    def add(self, device: QuestDevice):
+        self.remove(device)
+        self._schedule(device, random.uniform(0, self.interval))
+
+    def remove(self, device: QuestDevice):
+        handle = self._handles.pop(device, None)
+        if handle:
+            handle.cancel()
+
+    def stop(self):
+        for handle in self._handles.values():
+            handle.cancel()
+        self._handles.clear()
+
+    def _schedule(self, device: QuestDevice, delay: float):
+        self._handles[device] = self.loop.call_later(delay, self._poll, device)
+
+    def _poll(self, device: QuestDevice):
+        if not device.is_connected:
+            self._handles.pop(device, None)
+            return
+
+        pushed_at = device.last_battery_at
+        if pushed_at is None or self.loop.time() - pushed_at >= self.interval / 2:
+            device.send_message(MessageType.REQUEST_BATTERY)
+
+        jitter = Config.BATTERY_POLL_JITTER
+        self._schedule(device, self.interval * random.uniform(1 - jitter, 1 + jitter))
@@ -0,0 +1,193 @@
+import itertools
+import threading
+import time
+from concurrent.futures import Future, wait
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from config.settings import Config
+from .device import QuestDevice
+from .models import MessageType, CommandResult
+from .codec import U32, encode_request_prefix
+
+
+class Broadcast:
+    """Per-device futures for one command sent to a set of devices.
+
+    Each future resolves to the device's CommandResult, or fails with
+    TimeoutError / ConnectionError. Wrap one with asyncio.wrap_future to
+    await it from a coroutine.
+    """
+
+    def __init__(self, message_type: MessageType, device_ids: Iterable[str], request_id: int):
+        self.message_type = message_type
+        self.request_id = request_id
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.futures: Dict[str, Future] = {device_id: Future() for device_id in device_ids}
+        self.latencies: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._remaining = len(self.futures)
+        self._callbacks: List[Callable[['Broadcast'], None]] = []
+
+        if not self.futures:
+            self.finished_at = self.started_at
+
+        for device_id, future in self.futures.items():
+            future.add_done_callback(lambda f, device_id=device_id: self._on_future_done(device_id))
+
+    def _on_future_done(self, device_id: str):
+        with self._lock:
+            self.latencies[device_id] = time.monotonic() - self.started_at
+            self._remaining -= 1
+            if self._remaining:
+                return
+            self.finished_at = time.monotonic()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            callback(self)
+
+    def add_done_callback(self, callback: Callable[['Broadcast'], None]):
+        with self._lock:
+            if not self.done():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        wait(self.futures.values(), timeout=timeout)
+        return self.done()
+
+    @property
+    def duration(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def succeeded(self) -> List[str]:
+        return [
+            device_id for device_id, future in self.futures.items()
+            if future.done() and not future.exception() and future.result().success
+        ]
+
+    @property
+    def failed(self) -> List[str]:
+        return [
+            device_id for device_id, future in self.futures.items()
+            if future.done() and (future.exception() or not future.result().success)
+        ]
+
+
+class _InFlight:
+    __slots__ = ('future', 'message_type', 'sent_at')
+
+    def __init__(self, future: Future, message_type: MessageType, sent_at: float):
+        self.future = future
+        self.message_type = message_type
+        self.sent_at = sent_at
+
+
+class BroadcastEngine:
+    """Fans one pre-encoded frame out to many devices on the network loop.
+
+    Every broadcast gets a request ID, appended as a u32 after the command
+    payload, and each target gets an in-flight entry keyed by (device,
+    request ID). Clients that echo the ID after their COMMAND_RESPONSE
+    fields are matched exactly. Clients that never echo it answer in
+    order, so a response goes to the oldest command the device is still
+    waiting on, tracked or not; a reply to an untracked command (sent with
+    device.send_* directly) resolves nothing.
+
+    Until a loop is bound, send() fails every future with ConnectionError.
+    """
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self._request_ids = itertools.count(1)
+        self._in_flight: Dict[QuestDevice, Dict[int, _InFlight]] = {}
+
+    def bind(self, loop):
+        self.loop = loop
+        self._in_flight.clear()
+
+    def next_request_id(self) -> int:
+        return next(self._request_ids) & 0xFFFFFFFF
+
+    def send(self, message_type: MessageType, values: tuple, devices: Dict[str, Optional[QuestDevice]],
+             timeout: float = Config.COMMAND_TIMEOUT) -> Broadcast:
+        request_id = self.next_request_id()
+        prefix = encode_request_prefix(message_type, *values)
+        trailer = U32.pack(request_id)
+
+        broadcast = Broadcast(message_type, devices.keys(), request_id)
+        try:
+            self.loop.call_soon_threadsafe(self._fan_out, broadcast, (prefix, trailer), devices, timeout)
+        except (AttributeError, RuntimeError):
+            for future in broadcast.futures.values():
+                future.set_exception(ConnectionError("Server is not running"))
+        return broadcast
+
+    def _fan_out(self, broadcast: Broadcast, frame: Tuple[bytes, bytes], devices: Dict[str, Optional[QuestDevice]],
+                 timeout: float):
+        sent = []
+        sent_at = time.monotonic()
+        for device_id, device in devices.items():
+            future = broadcast.futures[device_id]
+            if future.done():
+                # Cancelled before it was sent
+                continue
+            if device is None or not device.send_frame(*frame, request_id=broadcast.request_id):
+                future.set_exception(ConnectionError(f"Could not send to {device_id}"))
+                continue
+            in_flight = self._in_flight.setdefault(device, {})
+            in_flight[broadcast.request_id] = _InFlight(future, broadcast.message_type, sent_at)
+            sent.append(device)
+
+        if sent:
+            self.loop.call_later(timeout, self._expire, broadcast.request_id, sent, timeout)
+
+    def _expire(self, request_id: int, devices: List[QuestDevice], timeout: float):
+        for device in devices:
+            entry = self._in_flight.get(device, {}).pop(request_id, None)
+            if entry is None:
+                continue
+            device.forget_response(request_id)
+            # The caller may have cancelled it; a cancelled future can't take a result
+            if not entry.future.done():
+                entry.future.set_exception(TimeoutError(
+                    f"No response from {device.get_display_name()} within {timeout:g}s"
+                ))
+
+    def resolve(self, device: QuestDevice, request_id: Optional[int], result: CommandResult):
+        if request_id is not None:
+            device.forget_response(request_id)
+            owner = request_id
+        elif device.echoes_request_ids:
+            # Reply to a command that was sent without a request ID
+            device.forget_response(None)
+            return
+        else:
+            owner = device.next_response_owner()
+            if owner is None:
+                return
+
+        entry = self._in_flight.get(device, {}).pop(owner, None)
+        if entry is None:
+            return
+
+        if entry.future.done():
+            return
+        result.request_id = request_id
+        result.round_trip = time.monotonic() - entry.sent_at
+        entry.future.set_result(result)
+
+    def get_in_flight_count(self, device: QuestDevice) -> int:
+        return len(self._in_flight.get(device, ()))
+
+    def fail_all(self, device: QuestDevice, error: Exception):
+        in_flight = self._in_flight.pop(device, None)
+        for entry in (in_flight or {}).values():
+            if not entry.future.done():
+                entry.future.set_exception(error)
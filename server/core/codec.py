@@ -0,0 +1,190 @@
+import struct
+from collections import namedtuple
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from config.settings import Config
+from .models import MessageType
+from .packet import FRAME_HEADER_SIZE, MAX_PAYLOAD_SIZE
+
+HEADER = struct.Struct('>BH')
+U32 = struct.Struct('>I')
+
+STRING = 'string'
+_FIXED_CODES = {
+    'u8': 'B',
+    'bool': '?',
+    'u16': 'H',
+    'u32': 'I',
+    'f32': 'f',
+    'uuid': '16s',
+}
+
+
+class MessageSchema:
+    """Declarative wire layout of one message type.
+
+    Runs of fixed-size fields are compiled into a single struct.Struct, so
+    fixed-layout messages (battery, volume) decode with one unpack_from and
+    encode with one pack_into. Strings are u32 length-prefixed UTF-8.
+    """
+
+    def __init__(self, message_type: MessageType, *fields: Tuple[str, str], request_id: bool = False):
+        self.message_type = message_type
+        self.fields = fields
+        self.request_id = request_id
+
+        names = [name for name, _ in fields]
+        if request_id:
+            names.append('request_id')
+        self.type = namedtuple(message_type.name.title().replace('_', ''), names)
+
+        self._segments = []
+        self._counts = {}  # fixed segment -> number of fields it packs
+        codes = []
+        for _, kind in fields:
+            if kind == STRING:
+                self._add_fixed_segment(codes)
+                codes = []
+                self._segments.append(STRING)
+            else:
+                codes.append(_FIXED_CODES[kind])
+        self._add_fixed_segment(codes)
+
+        self._fixed_size = sum(s.size for s in self._segments if s is not STRING)
+        self._constant_frame = None
+        if not fields and not request_id:
+            self._constant_frame = HEADER.pack(message_type, 0)
+
+    def _add_fixed_segment(self, codes):
+        if codes:
+            segment = struct.Struct('>' + ''.join(codes))
+            self._counts[segment] = len(codes)
+            self._segments.append(segment)
+
+    def decode(self, frame: memoryview):
+        offset = FRAME_HEADER_SIZE
+        end = len(frame)
+        values = []
+
+        for segment in self._segments:
+            if segment is STRING:
+                if offset + 4 > end:
+                    raise ValueError("Not enough data")
+                (length,) = U32.unpack_from(frame, offset)
+                offset += 4
+                if offset + length > end:
+                    raise ValueError("Not enough data")
+                values.append(str(frame[offset:offset + length], 'utf-8'))
+                offset += length
+            else:
+                if offset + segment.size > end:
+                    raise ValueError("Not enough data")
+                values.extend(segment.unpack_from(frame, offset))
+                offset += segment.size
+
+        if self.request_id:
+            values.append(U32.unpack_from(frame, offset)[0] if end - offset >= 4 else None)
+
+        return self.type._make(values)
+
+    def encode(self, *values: Any, request_id: Optional[int] = None) -> bytes:
+        if self._constant_frame is not None and request_id is None:
+            return self._constant_frame
+
+        if len(values) != len(self.fields):
+            raise ValueError(f"{self.message_type.name} takes {len(self.fields)} fields, got {len(values)}")
+
+        encoded = [value.encode('utf-8') for value, (_, kind) in zip(values, self.fields) if kind == STRING]
+        payload_size = self._fixed_size + sum(4 + len(e) for e in encoded)
+        if request_id is not None:
+            payload_size += 4
+        if payload_size > MAX_PAYLOAD_SIZE:
+            raise ValueError(f"Payload too large: {payload_size} bytes")
+
+        buffer = bytearray(FRAME_HEADER_SIZE + payload_size)
+        HEADER.pack_into(buffer, 0, self.message_type, payload_size)
+        offset = FRAME_HEADER_SIZE
+        value_index = 0
+        string_index = 0
+
+        for segment in self._segments:
+            if segment is STRING:
+                data = encoded[string_index]
+                string_index += 1
+                value_index += 1
+                U32.pack_into(buffer, offset, len(data))
+                offset += 4
+                buffer[offset:offset + len(data)] = data
+                offset += len(data)
+            else:
+                count = self._counts[segment]
+                segment.pack_into(buffer, offset, *values[value_index:value_index + count])
+                value_index += count
+                offset += segment.size
+
+        if request_id is not None:
+            U32.pack_into(buffer, offset, request_id & 0xFFFFFFFF)
+
+        return buffer
+
+
+SCHEMAS: Dict[MessageType, MessageSchema] = {schema.message_type: schema for schema in (
+    # Client -> server
+    MessageSchema(MessageType.DEVICE_CONNECTED, ('model', STRING), ('serial', STRING)),
+    MessageSchema(MessageType.HEARTBEAT),
+    MessageSchema(MessageType.BATTERY_STATUS, ('headset_level', 'u8'), ('is_charging', 'bool')),
+    MessageSchema(MessageType.COMMAND_RESPONSE, ('success', 'bool'), ('message', STRING), request_id=True),
+    MessageSchema(MessageType.ERROR, ('message', STRING)),
+    MessageSchema(MessageType.VOLUME_STATUS, ('percentage', 'u8'), ('current', 'u8'), ('max', 'u8')),
+    MessageSchema(MessageType.APK_DOWNLOAD_PROGRESS, ('operation_id', 'uuid'), ('stage', 'u8'), ('percentage', 'f32')),
+    MessageSchema(MessageType.APK_INSTALL_PROGRESS, ('operation_id', 'uuid'), ('stage', 'u8'), ('percentage', 'f32')),
+
+    # Server -> client
+    MessageSchema(MessageType.LAUNCH_APP, ('package_name', STRING)),
+    MessageSchema(MessageType.EXECUTE_SHELL, ('command', STRING)),
+    MessageSchema(MessageType.REQUEST_BATTERY),
+    MessageSchema(MessageType.GET_INSTALLED_APPS),
+    MessageSchema(MessageType.GET_DEVICE_INFO),
+    MessageSchema(MessageType.PING),
+    MessageSchema(MessageType.DOWNLOAD_AND_INSTALL_APK, ('url', STRING)),
+    MessageSchema(MessageType.SHUTDOWN_DEVICE, ('action', STRING)),
+    MessageSchema(MessageType.UNINSTALL_APP, ('package_name', STRING)),
+    MessageSchema(MessageType.SET_VOLUME, ('percentage', 'u8')),
+    MessageSchema(MessageType.GET_VOLUME),
+    MessageSchema(MessageType.INSTALL_LOCAL_APK, ('url', STRING)),
+)}
+
+
+def decode_message(frame: memoryview):
+    message_type = MessageType(frame[0])
+    return message_type, SCHEMAS[message_type].decode(frame)
+
+
+def encode_message(message_type: MessageType, *values: Any, request_id: Optional[int] = None) -> bytes:
+    return SCHEMAS[message_type].encode(*values, request_id=request_id)
+
+
+def encode_frame(message_type: MessageType, payload: bytes = b'', request_id: Optional[int] = None) -> bytes:
+    payload_size = len(payload) + (4 if request_id is not None else 0)
+    if payload_size > MAX_PAYLOAD_SIZE:
+        raise ValueError(f"Payload too large: {payload_size} bytes")
+
+    buffer = bytearray(FRAME_HEADER_SIZE + payload_size)
+    HEADER.pack_into(buffer, 0, message_type, payload_size)
+    buffer[FRAME_HEADER_SIZE:FRAME_HEADER_SIZE + len(payload)] = payload
+    if request_id is not None:
+        U32.pack_into(buffer, FRAME_HEADER_SIZE + len(payload), request_id & 0xFFFFFFFF)
+    return buffer
+
+
+@lru_cache(maxsize=Config.PACKET_CACHE_SIZE)
+def encode_cached(message_type: MessageType, *values: Any) -> bytes:
+    # Immutable so one buffer can sit in many device send queues at once
+    return bytes(encode_message(message_type, *values))
+
+
+@lru_cache(maxsize=Config.PACKET_CACHE_SIZE)
+def encode_request_prefix(message_type: MessageType, *values: Any) -> bytes:
+    """Frame for a tracked command minus its trailing u32 request ID."""
+    return bytes(encode_message(message_type, *values, request_id=0)[:-4])
@@ -1,54 +1,162 @@
-import socket
+import asyncio
 import threading
-from typing import Dict, Optional
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
 from datetime import datetime
 
-from .models import DeviceInfo, BatteryInfo, MessageType, CommandResult
-from .packet import PacketWriter
+from config.settings import Config
+from .models import DeviceInfo, BatteryInfo, MessageType, CommandResult, RESPONSE_COMMANDS
+from .codec import encode_frame, encode_cached
+from .telemetry import DeviceTelemetry
+from .instrumentation import record_sent
+from utils.logger import logger
 
 
 class QuestDevice:
-    def __init__(self, client_socket: socket.socket, address: tuple):
-        self.socket = client_socket
+    def __init__(self, transport: asyncio.Transport, address: tuple, loop: asyncio.AbstractEventLoop):
+        self.transport = transport
+        self.loop = loop
         self.address = address
         self.device_info: Optional[DeviceInfo] = None
         self.battery_info: Optional[BatteryInfo] = None
         self.last_response: Optional[str] = None
-        self.command_history: list[CommandResult] = []
+        self.command_history: Deque[CommandResult] = deque(maxlen=50)
         self.is_connected = True
         self.lock = threading.Lock()
         self._cached_display_name: Optional[str] = None
         self._cached_name_serial: Optional[str] = None
         self.volume_info: Optional[Dict[str, int]] = None
+        self.telemetry: Optional[DeviceTelemetry] = None
+        self.last_activity = 0.0  # loop.time() of the last frame received
+        self.stale = False
+        self.last_battery_at: Optional[float] = None
+        
+        self.echoes_request_ids = False
+        self.backpressured = False
+        self._send_lock = threading.Lock()
+        self._outbox: Deque[bytes] = deque()
+        self._outbox_bytes = 0
+        # (request ID or None if untracked, sent_at) of every command still
+        # waiting for its COMMAND_RESPONSE, in the order they were queued
+        self._awaiting_response: Deque[Tuple[Optional[int], float]] = deque()
+        self._flush_scheduled = False
+        self._write_paused = False
     
     def send_message(self, message_type: MessageType, data: bytes = b'') -> bool:
         try:
-            writer = PacketWriter()
-            writer.write_u8(message_type.value)
-            writer.data.extend(data)
-            self.socket.send(writer.to_bytes())
-            return True
+            frame = encode_frame(message_type, data) if data else encode_cached(message_type)
         except Exception as e:
-            print(f"Error sending message to {self.get_display_name()}: {e}")
+            logger.error("Error sending message to %s: %s", self.get_display_name(), e)
+            return False
+        
+        return self.send_frame(frame)
+    
+    def _send_encoded(self, message_type: MessageType, *values) -> bool:
+        try:
+            frame = encode_cached(message_type, *values)
+        except Exception as e:
+            logger.error("Error sending message to %s: %s", self.get_display_name(), e)
+            return False
+        
+        return self.send_frame(frame)
+    
+    def send_frame(self, *buffers: bytes, request_id: Optional[int] = None) -> bool:
+        with self._send_lock:
+            if not self.is_connected:
+                return False
+            
+            if self.backpressured:
+                return False
+            
+            for buffer in buffers:
+                self._outbox.append(buffer)
+                self._outbox_bytes += len(buffer)
+            record_sent(buffers)
+            if buffers[0][0] in RESPONSE_COMMANDS:
+                self._expect_response(request_id)
+            if self._outbox_bytes >= Config.SEND_QUEUE_HIGH_WATER:
+                self.backpressured = True
+                logger.warning("Send queue full for %s, dropping messages until it drains", self.get_display_name())
+            
+            if self._flush_scheduled:
+                return True
+            self._flush_scheduled = True
+        
+        try:
+            self.loop.call_soon_threadsafe(self._flush)
+        except RuntimeError:
             self.is_connected = False
             return False
+        return True
+    
+    def _expect_response(self, request_id: Optional[int]):
+        now = time.monotonic()
+        awaiting = self._awaiting_response
+        # Untracked commands never time out on their own; drop the ones that went unanswered
+        while awaiting and awaiting[0][0] is None and now - awaiting[0][1] > Config.COMMAND_TIMEOUT:
+            awaiting.popleft()
+        awaiting.append((request_id, now))
+    
+    def next_response_owner(self) -> Optional[int]:
+        """Request ID of the command an unlabelled COMMAND_RESPONSE answers.
+        
+        Only meaningful for clients that don't echo request IDs, which reply
+        in order. None means the reply belongs to an untracked command.
+        """
+        cutoff = time.monotonic() - Config.COMMAND_TIMEOUT
+        with self._send_lock:
+            while self._awaiting_response:
+                request_id, sent_at = self._awaiting_response.popleft()
+                if request_id is not None or sent_at >= cutoff:
+                    return request_id
+        return None
+    
+    def forget_response(self, request_id: Optional[int]):
+        """Stop waiting for the oldest command with request_id (None: untracked)."""
+        with self._send_lock:
+            for index, (awaited_id, _) in enumerate(self._awaiting_response):
+                if awaited_id == request_id:
+                    del self._awaiting_response[index]
+                    return
+    
+    def get_send_queue_size(self) -> int:
+        return self._outbox_bytes
+    
+    def _flush(self):
+        with self._send_lock:
+            self._flush_scheduled = False
+            if self._write_paused or not self._outbox:
+                return
+            
+            frames = list(self._outbox)
+            self._outbox.clear()
+            self._outbox_bytes = 0
+            self.backpressured = False
+        
+        if not self.transport.is_closing():
+            # Small frames queued since the last flush go out in a single send
+            self.transport.writelines(frames)
+    
+    def _pause_writing(self):
+        with self._send_lock:
+            self._write_paused = True
+    
+    def _resume_writing(self):
+        with self._send_lock:
+            self._write_paused = False
+        self._flush()
     
     def send_command(self, message_type: MessageType, command: str = "") -> bool:
-        writer = PacketWriter()
         if command:
-            writer.write_string(command)
-            
-        return self.send_message(message_type, writer.to_bytes())
+            return self._send_encoded(message_type, command)
+        return self.send_message(message_type)
     
     def send_shutdown_command(self, action: str) -> bool:
-        writer = PacketWriter()
-        writer.write_string(action)
-        return self.send_message(MessageType.SHUTDOWN_DEVICE, writer.to_bytes())
+        return self._send_encoded(MessageType.SHUTDOWN_DEVICE, action)
     
     def send_uninstall_command(self, package_name: str) -> bool:
-        writer = PacketWriter()
-        writer.write_string(package_name)
-        return self.send_message(MessageType.UNINSTALL_APP, writer.to_bytes())
+        return self._send_encoded(MessageType.UNINSTALL_APP, package_name)
     
     def get_display_name(self) -> str:
         if self.device_info:
@@ -63,7 +171,7 @@ class QuestDevice:
                         self._cached_display_name = f"{self.device_info.model} ({self.device_info.serial})"
                     self._cached_name_serial = self.device_info.serial
                 except Exception as e:
-                    print(f"Error getting custom name: {e}")
+                    logger.error("Error getting custom name: %s", e)
                     self._cached_display_name = f"{self.device_info.model} ({self.device_info.serial})"
             return self._cached_display_name
         return f"{self.address[0]}:{self.address[1]}"
@@ -75,23 +183,18 @@ class QuestDevice:
     def get_id(self) -> str:
         return self.device_info.serial if self.device_info else f"{self.address[0]}:{self.address[1]}"
     
-    def add_command_result(self, success: bool, message: str):
+    def add_command_result(self, success: bool, message: str) -> CommandResult:
         with self.lock:
             self.last_response = f"{'Success' if success else 'Failed'}: {message}"
             result = CommandResult(success=success, message=message)
             self.command_history.append(result)
-            if len(self.command_history) > 50:
-                self.command_history = self.command_history[-50:]
+            return result
 
     def send_volume_command(self, percentage: int) -> bool:
-        writer = PacketWriter()
-        writer.write_u8(percentage)
-        return self.send_message(MessageType.SET_VOLUME, writer.to_bytes())
+        return self._send_encoded(MessageType.SET_VOLUME, percentage & 0xFF)
 
     def request_volume_status(self) -> bool:
         return self.send_message(MessageType.GET_VOLUME)
     
     def send_install_local_apk_command(self, local_url: str) -> bool:
-        writer = PacketWriter()
-        writer.write_string(local_url)
-        return self.send_message(MessageType.INSTALL_LOCAL_APK, writer.to_bytes())
\ No newline at end of file
+        return self._send_encoded(MessageType.INSTALL_LOCAL_APK, local_url)
\ No newline at end of file
@@ -1,21 +1,227 @@
+import html
+import io
 import os
 import sys
+import urllib.parse
 import threading
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 from functools import partial
 import socket
-from typing import Optional
+from typing import Optional, Tuple
 import logging
+import time
 
+from config.settings import Config
 from utils.logger import logger
+from utils.metrics import metrics
+from .apk_store import APKStore
+
+
+HTTP_RESPONSES = metrics.counter("quest_http_responses_total", "APK server responses by status code", ("code",))
+HTTP_BYTES_SENT = metrics.counter("quest_http_bytes_sent_total", "APK bytes sent to headsets")
+HTTP_ACTIVE_TRANSFERS = metrics.gauge("quest_http_active_transfers", "Requests holding a transfer slot")
+HTTP_QUEUED_TRANSFERS = metrics.gauge("quest_http_queued_transfers", "Requests waiting for a transfer slot")
+HTTP_TRANSFER_SECONDS = metrics.histogram("quest_http_transfer_seconds", "Time to send one response body")
 
 
 class APKHttpHandler(SimpleHTTPRequestHandler):    
+    _range: Optional[Tuple[int, int]] = None
+    
+    def do_GET(self):
+        # Queue behind the running transfers for a while, then tell the
+        # headset to come back instead of holding its connection forever
+        HTTP_QUEUED_TRANSFERS.inc()
+        try:
+            acquired = self.server.transfer_slots.acquire(timeout=Config.APK_HTTP_QUEUE_TIMEOUT)
+        finally:
+            HTTP_QUEUED_TRANSFERS.dec()
+        
+        if not acquired:
+            self.send_response(503)
+            self.send_header("Retry-After", str(Config.APK_HTTP_RETRY_AFTER))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        
+        HTTP_ACTIVE_TRANSFERS.inc()
+        try:
+            super().do_GET()
+        finally:
+            HTTP_ACTIVE_TRANSFERS.dec()
+            self.server.transfer_slots.release()
+    
+    def send_head(self):
+        path = self.translate_path(self.path)
+        # Keep the store's blobs and index private
+        if any(part.startswith('.') for part in os.path.relpath(path, self.directory).split(os.sep) if part != '.'):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        if os.path.isdir(path):
+            return super().send_head()
+        
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        
+        try:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            # Only the store's background hash; hashing here would hold a
+            # transfer slot for the whole file. Until it is indexed the file
+            # goes out without an ETag and If-Range falls back to the date
+            digest = self.server.store.lookup_hash(path, st)
+            etag = f'"{digest}"' if digest else None
+            last_modified = self.date_time_string(st.st_mtime)
+            
+            if_none_match = self.headers.get('If-None-Match')
+            if etag and if_none_match and self._etag_listed(if_none_match, etag):
+                f.close()
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return None
+            
+            self._range = None
+            range_header = self.headers.get('Range')
+            if range_header and self._if_range_holds(etag, last_modified):
+                byte_range = self._parse_range(range_header, size)
+                if byte_range is False:
+                    f.close()
+                    self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return None
+                self._range = byte_range
+            
+            if self._range:
+                start, end = self._range
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                self.send_header("Content-Length", str(end - start + 1))
+            else:
+                self.send_response(HTTPStatus.OK)
+                self.send_header("Content-Length", str(size))
+            
+            self.send_header("Content-type", self.guess_type(path))
+            self.send_header("Accept-Ranges", "bytes")
+            if etag:
+                self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            return f
+        except:
+            f.close()
+            raise
+    
+    def list_directory(self, path):
+        # Same page as SimpleHTTPRequestHandler, without the hidden entries
+        # (the .store directory) that send_head refuses to serve
+        try:
+            names = sorted((name for name in os.listdir(path) if not name.startswith('.')), key=str.lower)
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "No permission to list directory")
+            return None
+        
+        display_path = html.escape(urllib.parse.unquote(self.path, errors='surrogatepass'), quote=False)
+        title = f"Directory listing for {display_path}"
+        lines = [
+            '<!DOCTYPE HTML>', '<html lang="en">', '<head>', '<meta charset="utf-8">',
+            f'<title>{title}</title>\n</head>', f'<body>\n<h1>{title}</h1>', '<hr>\n<ul>'
+        ]
+        for name in names:
+            link = name + "/" if os.path.isdir(os.path.join(path, name)) else name
+            lines.append(f'<li><a href="{urllib.parse.quote(link, errors="surrogatepass")}">{html.escape(link, quote=False)}</a></li>')
+        lines.append('</ul>\n<hr>\n</body>\n</html>\n')
+        
+        encoded = '\n'.join(lines).encode('utf-8', 'surrogateescape')
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        return io.BytesIO(encoded)
+    
+    def _etag_listed(self, header: str, etag: str) -> bool:
+        if header.strip() == '*':
+            return True
+        # Weak comparison, as If-None-Match requires
+        return any(tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+    
+    def _if_range_holds(self, etag: Optional[str], last_modified: str) -> bool:
+        if_range = self.headers.get('If-Range')
+        if not if_range:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            return if_range == etag
+        return if_range == last_modified
+    
+    def _parse_range(self, header: str, size: int):
+        """Single byte range as (start, end), None to ignore it, False if unsatisfiable."""
+        unit, _, spec = header.partition('=')
+        if unit.strip().lower() != 'bytes' or ',' in spec:
+            # Multipart ranges aren't worth it here; a full 200 is valid
+            return None
+        
+        first, sep, last = spec.strip().partition('-')
+        if not sep:
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else size - 1
+            elif last:
+                start = max(0, size - int(last))
+                end = size - 1
+            else:
+                return None
+        except ValueError:
+            return None
+        
+        if start >= size:
+            return False
+        if end < start:
+            return None
+        return start, min(end, size - 1)
+    
+    def copyfile(self, source, outputfile):
+        # Headers are already flushed, so the body can go straight from the
+        # file to the socket without passing through Python buffers
+        started = time.perf_counter_ns()
+        try:
+            if self._range:
+                start, end = self._range
+                sent = self.connection.sendfile(source, offset=start, count=end - start + 1)
+            else:
+                sent = self.connection.sendfile(source)
+            HTTP_BYTES_SENT.inc(sent)
+            HTTP_TRANSFER_SECONDS.observe_ns(time.perf_counter_ns() - started)
+        except (ConnectionResetError, BrokenPipeError) as e:
+            logger.warning("Transfer to %s aborted: %s", self.client_address[0], e)
+    
+    def log_request(self, code='-', size='-'):
+        HTTP_RESPONSES.labels(int(code) if isinstance(code, int) else code).inc()
+        super().log_request(code, size)
+    
     def log_message(self, format, *args):
-        logger.debug(f"HTTP: {format}" % args)
+        logger.debug("HTTP: " + format, *args)
     
     def log_error(self, format, *args):
-        logger.error(f"HTTP Error: {format}" % args)
+        logger.error("HTTP Error: " + format, *args)
+
+
+class _APKServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = Config.SERVER_BACKLOG
+    
+    def __init__(self, server_address, handler_class, store: APKStore):
+        super().__init__(server_address, handler_class)
+        self.store = store
+        self.transfer_slots = threading.BoundedSemaphore(Config.APK_HTTP_MAX_TRANSFERS)
 
 
 class APKHttpServer:    
@@ -24,12 +230,13 @@ class APKHttpServer:
         self.port = port
         self.apk_directory_name = apk_directory
         self.apk_directory = self._get_absolute_apk_path(apk_directory)
-        self.server: Optional[HTTPServer] = None
+        self.server: Optional[ThreadingHTTPServer] = None
         self.thread: Optional[threading.Thread] = None
         self.running = False
         self._local_ip: Optional[str] = None
         
         os.makedirs(self.apk_directory, exist_ok=True)
+        self.store = APKStore(self.apk_directory)
     
     def _get_absolute_apk_path(self, apk_directory: str) -> str:
         if getattr(sys, 'frozen', False):
@@ -49,36 +256,37 @@ class APKHttpServer:
             
             handler_class = partial(APKHttpHandler, directory=self.apk_directory)
             
-            self.server = HTTPServer((self.host, self.port), handler_class)
-            self.server.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.server = _APKServer((self.host, self.port), handler_class, self.store)
+            self.store.start()
             
             self.running = True
-            self.thread = threading.Thread(target=self._run_server, daemon=True)
+            self.thread = threading.Thread(target=self._run_server, name="apk-http", daemon=True)
             self.thread.start()
             
         except Exception as e:
-            logger.error(f"Failed to start HTTP server: {e}")
+            logger.error("Failed to start HTTP server: %s", e)
             self.running = False
             raise
     
     def _run_server(self):
         try:
-            logger.info(f"HTTP server listening on {self.get_local_ip()}:{self.port}")
+            logger.info("HTTP server listening on %s:%s", self.get_local_ip(), self.port)
             self.server.serve_forever()
         except Exception as e:
-            logger.error(f"HTTP server error: {e}")
+            logger.error("HTTP server error: %s", e)
         finally:
             self.running = False
     
     def stop(self):
         self.running = False
+        self.store.stop()
         if self.server:
             try:
                 self.server.shutdown()
                 self.server.server_close()
                 logger.info("HTTP server stopped")
             except Exception as e:
-                logger.error(f"Error stopping HTTP server: {e}")
+                logger.error("Error stopping HTTP server: %s", e)
         
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=5)
@@ -92,7 +300,7 @@ class APKHttpServer:
                 self._local_ip = s.getsockname()[0]
                 s.close()
             except Exception as e:
-                logger.error(f"Failed to determine local IP: {e}")
+                logger.error("Failed to determine local IP: %s", e)
                 try:
                     hostname = socket.gethostname()
                     self._local_ip = socket.gethostbyname(hostname)
@@ -104,26 +312,14 @@ class APKHttpServer:
         from urllib.parse import quote
         encoded_filename = quote(filename)
         url = f"http://{self.get_local_ip()}:{self.port}/{encoded_filename}"
-        logger.info(f"Generated APK URL: {url}")
+        logger.info("Generated APK URL: %s", url)
         return url
     
     def list_apk_files(self) -> list[str]:
         try:
-            files = []
-            logger.debug(f"Listing files in: {self.apk_directory}")
-            
-            if not os.path.exists(self.apk_directory):
-                logger.error(f"APK directory does not exist: {self.apk_directory}")
-                return []
-            
-            for f in os.listdir(self.apk_directory):
-                if f.endswith('.apk') and os.path.isfile(os.path.join(self.apk_directory, f)):
-                    files.append(f)
-                    
-            logger.debug(f"Found {len(files)} APK files")
-            return sorted(files)
+            return self.store.list_names()
         except Exception as e:
-            logger.error(f"Error listing APK files: {e}")
+            logger.error("Error listing APK files: %s", e)
             return []
     
     def is_running(self) -> bool:
@@ -0,0 +1,128 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, Optional
+
+from config.settings import Config
+from .apk_store import APKStore
+from .broadcast import Broadcast
+from .models import APKMetadata, MessageType
+
+
+def parse_installed_apps(message: str) -> Dict[str, Optional[int]]:
+    """Parse a GET_INSTALLED_APPS reply of "pkg" or "pkg:versionCode" entries."""
+    packages = {}
+    for item in message.split(','):
+        package, _, version = item.strip().partition(':')
+        if not package:
+            continue
+        try:
+            packages[package] = int(version) if version else None
+        except ValueError:
+            packages[package] = None
+    return packages
+
+
+class InstallPlan:
+    def __init__(self, metadata: Optional[APKMetadata]):
+        self.metadata = metadata
+        self.install: List[str] = []
+        self.skip: Dict[str, str] = {}  # device_id -> reason
+
+
+class InstallPlanner:
+    """Decides which devices actually need an APK.
+
+    Keeps the last GET_INSTALLED_APPS snapshot per device, indexed by
+    package, and compares the installed versionCode with the store's
+    metadata. Devices are only skipped when they report a version at least
+    as new; anything unknown gets the install.
+    """
+
+    def __init__(self, server, store: APKStore):
+        self.server = server
+        self.store = store
+        self._lock = threading.Lock()
+        self._snapshots: Dict[str, float] = {}  # device_id -> time taken
+        self._packages: Dict[str, Dict[str, Optional[int]]] = {}  # device_id -> package -> version
+        self._by_package: Dict[str, Dict[str, Optional[int]]] = {}  # package -> device_id -> version
+
+    def record(self, device_id: str, packages: Dict[str, Optional[int]]):
+        with self._lock:
+            self._drop(device_id)
+            self._snapshots[device_id] = time.monotonic()
+            self._packages[device_id] = packages
+            for package, version in packages.items():
+                self._by_package.setdefault(package, {})[device_id] = version
+
+    def forget(self, device_id: str):
+        with self._lock:
+            self._drop(device_id)
+
+    def _drop(self, device_id: str):
+        self._snapshots.pop(device_id, None)
+        for package in self._packages.pop(device_id, {}):
+            devices = self._by_package.get(package)
+            if devices:
+                devices.pop(device_id, None)
+                if not devices:
+                    del self._by_package[package]
+
+    def is_fresh(self, device_id: str) -> bool:
+        taken_at = self._snapshots.get(device_id)
+        return taken_at is not None and time.monotonic() - taken_at < Config.INSTALLED_APPS_MAX_AGE
+
+    def get_installed_version(self, device_id: str, package: str) -> Optional[int]:
+        return self._by_package.get(package, {}).get(device_id)
+
+    def refresh(self, device_ids: Iterable[str]) -> Broadcast:
+        broadcast = self.server.broadcast_command(MessageType.GET_INSTALLED_APPS, device_ids=device_ids)
+        broadcast.add_done_callback(self._on_snapshots)
+        return broadcast
+
+    def _on_snapshots(self, broadcast: Broadcast):
+        for device_id, future in broadcast.futures.items():
+            if future.exception() is None and future.result().success:
+                self.record(device_id, parse_installed_apps(future.result().message))
+
+    def plan(self, metadata: Optional[APKMetadata], device_ids: Iterable[str]) -> InstallPlan:
+        plan = InstallPlan(metadata)
+        with self._lock:
+            installed = self._by_package.get(metadata.package_name, {}) if metadata else {}
+            for device_id in device_ids:
+                if metadata is None or device_id not in self._snapshots:
+                    plan.install.append(device_id)
+                    continue
+
+                version = installed.get(device_id, -1)
+                if version is not None and version >= metadata.version_code:
+                    plan.skip[device_id] = f"already has version {version}"
+                else:
+                    plan.install.append(device_id)
+        return plan
+
+    def plan_install(self, apk_name: str, device_ids: Iterable[str]) -> Future:
+        """Future resolving to an InstallPlan once metadata and snapshots are in."""
+        device_ids = list(device_ids)
+        result = Future()
+        lock = threading.Lock()
+
+        metadata_future = self.store.load_metadata(apk_name)
+        stale = [device_id for device_id in device_ids if not self.is_fresh(device_id)]
+        broadcast = self.refresh(stale) if stale else None
+
+        def finish(_=None):
+            if not metadata_future.done() or (broadcast and not broadcast.done()):
+                return
+            with lock:
+                if result.done():
+                    return
+                try:
+                    result.set_result(self.plan(metadata_future.result(), device_ids))
+                except Exception as e:
+                    result.set_exception(e)
+
+        metadata_future.add_done_callback(finish)
+        if broadcast:
+            broadcast.add_done_callback(finish)
+        return result
@@ -0,0 +1,73 @@
+from typing import Dict
+
+from utils.metrics import metrics, Metric
+from .models import MessageType
+
+PACKETS_RECEIVED = metrics.counter("quest_packets_received_total", "Frames received from headsets", ("type",))
+BYTES_RECEIVED = metrics.counter("quest_bytes_received_total", "Frame bytes received from headsets", ("type",))
+PACKETS_SENT = metrics.counter("quest_packets_sent_total", "Frames queued to headsets", ("type",))
+BYTES_SENT = metrics.counter("quest_bytes_sent_total", "Frame bytes queued to headsets", ("type",))
+PROCESS_SECONDS = metrics.histogram(
+    "quest_process_message_seconds", "Time spent handling one received frame", ("type",), max_seconds=60.0
+)
+
+CONNECTED_DEVICES = metrics.gauge("quest_connected_devices", "Headsets that completed DEVICE_CONNECTED")
+OPEN_CONNECTIONS = metrics.gauge("quest_open_connections", "Open TCP connections, including ones not identified yet")
+SEND_QUEUE_BYTES = metrics.gauge("quest_send_queue_bytes", "Bytes waiting to be written, over all connections")
+SEND_QUEUE_MAX_BYTES = metrics.gauge("quest_send_queue_max_bytes", "Largest send backlog of a single connection")
+
+
+def _type_name(opcode: int) -> str:
+    try:
+        return MessageType(opcode).name
+    except ValueError:
+        return f"0x{opcode:02x}"
+
+
+class _ByOpcode(dict):
+    """Children of a per-type metric, created on first use of each opcode."""
+
+    def __init__(self, metric: Metric):
+        super().__init__()
+        self.metric = metric
+
+    def __missing__(self, opcode: int):
+        child = self[opcode] = self.metric.labels(_type_name(opcode))
+        return child
+
+
+_packets_received = _ByOpcode(PACKETS_RECEIVED)
+_bytes_received = _ByOpcode(BYTES_RECEIVED)
+_packets_sent = _ByOpcode(PACKETS_SENT)
+_bytes_sent = _ByOpcode(BYTES_SENT)
+_process_seconds = _ByOpcode(PROCESS_SECONDS)
+
+
+def record_received(frame, elapsed_ns: int):
+    opcode = frame[0]
+    _packets_received[opcode].inc()
+    _bytes_received[opcode].inc(len(frame))
+    _process_seconds[opcode].record(elapsed_ns)
+
+
+def record_sent(buffers):
+    opcode = buffers[0][0]
+    _packets_sent[opcode].inc()
+    _bytes_sent[opcode].inc(sum(len(buffer) for buffer in buffers))
+
+
+def watch_server(server):
+    """Point the connection gauges at a running server; read at scrape time."""
+    CONNECTED_DEVICES.set_function(lambda: len(server.devices))
+    OPEN_CONNECTIONS.set_function(lambda: len(server._connections))
+    SEND_QUEUE_BYTES.set_function(lambda: sum(_queue_depths(server).values()))
+    SEND_QUEUE_MAX_BYTES.set_function(lambda: max(_queue_depths(server).values(), default=0))
+
+
+def _queue_depths(server) -> Dict[object, int]:
+    depths = {}
+    for device in list(server._connections):
+        transport = device.transport
+        buffered = transport.get_write_buffer_size() if not transport.is_closing() else 0
+        depths[device] = device.get_send_queue_size() + buffered
+    return depths
@@ -0,0 +1,108 @@
+import math
+from typing import Dict, List, Optional
+
+from config.settings import Config
+from .device import QuestDevice
+from utils.event_bus import event_bus, EventType
+
+
+class TimerWheel:
+    """Hashed timer wheel: scheduling and cancelling are O(1).
+
+    Deadlines are rounded up to whole ticks and hashed into
+    tick % len(slots). Entries more than one revolution out stay in their
+    slot until their tick comes round.
+    """
+
+    def __init__(self, tick: float, slots: int):
+        self.tick = tick
+        self.slots: List[Dict[object, int]] = [{} for _ in range(slots)]
+        self.current = 0
+        self._slot_of: Dict[object, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def schedule(self, key, delay: float):
+        self.cancel(key)
+        target = self.current + max(1, math.ceil(delay / self.tick))
+        slot = target % len(self.slots)
+        self.slots[slot][key] = target
+        self._slot_of[key] = slot
+
+    def cancel(self, key):
+        slot = self._slot_of.pop(key, None)
+        if slot is not None:
+            self.slots[slot].pop(key, None)
+
+    def advance(self) -> List:
+        """Move one tick forward and return the keys that came due."""
+        self.current += 1
+        bucket = self.slots[self.current % len(self.slots)]
+        due = [key for key, target in bucket.items() if target <= self.current]
+        for key in due:
+            del bucket[key]
+            del self._slot_of[key]
+        return due
+
+
+class LivenessMonitor:
+    """Expires connections that stopped talking, on the network loop.
+
+    A frame from a device only stamps device.last_activity. Each device
+    has one wheel entry, which rechecks it when its deadline comes due and
+    reschedules it from the last activity. A device is marked stale after
+    LIVENESS_STALE_MISSES missed heartbeats, and its transport is aborted
+    after LIVENESS_DEAD_MISSES, which removes it through the usual
+    connection_lost path.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.wheel = TimerWheel(Config.LIVENESS_TICK, Config.LIVENESS_WHEEL_SLOTS)
+        self.stale_after = Config.HEARTBEAT_INTERVAL * Config.LIVENESS_STALE_MISSES
+        self.dead_after = Config.HEARTBEAT_INTERVAL * Config.LIVENESS_DEAD_MISSES
+        self._handle: Optional[object] = None
+
+    def start(self):
+        self._handle = self.loop.call_later(self.wheel.tick, self._advance)
+
+    def stop(self):
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+
+    def watch(self, device: QuestDevice):
+        device.last_activity = self.loop.time()
+        self.wheel.schedule(device, self.stale_after)
+
+    def forget(self, device: QuestDevice):
+        self.wheel.cancel(device)
+
+    def revive(self, device: QuestDevice):
+        device.stale = False
+        self.wheel.schedule(device, self.stale_after)
+
+    def _advance(self):
+        self._handle = self.loop.call_later(self.wheel.tick, self._advance)
+        now = self.loop.time()
+        for device in self.wheel.advance():
+            self._check(device, now)
+
+    def _check(self, device: QuestDevice, now: float):
+        silent = now - device.last_activity
+
+        if silent >= self.dead_after:
+            device.stale = True
+            event_bus.emit(
+                EventType.ERROR_OCCURRED,
+                f"{device.get_display_name()} silent for {silent:.0f}s, dropping connection"
+            )
+            device.transport.abort()
+        elif silent >= self.stale_after:
+            if not device.stale:
+                device.stale = True
+                event_bus.emit(EventType.DEVICE_UPDATED, device)
+            self.wheel.schedule(device, self.dead_after - silent)
+        else:
+            self.wheel.schedule(device, self.stale_after - silent)
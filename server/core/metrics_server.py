@@ -0,0 +1,68 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from utils.logger import logger
+from utils.metrics import Registry, metrics
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404, "Not found")
+            return
+
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, server_address, registry: Registry):
+        super().__init__(server_address, MetricsHandler)
+        self.registry = registry
+
+
+class MetricsHttpServer:
+    """Serves the metrics registry in Prometheus text format on /metrics."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8890, registry: Registry = metrics):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self.server: Optional[_MetricsServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.server:
+            return
+        try:
+            self.server = _MetricsServer((self.host, self.port), self.registry)
+        except OSError as e:
+            logger.error("Failed to start metrics endpoint on %s:%s: %s", self.host, self.port, e)
+            return
+
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self.thread.start()
+        logger.info("Metrics available at http://%s:%s/metrics", self.host, self.server.server_address[1])
+
+    def stop(self):
+        # Called from both the GUI and the network thread on shutdown
+        server, self.server = self.server, None
+        if not server:
+            return
+        server.shutdown()
+        server.server_close()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=5)
@@ -11,6 +11,8 @@ class MessageType(IntEnum):
     COMMAND_RESPONSE = 0x04
     ERROR = 0x05
     VOLUME_STATUS = 0x06
+    APK_DOWNLOAD_PROGRESS = 0x07
+    APK_INSTALL_PROGRESS = 0x08
     
     LAUNCH_APP = 0x10
     EXECUTE_SHELL = 0x12
@@ -26,6 +28,21 @@ class MessageType(IntEnum):
     INSTALL_LOCAL_APK = 0x1C
 
 
+# Commands the client answers with a COMMAND_RESPONSE
+RESPONSE_COMMANDS = frozenset({
+    MessageType.LAUNCH_APP,
+    MessageType.EXECUTE_SHELL,
+    MessageType.GET_INSTALLED_APPS,
+    MessageType.GET_DEVICE_INFO,
+    MessageType.PING,
+    MessageType.DOWNLOAD_AND_INSTALL_APK,
+    MessageType.SHUTDOWN_DEVICE,
+    MessageType.UNINSTALL_APP,
+    MessageType.SET_VOLUME,
+    MessageType.INSTALL_LOCAL_APK,
+})
+
+
 @dataclass
 class DeviceInfo:
     model: str
@@ -47,7 +64,21 @@ class CommandResult:
     success: bool
     message: str
     timestamp: datetime = None
+    request_id: Optional[int] = None
+    round_trip: Optional[float] = None
     
     def __post_init__(self):
         if self.timestamp is None:
-            self.timestamp = datetime.now()
\ No newline at end of file
+            self.timestamp = datetime.now()
+
+
+@dataclass
+class APKMetadata:
+    package_name: str
+    version_code: int
+    version_name: Optional[str]
+    size: int
+    
+    def describe(self) -> str:
+        version = f"v{self.version_name} " if self.version_name else ""
+        return f"{self.package_name} {version}(code {self.version_code})"
@@ -1,28 +1,42 @@
 import struct
 
+FRAME_HEADER_SIZE = 3
+MAX_PAYLOAD_SIZE = 0xFFFF
+
+_U8 = struct.Struct('B')
+_U16 = struct.Struct('>H')
+_U32 = struct.Struct('>I')
+
 
 class PacketWriter:
     def __init__(self):
         self.data = bytearray()
     
     def write_u8(self, value: int):
-        self.data.extend(struct.pack('B', value & 0xFF))
+        self.data += _U8.pack(value & 0xFF)
     
     def write_u16(self, value: int):
-        self.data.extend(struct.pack('>H', value & 0xFFFF))
+        self.data += _U16.pack(value & 0xFFFF)
     
     def write_u32(self, value: int):
-        self.data.extend(struct.pack('>I', value & 0xFFFFFFFF))
+        self.data += _U32.pack(value & 0xFFFFFFFF)
     
     def write_string(self, value: str):
         encoded = value.encode('utf-8')
         self.write_u32(len(encoded))
-        self.data.extend(encoded)
+        self.data += encoded
     
     def write_ascii_string(self, value: str):
         encoded = value.encode('ascii')
         self.write_u16(len(encoded))
-        self.data.extend(encoded)
+        self.data += encoded
+    
+    def write_packet(self, opcode: int, payload: bytes = b''):
+        if len(payload) > MAX_PAYLOAD_SIZE:
+            raise ValueError(f"Payload too large: {len(payload)} bytes")
+        self.write_u8(opcode)
+        self.write_u16(len(payload))
+        self.data += payload
     
     def to_bytes(self) -> bytes:
         return bytes(self.data)
@@ -30,27 +44,30 @@ class PacketWriter:
 
 class PacketReader:
     def __init__(self, data: bytes):
-        self.data = data
+        self.data = memoryview(data)
         self.offset = 0
     
+    def remaining(self) -> int:
+        return len(self.data) - self.offset
+    
     def read_u8(self) -> int:
         if self.offset + 1 > len(self.data):
             raise ValueError("Not enough data")
-        value = struct.unpack_from('B', self.data, self.offset)[0]
+        value = _U8.unpack_from(self.data, self.offset)[0]
         self.offset += 1
         return value
     
     def read_u16(self) -> int:
         if self.offset + 2 > len(self.data):
             raise ValueError("Not enough data")
-        value = struct.unpack_from('>H', self.data, self.offset)[0]
+        value = _U16.unpack_from(self.data, self.offset)[0]
         self.offset += 2
         return value
     
     def read_u32(self) -> int:
         if self.offset + 4 > len(self.data):
             raise ValueError("Not enough data")
-        value = struct.unpack_from('>I', self.data, self.offset)[0]
+        value = _U32.unpack_from(self.data, self.offset)[0]
         self.offset += 4
         return value
     
@@ -58,7 +75,7 @@ class PacketReader:
         length = self.read_u32()
         if self.offset + length > len(self.data):
             raise ValueError("Not enough data")
-        value = self.data[self.offset:self.offset + length].decode('utf-8')
+        value = str(self.data[self.offset:self.offset + length], 'utf-8')
         self.offset += length
         return value
     
@@ -66,6 +83,68 @@ class PacketReader:
         length = self.read_u16()
         if self.offset + length > len(self.data):
             raise ValueError("Not enough data")
-        value = self.data[self.offset:self.offset + length].decode('ascii')
+        value = str(self.data[self.offset:self.offset + length], 'ascii')
         self.offset += length
-        return value
\ No newline at end of file
+        return value
+
+
+class FrameDecoder:
+    """Reassembles [opcode: u8][length: u16][payload] frames from a TCP stream.
+
+    Data is received straight into a reusable buffer (see get_buffer) and
+    complete frames are handed out as memoryview slices of that buffer, so
+    they are only valid until the next call to get_buffer.
+    """
+
+    def __init__(self, capacity: int = 16384):
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+        self._required = FRAME_HEADER_SIZE
+        self._min_read = max(capacity // 4, FRAME_HEADER_SIZE)
+    
+    def get_buffer(self) -> memoryview:
+        pending = self._end - self._start
+        if pending == 0:
+            self._start = self._end = 0
+        elif self._required > len(self._buffer):
+            self._grow(self._required)
+        elif (self._start + self._required > len(self._buffer) or
+              len(self._buffer) - self._end < self._min_read):
+            self._compact()
+        return self._view[self._end:]
+    
+    def buffer_updated(self, nbytes: int):
+        self._end += nbytes
+    
+    def frames(self):
+        while True:
+            available = self._end - self._start
+            if available < FRAME_HEADER_SIZE:
+                self._required = FRAME_HEADER_SIZE
+                return
+            
+            start = self._start
+            total = FRAME_HEADER_SIZE + ((self._buffer[start + 1] << 8) | self._buffer[start + 2])
+            if available < total:
+                self._required = total
+                return
+            
+            self._start += total
+            yield self._view[start:start + total]
+    
+    def _compact(self):
+        pending = self._end - self._start
+        self._buffer[:pending] = self._buffer[self._start:self._end]
+        self._start = 0
+        self._end = pending
+    
+    def _grow(self, size: int):
+        pending = self._end - self._start
+        buffer = bytearray(size)
+        buffer[:pending] = self._view[self._start:self._end]
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._start = 0
+        self._end = pending
@@ -0,0 +1,377 @@
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from config.settings import Config
+from .device import QuestDevice
+from .models import MessageType
+from utils.event_bus import event_bus, EventType
+from utils.logger import logger
+
+# Progress stages reported by the client
+STAGE_STARTED = 0
+STAGE_IN_PROGRESS = 1
+STAGE_COMPLETED = 2
+STAGE_FAILED = 3
+
+PENDING = "pending"
+DOWNLOADING = "downloading"
+INSTALLING = "installing"
+DONE = "done"
+FAILED = "failed"
+
+
+class DeviceRollout:
+    def __init__(self, device_id: str, size: int):
+        self.device_id = device_id
+        self.size = size
+        self.state = PENDING
+        self.download_percentage = 0.0
+        self.install_percentage = 0.0
+        self.started_at: Optional[float] = None
+        self.last_progress_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def downloaded_bytes(self) -> float:
+        return self.size * self.download_percentage / 100.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds until the download finishes, from the rate so far."""
+        if self.state != DOWNLOADING or not self.started_at or self.download_percentage <= 0:
+            return None
+        elapsed = time.monotonic() - self.started_at
+        return elapsed * (100.0 - self.download_percentage) / self.download_percentage
+
+
+@dataclass(frozen=True)
+class DeviceResult:
+    device_id: str
+    state: str
+    error: Optional[str]
+
+
+@dataclass(frozen=True, eq=False)
+class RolloutSnapshot:
+    """A rollout as of one ROLLOUT_UPDATED, safe to read off the network loop.
+
+    Compares by rollout_id, so pending updates for the same rollout
+    coalesce to the latest one.
+    """
+    rollout_id: int
+    apk_name: str
+    total: int
+    done: int
+    failed: int
+    downloading: int
+    window: int
+    throughput: float
+    eta: Optional[float]
+    download_etas: Tuple[Tuple[str, Optional[float]], ...]  # (device_id, seconds) per download in flight
+    results: Tuple[DeviceResult, ...]  # finished devices, in the order they finished
+    started_at: float
+    finished_at: Optional[float]
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def __eq__(self, other):
+        return isinstance(other, RolloutSnapshot) and other.rollout_id == self.rollout_id
+
+    def __hash__(self):
+        return hash(self.rollout_id)
+
+
+class Rollout:
+    """One APK pushed to a set of devices, a window of downloads at a time."""
+
+    def __init__(self, rollout_id: int, apk_name: str, url: str, size: int, device_ids: List[str]):
+        self.rollout_id = rollout_id
+        self.apk_name = apk_name
+        self.url = url
+        self.size = size
+        self.devices: Dict[str, DeviceRollout] = {device_id: DeviceRollout(device_id, size) for device_id in device_ids}
+        self.window = min(Config.ROLLOUT_INITIAL_WINDOW, Config.ROLLOUT_MAX_WINDOW)
+        self.throughput = 0.0  # aggregate bytes/s over the last adapt interval
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self._queue: Deque[str] = deque(device_ids)
+        self._downloading: Set[str] = set()
+        self._counts: Dict[str, int] = {PENDING: len(self.devices)}
+        self._results: List[DeviceResult] = []
+        self._last_bytes = 0.0
+        self._last_sample_at = self.started_at
+        self._rate_before_growth: Optional[float] = None
+
+    def count(self, state: str) -> int:
+        return self._counts.get(state, 0)
+
+    @property
+    def unfinished(self) -> int:
+        return len(self.devices) - self.count(DONE) - self.count(FAILED)
+
+    @property
+    def downloading(self) -> List[DeviceRollout]:
+        return [self.devices[device_id] for device_id in self._downloading]
+
+    def set_state(self, device: DeviceRollout, state: str):
+        """Move a device to state, keeping the per-state counts and results."""
+        if device.state == state:
+            return
+        if device.state == DOWNLOADING:
+            self._downloading.discard(device.device_id)
+        elif state == DOWNLOADING:
+            self._downloading.add(device.device_id)
+        self._counts[device.state] -= 1
+        self._counts[state] = self._counts.get(state, 0) + 1
+        device.state = state
+        if state in (DONE, FAILED):
+            self._results.append(DeviceResult(device.device_id, state, device.error))
+
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds until every download has finished at the current throughput."""
+        if self.done():
+            return 0.0
+        if self.throughput <= 0:
+            return None
+        remaining = len(self._queue) * self.size
+        remaining += sum(self.size - device.downloaded_bytes for device in self.downloading)
+        return remaining / self.throughput
+
+    def snapshot(self) -> RolloutSnapshot:
+        return RolloutSnapshot(
+            rollout_id=self.rollout_id,
+            apk_name=self.apk_name,
+            total=len(self.devices),
+            done=self.count(DONE),
+            failed=self.count(FAILED),
+            downloading=len(self._downloading),
+            window=self.window,
+            throughput=self.throughput,
+            eta=self.eta,
+            download_etas=tuple((device.device_id, device.eta) for device in self.downloading),
+            results=tuple(self._results),
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+        )
+
+
+class RolloutScheduler:
+    """Runs APK rollouts in waves on the network loop.
+
+    At most `window` devices download at once. Every adapt interval the
+    aggregate download rate is measured from the clients' progress
+    reports: below target the window grows as long as growing still buys
+    throughput, above target (or once the link stops scaling) it shrinks,
+    and a failed download halves it. Devices move out of the window as
+    soon as their download completes, so installs don't hold bandwidth.
+
+    Rollouts are only touched on the loop; other threads see them through
+    the snapshots sent with ROLLOUT_UPDATED.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.rollouts: Dict[int, Rollout] = {}
+        self._lock = threading.Lock()  # guards self.rollouts for get_active_rollouts
+        self._ids = itertools.count(1)
+        self._active_by_device: Dict[str, Rollout] = {}
+        self._snapshots: Dict[int, RolloutSnapshot] = {}
+        self._tick_handle = None
+
+    def start(self, apk_name: str, url: str, size: int, device_ids: List[str]) -> RolloutSnapshot:
+        rollout = Rollout(next(self._ids), apk_name, url, size, list(device_ids))
+        snapshot = rollout.snapshot()
+        try:
+            self.server.loop.call_soon_threadsafe(self._begin, rollout)
+        except (AttributeError, RuntimeError):
+            rollout._queue.clear()
+            for device in rollout.devices.values():
+                self._fail(rollout, device, "Server is not running")
+            self._check_finished(rollout)
+            snapshot = rollout.snapshot()
+            event_bus.emit(EventType.ROLLOUT_UPDATED, snapshot)
+        return snapshot
+
+    def _begin(self, rollout: Rollout):
+        with self._lock:
+            self.rollouts[rollout.rollout_id] = rollout
+        self._fill_window(rollout)
+        if self._tick_handle is None:
+            self._tick_handle = self.server.loop.call_later(Config.ROLLOUT_ADAPT_INTERVAL, self._tick)
+
+    def _fill_window(self, rollout: Rollout):
+        if rollout.done():
+            return
+        # Runs on the network loop, which owns server.devices; taking
+        # server.lock here would deadlock when called from a disconnect
+        while rollout._queue and len(rollout._downloading) < rollout.window:
+            device_id = rollout._queue.popleft()
+            state = rollout.devices[device_id]
+            device = self.server.devices.get(device_id)
+            if device_id in self._active_by_device:
+                self._fail(rollout, state, "Another rollout is running on this device")
+                continue
+            if device is None:
+                self._fail(rollout, state, "Device not connected")
+                continue
+
+            # Tracked, so the client's answer can fail the device and free its slot
+            broadcast = self.server.broadcaster.send(
+                MessageType.INSTALL_LOCAL_APK, (rollout.url,), {device_id: device}, timeout=Config.ROLLOUT_INSTALL_TIMEOUT
+            )
+            rollout.set_state(state, DOWNLOADING)
+            state.started_at = state.last_progress_at = time.monotonic()
+            self._active_by_device[device_id] = rollout
+            broadcast.futures[device_id].add_done_callback(
+                lambda future, rollout=rollout, state=state: self._post(self._on_install_result, rollout, state, future)
+            )
+
+        self._check_finished(rollout)
+        snapshot = rollout.snapshot()
+        if not rollout.done():
+            self._snapshots[rollout.rollout_id] = snapshot
+        event_bus.emit(EventType.ROLLOUT_UPDATED, snapshot)
+
+    def _post(self, callback, *args):
+        # Futures can complete synchronously inside _fill_window; always come back through the loop
+        try:
+            self.server.loop.call_soon_threadsafe(callback, *args)
+        except (AttributeError, RuntimeError):
+            pass
+
+    def _on_install_result(self, rollout: Rollout, state: DeviceRollout, future):
+        if self._active_by_device.get(state.device_id) is not rollout:
+            return
+
+        error = future.exception()
+        if error is None and future.result().success:
+            # Clients that skip the progress messages still finish here
+            rollout.set_state(state, DONE)
+            state.finished_at = time.monotonic()
+            self._active_by_device.pop(state.device_id, None)
+        else:
+            downloading = state.state == DOWNLOADING
+            self._fail(rollout, state, str(error) if error else (future.result().message or "Install failed"))
+            # A send that never left says nothing about the link
+            if downloading and not isinstance(error, ConnectionError):
+                self._shrink_on_failure(rollout)
+        self._fill_window(rollout)
+
+    def on_progress(self, device: QuestDevice, message_type: MessageType, message):
+        rollout = self._active_by_device.get(device.get_id())
+        if rollout is None:
+            return
+        state = rollout.devices[device.get_id()]
+        state.last_progress_at = time.monotonic()
+
+        if message_type == MessageType.APK_DOWNLOAD_PROGRESS:
+            if message.stage == STAGE_FAILED:
+                self._fail(rollout, state, "Download failed")
+                self._shrink_on_failure(rollout)
+            elif message.stage == STAGE_COMPLETED:
+                state.download_percentage = 100.0
+                rollout.set_state(state, INSTALLING)
+            else:
+                state.download_percentage = max(state.download_percentage, min(message.percentage, 100.0))
+                return
+        else:
+            if message.stage == STAGE_FAILED:
+                self._fail(rollout, state, "Install failed")
+            elif message.stage == STAGE_COMPLETED:
+                rollout.set_state(state, DONE)
+                state.finished_at = time.monotonic()
+                self._active_by_device.pop(state.device_id, None)
+            else:
+                rollout.set_state(state, INSTALLING)
+                state.download_percentage = 100.0
+                state.install_percentage = message.percentage
+                return
+
+        self._fill_window(rollout)
+
+    def on_disconnect(self, device_id: str):
+        rollout = self._active_by_device.get(device_id)
+        if rollout:
+            self._fail(rollout, rollout.devices[device_id], "Device disconnected")
+            self._fill_window(rollout)
+
+    def _fail(self, rollout: Rollout, state: DeviceRollout, error: str):
+        state.error = error
+        rollout.set_state(state, FAILED)
+        state.finished_at = time.monotonic()
+        if self._active_by_device.get(state.device_id) is rollout:
+            del self._active_by_device[state.device_id]
+
+    def _shrink_on_failure(self, rollout: Rollout):
+        rollout.window = max(1, rollout.window // 2)
+        rollout._rate_before_growth = None
+
+    def _tick(self):
+        self._tick_handle = None
+        now = time.monotonic()
+        try:
+            for rollout in list(self.rollouts.values()):
+                try:
+                    for state in rollout.devices.values():
+                        if state.state in (DOWNLOADING, INSTALLING) and now - state.last_progress_at > Config.ROLLOUT_STALL_TIMEOUT:
+                            self._fail(rollout, state, f"No progress for {Config.ROLLOUT_STALL_TIMEOUT:.0f}s")
+                            if state.download_percentage < 100.0:
+                                self._shrink_on_failure(rollout)
+                    self._adapt(rollout, now)
+                    self._fill_window(rollout)
+                except Exception as e:
+                    logger.exception("Rollout %d tick failed: %s", rollout.rollout_id, e)
+        finally:
+            # One bad rollout must not stop the stall checks for the others
+            if self.rollouts:
+                self._tick_handle = self.server.loop.call_later(Config.ROLLOUT_ADAPT_INTERVAL, self._tick)
+
+    def _adapt(self, rollout: Rollout, now: float):
+        total = sum(state.downloaded_bytes for state in rollout.devices.values() if state.state != FAILED)
+        elapsed = now - rollout._last_sample_at
+        if elapsed <= 0:
+            return
+        rate = max(0.0, total - rollout._last_bytes) / elapsed
+        rollout._last_bytes = total
+        rollout._last_sample_at = now
+        rollout.throughput = rate
+
+        if not rollout._downloading:
+            return
+
+        target = Config.ROLLOUT_TARGET_THROUGHPUT
+        if rate > target * 1.05:
+            rollout.window = max(1, rollout.window - 1)
+            rollout._rate_before_growth = None
+        elif rate < target * 0.9 and len(rollout._downloading) >= rollout.window:
+            if rollout._rate_before_growth is None or rate > rollout._rate_before_growth * 1.05:
+                rollout._rate_before_growth = rate
+                rollout.window = min(Config.ROLLOUT_MAX_WINDOW, rollout.window + 1)
+            else:
+                # The last extra download didn't add throughput; the link is full
+                rollout.window = max(1, rollout.window - 1)
+                rollout._rate_before_growth = None
+
+    def _check_finished(self, rollout: Rollout):
+        if rollout.done() or rollout._queue:
+            return
+        if not rollout.unfinished:
+            rollout.finished_at = time.monotonic()
+            with self._lock:
+                self.rollouts.pop(rollout.rollout_id, None)
+                self._snapshots.pop(rollout.rollout_id, None)
+
+    def get_active_rollouts(self) -> List[RolloutSnapshot]:
+        with self._lock:
+            return list(self._snapshots.values())
@@ -1,161 +1,237 @@
-import socket
+import asyncio
 import threading
-from typing import Dict, List, Optional, Callable
+import time
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, Optional, Set, Union
 from datetime import datetime
 
+from config.settings import Config
+from .broadcast import Broadcast, BroadcastEngine
 from .device import QuestDevice
 from .models import MessageType, DeviceInfo, BatteryInfo
-from .packet import PacketReader
+from .codec import decode_message
+from .packet import FrameDecoder
 from utils.event_bus import event_bus, EventType
 from .http_server import APKHttpServer
+from .install_planner import InstallPlanner
+from .rollout import RolloutScheduler
+from .telemetry import TelemetryStore
+from .liveness import LivenessMonitor
+from .battery_poller import BatteryPoller
+from .instrumentation import record_received, watch_server
+from .metrics_server import MetricsHttpServer
+
+
+class _DeviceProtocol(asyncio.BufferedProtocol):
+    def __init__(self, server: 'QuestControlServer'):
+        self.server = server
+        self.device: Optional[QuestDevice] = None
+        self.decoder = FrameDecoder()
+
+    def connection_made(self, transport: asyncio.Transport):
+        transport.set_write_buffer_limits(
+            high=Config.SEND_QUEUE_HIGH_WATER,
+            low=Config.SEND_QUEUE_LOW_WATER
+        )
+        self.device = QuestDevice(transport, transport.get_extra_info('peername'), self.server.loop)
+        self.server._connections.add(self.device)
+        self.server.liveness.watch(self.device)
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.decoder.get_buffer()
+
+    def buffer_updated(self, nbytes: int):
+        self.decoder.buffer_updated(nbytes)
+        self.server._process_frames(self.device, self.decoder.frames())
+
+    def pause_writing(self):
+        self.device._pause_writing()
+
+    def resume_writing(self):
+        self.device._resume_writing()
+
+    def connection_lost(self, exc: Optional[Exception]):
+        if exc and self.server.running:
+            event_bus.emit(EventType.ERROR_OCCURRED, f"Error handling client {self.device.address}: {exc}")
+        self.server._on_connection_lost(self.device)
 
 
 class QuestControlServer:
-    def __init__(self, host='0.0.0.0', port=8888):
+    def __init__(self, host='0.0.0.0', port=8888, apk_directory: str = "apks"):
         self.host = host
         self.port = port
-        self.server_socket = None
+        self.server_socket: Optional[asyncio.AbstractServer] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.broadcaster = BroadcastEngine()
+        self.liveness: Optional[LivenessMonitor] = None
+        self.battery_poller: Optional[BatteryPoller] = None
         self.devices: Dict[str, QuestDevice] = {}
         self.running = False
         self.lock = threading.Lock()
         self._server_thread = None
-        self.apk_server = APKHttpServer(host=host, port=port+1)
+        self._connections: Set[QuestDevice] = set()
+        self.apk_server = APKHttpServer(host=host, port=port+1, apk_directory=apk_directory)
+        self.install_planner = InstallPlanner(self, self.apk_server.store)
+        self.rollouts = RolloutScheduler(self)
+        self.telemetry = TelemetryStore()
+        self.metrics_server = MetricsHttpServer(host=Config.METRICS_HOST, port=port+2) if Config.METRICS_ENABLED else None
+        watch_server(self)
     
     def start(self):
         if not self.running:
-            self._server_thread = threading.Thread(target=self._run_server, daemon=True)
+            self._server_thread = threading.Thread(target=self._run_server, name="network", daemon=True)
             self._server_thread.start()
             self.apk_server.start()
+            if self.metrics_server:
+                self.metrics_server.start()
     
     def _run_server(self):
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.broadcaster.bind(self.loop)
+        self.liveness = LivenessMonitor(self.loop)
+        self.battery_poller = BatteryPoller(self.loop)
         
         try:
-            self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen(10)
+            self.server_socket = self.loop.run_until_complete(self.loop.create_server(
+                lambda: _DeviceProtocol(self),
+                self.host,
+                self.port,
+                backlog=Config.SERVER_BACKLOG,
+                reuse_address=True
+            ))
             self.running = True
+            self.liveness.start()
             
             event_bus.emit(EventType.SERVER_STARTED, {
                 'host': self.host,
                 'port': self.port
             })
             
-            while self.running:
-                try:
-                    client_socket, address = self.server_socket.accept()
-                    
-                    client_thread = threading.Thread(
-                        target=self._handle_client,
-                        args=(client_socket, address),
-                        daemon=True
-                    )
-                    client_thread.start()
-                    
-                except socket.error:
-                    if self.running:
-                        event_bus.emit(EventType.ERROR_OCCURRED, "Error accepting connection")
-                    break
+            self.loop.run_forever()
                     
         except Exception as e:
             event_bus.emit(EventType.ERROR_OCCURRED, f"Server error: {e}")
         finally:
+            self.loop.close()
             self.cleanup()
     
-    def _handle_client(self, client_socket: socket.socket, address: tuple):
-        device = QuestDevice(client_socket, address)
+    def _shutdown_loop(self):
+        if self.server_socket:
+            self.server_socket.close()
+        self.liveness.stop()
+        self.battery_poller.stop()
         
-        try:
-            while self.running and device.is_connected:
-                data = client_socket.recv(4096)
-                if not data:
-                    break
-                
-                self._process_message(device, data)
-                
-        except Exception as e:
-            event_bus.emit(EventType.ERROR_OCCURRED, f"Error handling client {address}: {e}")
-        finally:
-            with self.lock:
-                device_id = device.get_id()
-                if device_id in self.devices:
-                    del self.devices[device_id]
-                    event_bus.emit(EventType.DEVICE_DISCONNECTED, device_id)
-            
-            try:
-                client_socket.close()
-            except:
-                pass
+        for device in list(self._connections):
+            device.transport.abort()
+        
+        # Let the aborted transports run connection_lost before the loop exits
+        self.loop.call_soon(self.loop.stop)
     
-    def _process_message(self, device: QuestDevice, data: bytes):
+    def _on_connection_lost(self, device: QuestDevice):
+        device.is_connected = False
+        self._connections.discard(device)
+        self.liveness.forget(device)
+        self.battery_poller.remove(device)
+        self.broadcaster.fail_all(device, ConnectionError(f"{device.get_display_name()} disconnected"))
+        
+        device_id = device.get_id()
+        with self.lock:
+            removed = self.devices.get(device_id) is device
+            if removed:
+                del self.devices[device_id]
+        
+        if removed:
+            self.install_planner.forget(device_id)
+            self.rollouts.on_disconnect(device_id)
+            event_bus.emit(EventType.DEVICE_DISCONNECTED, device_id)
+    
+    def _process_frames(self, device: QuestDevice, frames):
+        processed = 0
+        for frame in frames:
+            started = time.perf_counter_ns()
+            self._process_message(device, frame)
+            record_received(frame, time.perf_counter_ns() - started)
+            processed += 1
+        
+        if not processed:
+            return
+        
+        device.last_activity = self.loop.time()
+        if device.stale:
+            self.liveness.revive(device)
+        
+        if device.device_info:
+            device.device_info.last_seen = datetime.now()
+            device.telemetry.record_seen()
+            event_bus.emit(EventType.DEVICE_UPDATED, device)
+    
+    def _process_message(self, device: QuestDevice, frame: memoryview):
         try:
-            reader = PacketReader(data)
-            message_type = MessageType(reader.read_u8())
+            message_type, message = decode_message(frame)
             
             if message_type == MessageType.DEVICE_CONNECTED:
-                model = reader.read_string()
-                serial = reader.read_string()
-                
                 device.device_info = DeviceInfo(
-                    model=model,
-                    serial=serial,
+                    model=message.model,
+                    serial=message.serial,
                     ip=device.address[0],
                     connected_at=datetime.now(),
                     last_seen=datetime.now()
                 )
                 
+                device.telemetry = self.telemetry.get(message.serial)
+                
                 with self.lock:
-                    self.devices[serial] = device
+                    self.devices[message.serial] = device
                 
+                self.battery_poller.add(device)
                 event_bus.emit(EventType.DEVICE_CONNECTED, device)
             
             elif message_type == MessageType.BATTERY_STATUS:
-                headset = reader.read_u8()
-                is_charging = bool(reader.read_u8())
-                
                 device.battery_info = BatteryInfo(
-                    headset_level=headset,
-                    is_charging=is_charging,
+                    headset_level=message.headset_level,
+                    is_charging=message.is_charging,
                     last_updated=datetime.now()
                 )
+                device.last_battery_at = self.loop.time()
+                if device.telemetry:
+                    device.telemetry.record_battery(message.headset_level, message.is_charging)
                 
                 event_bus.emit(EventType.BATTERY_UPDATED, device)
                 
             elif message_type == MessageType.COMMAND_RESPONSE:
-                success = bool(reader.read_u8())
-                message = reader.read_string()
-                device.add_command_result(success, message)
+                if message.request_id is not None:
+                    device.echoes_request_ids = True
+                
+                result = device.add_command_result(message.success, message.message)
+                self.broadcaster.resolve(device, message.request_id, result)
+                if result.round_trip is not None and device.telemetry:
+                    device.telemetry.record_rtt(result.round_trip)
                 
                 event_bus.emit(EventType.COMMAND_EXECUTED, {
                     'device': device,
-                    'success': success,
-                    'message': message
+                    'success': message.success,
+                    'message': message.message
                 })
                 
             elif message_type == MessageType.ERROR:
-                error_message = reader.read_string()
-                device.add_command_result(False, error_message)
+                device.add_command_result(False, message.message)
                 
-                event_bus.emit(EventType.ERROR_OCCURRED, f"{device.get_display_name()}: {error_message}")
+                event_bus.emit(EventType.ERROR_OCCURRED, f"{device.get_display_name()}: {message.message}")
 
             elif message_type == MessageType.VOLUME_STATUS:
-                volume_percentage = reader.read_u8()
-                current_volume = reader.read_u8()
-                max_volume = reader.read_u8()
-
                 device.volume_info = {
-                    'percentage': volume_percentage,
-                    'current': current_volume,
-                    'max': max_volume
+                    'percentage': message.percentage,
+                    'current': message.current,
+                    'max': message.max
                 }
                 
+            elif message_type in (MessageType.APK_DOWNLOAD_PROGRESS, MessageType.APK_INSTALL_PROGRESS):
+                self.rollouts.on_progress(device, message_type, message)
+                
             elif message_type == MessageType.HEARTBEAT:
                 pass
                 
-            if device.device_info:
-                device.device_info.last_seen = datetime.now()
-                event_bus.emit(EventType.DEVICE_UPDATED, device)
-                
         except Exception as e:
             event_bus.emit(EventType.ERROR_OCCURRED, f"Error processing message: {e}")
     
@@ -167,11 +243,18 @@ class QuestControlServer:
         with self.lock:
             return self.devices.get(device_id)
     
-    def broadcast_command(self, message_type: MessageType, command: str = "") -> Dict[str, bool]:
-        results = {}
-        for device_id, device in self.devices.items():
-            results[device_id] = device.send_command(message_type, command)
-        return results
+    def broadcast_command(self, message_type: MessageType, command: Union[str, int] = "",
+                          device_ids: Optional[Iterable[str]] = None) -> Broadcast:
+        with self.lock:
+            if device_ids is None:
+                targets = dict(self.devices)
+            else:
+                targets = {device_id: self.devices.get(device_id) for device_id in device_ids}
+        
+        return self.broadcaster.send(message_type, (command,) if command != "" else (), targets)
+    
+    def send_request(self, device_id: str, message_type: MessageType, command: str = "") -> Future:
+        return self.broadcast_command(message_type, command, device_ids=[device_id]).futures[device_id]
     
     def get_available_apks(self) -> List[str]:
         return self.apk_server.list_apk_files()
@@ -180,21 +263,18 @@ class QuestControlServer:
         self.running = False
         
         with self.lock:
-            for device in self.devices.values():
-                try:
-                    device.socket.close()
-                except:
-                    pass
             self.devices.clear()
         
-        if self.server_socket:
+        if self.loop and not self.loop.is_closed():
             try:
-                self.server_socket.close()
-            except:
+                self.loop.call_soon_threadsafe(self._shutdown_loop)
+            except RuntimeError:
                 pass
         
         event_bus.emit(EventType.SERVER_STOPPED)
     
     def cleanup(self):
         self.stop()
-        self.apk_server.stop()
\ No newline at end of file
+        self.apk_server.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
\ No newline at end of file
@@ -0,0 +1,146 @@
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import Config
+
+
+class RingBuffer:
+    """Fixed-capacity time series backed by preallocated arrays.
+
+    One timestamp column plus any number of typed value columns, all
+    written at the same slot, so appends are O(1) and never reallocate.
+    Timestamps only grow, so time lookups are a binary search.
+    """
+
+    def __init__(self, capacity: int, **columns: str):
+        self.capacity = capacity
+        self.times = array('d', [0.0]) * capacity
+        self.columns: Dict[str, array] = {name: array(code, [0]) * capacity for name, code in columns.items()}
+        self._head = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp: float, *values):
+        slot = self._head
+        self.times[slot] = timestamp
+        for column, value in zip(self.columns.values(), values):
+            column[slot] = value
+        self._head = (slot + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def _slot(self, index: int) -> int:
+        return (self._head - self._count + index) % self.capacity
+
+    def latest(self, column: Optional[str] = None):
+        if not self._count:
+            return None
+        slot = (self._head - 1) % self.capacity
+        return self.times[slot] if column is None else self.columns[column][slot]
+
+    def index_since(self, timestamp: float) -> int:
+        """Index of the oldest sample at or after timestamp (len if none)."""
+        low, high = 0, self._count
+        times = self.times
+        while low < high:
+            mid = (low + high) // 2
+            if times[self._slot(mid)] < timestamp:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def value_at(self, index: int, column: Optional[str] = None):
+        slot = self._slot(index)
+        return self.times[slot] if column is None else self.columns[column][slot]
+
+    def since(self, timestamp: float, column: Optional[str] = None) -> List:
+        data = self.times if column is None else self.columns[column]
+        index = self.index_since(timestamp)
+        if index >= self._count:
+            return []
+        start = self._slot(index)
+        end = self._head
+        if start < end:
+            return data[start:end].tolist()
+        return data[start:].tolist() + data[:end].tolist()
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+
+
+class DeviceTelemetry:
+    def __init__(self, device_id: str):
+        self.device_id = device_id
+        self.battery = RingBuffer(Config.TELEMETRY_CAPACITY, level='b', charging='b')
+        self.rtt = RingBuffer(Config.TELEMETRY_RTT_CAPACITY, seconds='f')
+        self.seen = RingBuffer(Config.TELEMETRY_CAPACITY)
+        self.last_seen = 0.0
+
+    def record_battery(self, level: int, charging: bool, timestamp: Optional[float] = None):
+        # Levels arrive as a u8; the column is signed, so keep them to a percentage
+        self.battery.append(timestamp or time.time(), max(0, min(level, 100)), charging)
+
+    def record_rtt(self, seconds: float, timestamp: Optional[float] = None):
+        self.rtt.append(timestamp or time.time(), seconds)
+
+    def record_seen(self, timestamp: Optional[float] = None):
+        # Presence history at a coarse resolution; last_seen stays exact
+        timestamp = timestamp or time.time()
+        self.last_seen = timestamp
+        latest = self.seen.latest()
+        if latest is None or timestamp - latest >= Config.TELEMETRY_SEEN_RESOLUTION:
+            self.seen.append(timestamp)
+
+    def battery_change(self, window: float, now: Optional[float] = None) -> Optional[int]:
+        """Battery level now minus the level at the start of the window."""
+        now = now or time.time()
+        start = self.battery.index_since(now - window)
+        if start >= len(self.battery):
+            return None
+        return self.battery.latest('level') - self.battery.value_at(start, 'level')
+
+    def average_rtt(self, window: float, now: Optional[float] = None) -> Optional[float]:
+        samples = self.rtt.since((now or time.time()) - window, 'seconds')
+        return sum(samples) / len(samples) if samples else None
+
+
+class TelemetryStore:
+    """Telemetry for every device seen since startup, keyed by device ID.
+
+    Buffers survive reconnects, and memory stays bounded at a few KB per
+    device no matter how long the server runs.
+    """
+
+    def __init__(self):
+        self._devices: Dict[str, DeviceTelemetry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, device_id: str) -> DeviceTelemetry:
+        telemetry = self._devices.get(device_id)
+        if telemetry is None:
+            with self._lock:
+                telemetry = self._devices.setdefault(device_id, DeviceTelemetry(device_id))
+        return telemetry
+
+    def find(self, device_id: str) -> Optional[DeviceTelemetry]:
+        return self._devices.get(device_id)
+
+    def battery_drops(self, threshold: int = 10, window: float = 3600.0) -> List[Tuple[str, int]]:
+        """Devices whose battery fell by more than threshold points within window seconds."""
+        now = time.time()
+        drops = []
+        for device_id, telemetry in list(self._devices.items()):
+            change = telemetry.battery_change(window, now)
+            if change is not None and -change > threshold:
+                drops.append((device_id, -change))
+        return sorted(drops, key=lambda item: item[1], reverse=True)
+
+    def silent_devices(self, max_age: float) -> List[str]:
+        cutoff = time.time() - max_age
+        return [device_id for device_id, telemetry in list(self._devices.items()) if telemetry.last_seen < cutoff]
@@ -1,15 +1,14 @@
 import dearpygui.dearpygui as dpg
-import threading
-import time
 import sys
 import os
 
 from config.settings import Config
 from core.server import QuestControlServer
-from core.models import MessageType
 from gui.windows.main_window import MainWindow
 from gui.themes.dark_theme import apply_dark_theme
+from utils.device_names import device_name_manager
 from utils.event_bus import event_bus, EventType
+from utils.profiler import profiler
 
 def resource_path(relative_path):
     try:
@@ -57,33 +56,21 @@ class QuestControlGUI:
         dpg.set_primary_window("main_window", True)
         
         self.server.start()
-        
-        update_thread = threading.Thread(target=self._update_loop, daemon=True)
-        update_thread.start()
+        profiler.install_signal_handler()
         
         while dpg.is_dearpygui_running():
+            event_bus.gui_dispatcher.drain()
+            profiler.poll_signal()
+            self.main_window.render_frame()
             dpg.render_dearpygui_frame()
         
         self.running = False
         self.cleanup()
     
-    def _update_loop(self):
-        last_battery_update = 0
-        
-        while self.running:
-            current_time = time.time()
-            
-            if current_time - last_battery_update > self.config.BATTERY_UPDATE_INTERVAL:
-                devices = self.server.get_connected_devices()
-                for device in devices:
-                    device.send_message(MessageType.REQUEST_BATTERY)
-                last_battery_update = current_time
-            
-            time.sleep(0.1)
-    
     def cleanup(self):
         if self.server:
             self.server.cleanup()
+        device_name_manager.flush()
         
         dpg.destroy_context()
 
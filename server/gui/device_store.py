@@ -0,0 +1,153 @@
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+
+def _ip_key(ip: str) -> Tuple[int, ...]:
+    try:
+        return tuple(int(part) for part in ip.split('.'))
+    except ValueError:
+        return (256,)
+
+
+class DeviceStore:
+    """Connected devices as parallel columns, one row per device.
+
+    Sort orders are built per column on demand and kept until that column
+    changes, and the filtered, sorted view is only rebuilt when one of its
+    inputs changes, so scrolling a large fleet never re-sorts.
+    """
+
+    SORT_KEYS = ('name', 'ip', 'battery')
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self.ips: List[str] = []
+        self.battery = array('b')  # -1 while unknown
+        self.charging = array('b')
+
+        self._rows: Dict[str, int] = {}
+        self._name_keys: List[str] = []
+        self._ip_keys: List[Tuple[int, ...]] = []
+        self._search: List[str] = []
+
+        self._orders: Dict[str, Optional[List[int]]] = dict.fromkeys(self.SORT_KEYS)
+        self._view: Optional[List[int]] = None
+        self.sort_key = 'name'
+        self.descending = False
+        self.filter_text = ''
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._rows
+
+    def set(self, device_id: str, name: str, ip: str, battery: int, charging: bool) -> bool:
+        # The wire carries a u8; anything past 100 would overflow the signed column
+        battery = max(-1, min(battery, 100))
+        row = self._rows.get(device_id)
+        if row is None:
+            self._rows[device_id] = len(self.ids)
+            self.ids.append(device_id)
+            self.names.append(name)
+            self.ips.append(ip)
+            self.battery.append(battery)
+            self.charging.append(charging)
+            self._name_keys.append(name.lower())
+            self._ip_keys.append(_ip_key(ip))
+            self._search.append(f"{name}\0{ip}".lower())
+            self._invalidate(*self.SORT_KEYS)
+            return True
+
+        changed = []
+        if self.names[row] != name:
+            self.names[row] = name
+            self._name_keys[row] = name.lower()
+            changed.append('name')
+        if self.ips[row] != ip:
+            self.ips[row] = ip
+            self._ip_keys[row] = _ip_key(ip)
+            changed.append('ip')
+        if self.battery[row] != battery:
+            self.battery[row] = battery
+            changed.append('battery')
+        if self.charging[row] != charging:
+            self.charging[row] = charging
+            changed.append('charging')
+
+        if 'name' in changed or 'ip' in changed:
+            self._search[row] = f"{name}\0{ip}".lower()
+        if changed:
+            self._invalidate(*changed)
+        return bool(changed)
+
+    def remove(self, device_id: str) -> bool:
+        row = self._rows.pop(device_id, None)
+        if row is None:
+            return False
+
+        # Move the last row into the hole so removal stays O(1)
+        last = len(self.ids) - 1
+        for column in (self.ids, self.names, self.ips, self.battery, self.charging,
+                       self._name_keys, self._ip_keys, self._search):
+            column[row] = column[last]
+            column.pop()
+        if row != last:
+            self._rows[self.ids[row]] = row
+
+        self._invalidate(*self.SORT_KEYS)
+        return True
+
+    def clear(self):
+        for device_id in list(self.ids):
+            self.remove(device_id)
+
+    def set_sort(self, key: str, descending: bool = False):
+        if key not in self.SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {key}")
+        if (key, descending) != (self.sort_key, self.descending):
+            self.sort_key = key
+            self.descending = descending
+            self._view = None
+            self.version += 1
+
+    def set_filter(self, text: str):
+        text = text.strip().lower()
+        if text != self.filter_text:
+            self.filter_text = text
+            self._view = None
+            self.version += 1
+
+    def view(self) -> List[int]:
+        """Row indexes after filtering and sorting."""
+        if self._view is None:
+            order = self._order(self.sort_key)
+            if self.descending:
+                order = order[::-1]
+            if self.filter_text:
+                search = self._search
+                text = self.filter_text
+                order = [row for row in order if text in search[row]]
+            self._view = order
+        return self._view
+
+    def _order(self, key: str) -> List[int]:
+        order = self._orders[key]
+        if order is None:
+            column = {'name': self._name_keys, 'ip': self._ip_keys, 'battery': self.battery}[key]
+            order = sorted(range(len(self.ids)), key=column.__getitem__)
+            self._orders[key] = order
+        return order
+
+    def _invalidate(self, *columns: str):
+        affects_view = False
+        for column in columns:
+            if column in self._orders:
+                self._orders[column] = None
+            if column == self.sort_key or (self.filter_text and column in ('name', 'ip')):
+                affects_view = True
+        if affects_view:
+            self._view = None
+            self.version += 1
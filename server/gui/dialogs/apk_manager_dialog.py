@@ -1,10 +1,10 @@
 import dearpygui.dearpygui as dpg
 import os
-import shutil
 from typing import Optional
 import sys
 
 from core.server import QuestControlServer
+from utils.event_bus import event_bus
 from utils.logger import logger
 
 
@@ -68,9 +68,7 @@ class APKManagerDialog:
         dpg.delete_item(self.file_list_tag, children_only=True)
         
         apk_files = self.server.get_available_apks()
-        apk_dir = getattr(self.server.apk_server, 'apk_directory', 'apks')
-        if apk_dir is None:
-            apk_dir = 'apks'
+        store = self.server.apk_server.store
         
         if not apk_files:
             dpg.add_text(
@@ -84,12 +82,17 @@ class APKManagerDialog:
             with dpg.group(horizontal=True, parent=self.file_list_tag):
                 dpg.add_text(apk_file, color=(200, 200, 200))
                 
-                try:
-                    file_path = os.path.join(apk_dir, apk_file)
-                    size_mb = os.path.getsize(file_path) / (1024 * 1024)
+                entry = store.get_entry(apk_file)
+                if entry:
+                    size_mb = entry['size'] / (1024 * 1024)
                     dpg.add_text(f"({size_mb:.1f} MB)", color=(150, 150, 150))
-                except:
-                    pass
+                
+                future = store.load_metadata(apk_file)
+                if future.done():
+                    if future.result():
+                        dpg.add_text(future.result().describe(), color=(150, 150, 150))
+                else:
+                    future.add_done_callback(self._on_metadata_loaded)
                 
                 dpg.add_button(
                     label="Remove",
@@ -98,6 +101,13 @@ class APKManagerDialog:
                     small=True
                 )
     
+    def _on_metadata_loaded(self, future):
+        event_bus.gui_dispatcher.post(lambda _: self._refresh_if_open())
+    
+    def _refresh_if_open(self):
+        if self.file_list_tag and dpg.does_item_exist(self.file_list_tag):
+            self._populate_file_list()
+    
     def _remove_button_callback(self, sender, app_data, user_data):
         filename = user_data
         self._remove_file(filename)
@@ -122,7 +132,7 @@ class APKManagerDialog:
                 dpg.add_file_extension(".apk", color=(0, 255, 0, 255), custom_text="[APK]")
                 
         except Exception as e:
-            logger.error(f"Error showing file dialog: {e}")
+            logger.error("Error showing file dialog: %s", e)
             self._show_manual_input_dialog()
     
     def _show_manual_input_dialog(self):
@@ -171,61 +181,40 @@ class APKManagerDialog:
                     if file_path.lower().endswith('.apk'):
                         self._copy_apk_to_server(file_path)
                     else:
-                        logger.warning(f"Skipped non-APK file: {file_name}")
+                        logger.warning("Skipped non-APK file: %s", file_name)
             
             dpg.delete_item(sender)
             self._refresh_list()
         except Exception as e:
-            logger.error(f"Error processing file selection: {e}")
+            logger.error("Error processing file selection: %s", e)
     
     def _copy_apk_to_server(self, source_path: str):
         try:
             filename = os.path.basename(source_path)
-            apk_dir = getattr(self.server.apk_server, 'apk_directory', 'apks')
-            if apk_dir is None:
-                apk_dir = 'apks'
-            
-            os.makedirs(apk_dir, exist_ok=True)
-            
-            dest_path = os.path.join(apk_dir, filename)
-            
-            shutil.copy2(source_path, dest_path)
-            logger.info(f"Copied APK to server: {filename}")
+            digest = self.server.apk_server.store.import_file(source_path, filename)
+            logger.info("Added APK to server: %s (%s)", filename, digest[:12])
         except Exception as e:
-            logger.error(f"Error copying APK: {e}")
+            logger.error("Error copying APK: %s", e)
     
     def _refresh_list(self):
         self._populate_file_list()
     
     def _remove_file(self, filename: str):
         try:
-            logger.info(f"Attempting to remove file: {filename}")
+            logger.info("Attempting to remove file: %s", filename)
             
             if filename is None:
                 logger.error("Filename is None!")
                 return
             
-            if hasattr(self.server, 'apk_server') and hasattr(self.server.apk_server, 'apk_directory'):
-                apk_dir = self.server.apk_server.apk_directory
-            else:
-                if getattr(sys, 'frozen', False):
-                    base_path = os.path.dirname(sys.executable)
-                else:
-                    base_path = os.path.abspath('.')
-                apk_dir = os.path.join(base_path, 'apks')
-                
-            file_path = os.path.join(apk_dir, filename)
-            
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                logger.info(f"Removed APK: {filename}")
-                self._refresh_list()
+            if self.server.apk_server.store.remove(filename):
+                logger.info("Removed APK: %s", filename)
             else:
-                logger.error(f"File not found: {file_path}")
-                self._refresh_list()
+                logger.error("File not found: %s", filename)
+            self._refresh_list()
                 
         except Exception as e:
-            logger.error(f"Error removing APK {filename}: {str(e)}")
+            logger.error("Error removing APK %s: %s", filename, e)
             self._refresh_list()
     
     def _open_apk_folder(self):
@@ -253,4 +242,4 @@ class APKManagerDialog:
             else:
                 subprocess.Popen(["xdg-open", apk_dir])
         except Exception as e:
-            logger.error(f"Error opening folder: {e}")
\ No newline at end of file
+            logger.error("Error opening folder: %s", e)
\ No newline at end of file
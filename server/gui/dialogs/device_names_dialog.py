@@ -3,7 +3,6 @@ from typing import Dict
 
 from core.server import QuestControlServer
 from utils.device_names import device_name_manager
-from utils.event_bus import event_bus, EventType
 
 
 class DeviceNamesDialog:
@@ -105,18 +104,6 @@ class DeviceNamesDialog:
     def _remove_device(self, serial: str):
         device_name_manager.remove_name(serial)
         
-        for device in self.server.get_connected_devices():
-            if device.device_info and device.device_info.serial == serial:
-                device.invalidate_name_cache()
-                
-                event_bus.emit(EventType.DEVICE_NAME_CHANGED, {
-                    'device_id': device.get_id(),
-                    'serial': serial,
-                    'new_name': None
-                })
-                event_bus.emit(EventType.DEVICE_UPDATED, device)
-                break
-        
         if serial in self.row_tags and dpg.does_item_exist(self.row_tags[serial]):
             dpg.delete_item(self.row_tags[serial])
         
@@ -126,31 +113,11 @@ class DeviceNamesDialog:
             del self.row_tags[serial]
     
     def _save_all(self):
-        changes_made = False
-        changed_serials = []
-        
+        names = {}
         for serial, input_tag in self.input_tags.items():
             if dpg.does_item_exist(input_tag):
-                new_name = dpg.get_value(input_tag).strip()
-                old_name = device_name_manager.get_name(serial) or ""
-                
-                if new_name != old_name:
-                    device_name_manager.set_name(serial, new_name)
-                    changes_made = True
-                    changed_serials.append(serial)
+                names[serial] = dpg.get_value(input_tag)
         
-        if changes_made:
-            for serial in changed_serials:
-                for device in self.server.get_connected_devices():
-                    if device.device_info and device.device_info.serial == serial:
-                        device.invalidate_name_cache()
-                        
-                        event_bus.emit(EventType.DEVICE_NAME_CHANGED, {
-                            'device_id': device.get_id(),
-                            'serial': serial,
-                            'new_name': device_name_manager.get_name(serial)
-                        })
-                        event_bus.emit(EventType.DEVICE_UPDATED, device)
-                        break
+        device_name_manager.set_names(names)
         
         dpg.delete_item(self.dialog_tag)
\ No newline at end of file
@@ -3,6 +3,9 @@ from typing import Optional, List, Dict
 import os
 
 from core.server import QuestControlServer
+from core.broadcast import Broadcast
+from core.install_planner import parse_installed_apps
+from core.rollout import RolloutSnapshot, DONE
 from core.models import MessageType
 from gui.windows.device_list import DeviceListPanel
 from config.settings import Config
@@ -16,6 +19,7 @@ class ActionsPanel:
         self.parent_tag = parent_tag
         self.log_tag = None
         self.combatica_apps_cache: Dict[str, List[str]] = {}  # device_id -> list of combatica packages
+        self._logged_rollout_results: Dict[int, int] = {}  # rollout_id -> results already logged
         
         self._setup_ui()
         self._subscribe_events()
@@ -65,6 +69,7 @@ class ActionsPanel:
                     callback=self._show_install_local_apk_dialog,
                     width=135
                 )
+            self.rollout_status_tag = dpg.add_text("", color=(150, 150, 150), wrap=400)
             
             dpg.add_spacer(height=10)
             
@@ -121,8 +126,8 @@ class ActionsPanel:
             )
     
     def _subscribe_events(self):
-        event_bus.subscribe(EventType.COMMAND_EXECUTED, self._on_command_executed)
-        event_bus.subscribe(EventType.DEVICE_UPDATED, self._on_device_updated)
+        event_bus.subscribe(EventType.DEVICE_UPDATED, self._on_device_updated, event_bus.gui_dispatcher)
+        event_bus.subscribe(EventType.ROLLOUT_UPDATED, self._on_rollout_updated, event_bus.gui_dispatcher)
 
     def _on_device_updated(self, device):
         # Update volume slider if this is one of our selected devices
@@ -130,24 +135,34 @@ class ActionsPanel:
         if device in selected_devices and device.volume_info:
             dpg.set_value(self.volume_slider_tag, device.volume_info['percentage'])
             
-    def _on_command_executed(self, data: dict):
-        device = data.get('device')
-        success = data.get('success')
-        message = data.get('message', '')
+    def _request_installed_apps(self, devices):
+        for device in devices:
+            future = self.server.send_request(device.get_id(), MessageType.GET_INSTALLED_APPS)
+            future.add_done_callback(
+                lambda f, device=device: event_bus.gui_dispatcher.post(self._on_installed_apps, (device, f))
+            )
+    
+    def _on_installed_apps(self, response):
+        device, future = response
+        if future.exception():
+            self._log_message(f"Could not fetch apps from {device.get_display_name()}: {future.exception()}", "warning")
+            return
         
-        if device and success and ',' in message:
-            # This might be an app list response
-            apps = message.split(',')
-            combatica_apps = [app.strip() for app in apps if app.strip().startswith('com.CombaticaLTD.')]
-            
-            if combatica_apps:
-                device_id = device.get_id()
-                self.combatica_apps_cache[device_id] = combatica_apps
-                self._log_message(f"Found {len(combatica_apps)} Combatica apps on {device.get_display_name()}", "success")
-                for app in combatica_apps:
-                    # Display only the product name
-                    product_name = app.replace("com.CombaticaLTD.", "")
-                    self._log_message(f"  - {product_name}", "info")
+        result = future.result()
+        if not result.success:
+            return
+        
+        packages = parse_installed_apps(result.message)
+        self.server.install_planner.record(device.get_id(), packages)
+        combatica_apps = [app for app in packages if app.startswith('com.CombaticaLTD.')]
+        self.combatica_apps_cache[device.get_id()] = combatica_apps
+        
+        if combatica_apps:
+            self._log_message(f"Found {len(combatica_apps)} Combatica apps on {device.get_display_name()}", "success")
+            for app in combatica_apps:
+                # Display only the product name
+                product_name = app.replace("com.CombaticaLTD.", "")
+                self._log_message(f"  - {product_name}", "info")
     
     def _log_message(self, message: str, level: str = "info"):
         colors = {
@@ -165,6 +180,15 @@ class ActionsPanel:
             )
             dpg.add_text(message, color=colors.get(level, colors['info']))
     
+    def _log_broadcast_summary(self, action: str, broadcast: Broadcast):
+        total = len(broadcast.futures)
+        failed = len(broadcast.failed)
+        level = "success" if not failed else "warning"
+        self._log_message(
+            f"{action}: {total - failed}/{total} devices responded OK in {broadcast.duration:.1f}s",
+            level
+        )
+    
     def _get_target_devices(self, action: str):
         selected = self.device_list.get_selected_devices()
         if not selected:
@@ -188,9 +212,11 @@ class ActionsPanel:
         if not devices:
             return
         
-        for device in devices:
-            device.send_message(MessageType.PING)
-            self._log_message(f"Pinging {device.get_display_name()}", "info")
+        self._log_message(f"Pinging {len(devices)} device(s)", "info")
+        broadcast = self.server.broadcast_command(MessageType.PING, device_ids=[device.get_id() for device in devices])
+        broadcast.add_done_callback(
+            lambda b: event_bus.gui_dispatcher.post(lambda _: self._log_broadcast_summary("Ping", b))
+        )
     
     def _show_launch_combatica_app_dialog(self):
         devices = self._get_target_devices("launch Combatica app")
@@ -198,8 +224,7 @@ class ActionsPanel:
             return
         
         self._log_message("Fetching installed Combatica apps...", "info")
-        for device in devices:
-            device.send_message(MessageType.GET_INSTALLED_APPS)
+        self._request_installed_apps(devices)
         
         self._show_launch_dialog_with_apps(devices)
     
@@ -250,7 +275,6 @@ class ActionsPanel:
                     for device in devices:
                         device_id = device.get_id()
                         if device_id in self.combatica_apps_cache and full_package in self.combatica_apps_cache[device_id]:
-                            device.send_command(MessageType.LAUNCH_APP, full_package)
                             self._log_message(
                                 f"Launching {selected_display} on {device.get_display_name()}", 
                                 "combatica"
@@ -260,7 +284,17 @@ class ActionsPanel:
                                 f"Warning: {selected_display} not found on {device.get_display_name()}, attempting launch anyway", 
                                 "warning"
                             )
-                            device.send_command(MessageType.LAUNCH_APP, full_package)
+                    
+                    broadcast = self.server.broadcast_command(
+                        MessageType.LAUNCH_APP,
+                        full_package,
+                        device_ids=[device.get_id() for device in devices]
+                    )
+                    broadcast.add_done_callback(
+                        lambda b: event_bus.gui_dispatcher.post(
+                            lambda _: self._log_broadcast_summary(f"Launch {selected_display}", b)
+                        )
+                    )
             dpg.delete_item(dialog_tag)
         
         def refresh_apps():
@@ -269,8 +303,7 @@ class ActionsPanel:
             dpg.set_value(loading_text_tag, "Fetching apps...")
             dpg.configure_item(loading_text_tag, color=(150, 150, 150))
             
-            for device in devices:
-                device.send_message(MessageType.GET_INSTALLED_APPS)
+            self._request_installed_apps(devices)
             
             dpg.set_frame_callback(dpg.get_frame_count() + 60, callback=lambda: update_app_list())
         
@@ -323,8 +356,7 @@ class ActionsPanel:
             return
         
         self._log_message("Fetching installed Combatica apps...", "info")
-        for device in devices:
-            device.send_message(MessageType.GET_INSTALLED_APPS)
+        self._request_installed_apps(devices)
         
         self._show_uninstall_dialog_with_apps(devices)
     
@@ -378,29 +410,28 @@ class ActionsPanel:
                     
                     self._log_message(f"Uninstalling {selected_display}...", "warning")
                     
+                    targets = []
                     for device in devices:
                         device_id = device.get_id()
                         if device_id in self.combatica_apps_cache and full_package in self.combatica_apps_cache[device_id]:
-                            success = device.send_uninstall_command(full_package)
-                            if success:
-                                self._log_message(
-                                    f"Uninstall command sent to {device.get_display_name()}", 
-                                    "combatica"
-                                )
-                                self.combatica_apps_cache[device_id] = [
-                                    app for app in self.combatica_apps_cache[device_id] 
-                                    if app != full_package
-                                ]
-                            else:
-                                self._log_message(
-                                    f"Failed to send uninstall command to {device.get_display_name()}", 
-                                    "error"
-                                )
+                            targets.append(device_id)
+                            self.combatica_apps_cache[device_id] = [
+                                app for app in self.combatica_apps_cache[device_id] 
+                                if app != full_package
+                            ]
                         else:
                             self._log_message(
                                 f"Skipping {device.get_display_name()} - {selected_display} not installed", 
                                 "info"
                             )
+                    
+                    if targets:
+                        broadcast = self.server.broadcast_command(MessageType.UNINSTALL_APP, full_package, device_ids=targets)
+                        broadcast.add_done_callback(
+                            lambda b: event_bus.gui_dispatcher.post(
+                                lambda _: self._log_broadcast_summary(f"Uninstall {selected_display}", b)
+                            )
+                        )
             else:
                 dpg.delete_item(dialog_tag)
         
@@ -410,8 +441,7 @@ class ActionsPanel:
             dpg.set_value(loading_text_tag, "Fetching apps...")
             dpg.configure_item(loading_text_tag, color=(150, 150, 150))
             
-            for device in devices:
-                device.send_message(MessageType.GET_INSTALLED_APPS)
+            self._request_installed_apps(devices)
             
             dpg.set_frame_callback(dpg.get_frame_count() + 60, callback=lambda: update_app_list())
         
@@ -464,11 +494,11 @@ class ActionsPanel:
             return
         
         for device in devices:
-            device.send_message(MessageType.GET_INSTALLED_APPS)
             self._log_message(
                 f"Checking Combatica apps on {device.get_display_name()}", 
                 "combatica"
             )
+        self._request_installed_apps(devices)
     
     def _show_install_apk_dialog(self):
         devices = self._get_target_devices("install APK")
@@ -531,18 +561,16 @@ class ActionsPanel:
     
         dialog_tag = dpg.generate_uuid()
         combo_tag = dpg.generate_uuid()
+        details_tag = dpg.generate_uuid()
     
         def install_local_apk():
             selected_apk = dpg.get_value(combo_tag)
             if selected_apk and selected_apk != "Select an APK...":
-                apk_url = self.server.apk_server.get_apk_url(selected_apk)
-                
-                for device in devices:
-                    device.send_install_local_apk_command(apk_url)
-                    self._log_message(
-                        f"Installing {selected_apk} on {device.get_display_name()}", 
-                        "info"
-                    )
+                self._log_message(f"Checking which devices need {selected_apk}...", "info")
+                plan = self.server.install_planner.plan_install(selected_apk, [d.get_id() for d in devices])
+                plan.add_done_callback(lambda f: event_bus.gui_dispatcher.post(
+                    self._run_install_plan, (selected_apk, devices, f)
+                ))
             dpg.delete_item(dialog_tag)
     
         device_names = ", ".join([d.get_display_name() for d in devices])
@@ -564,8 +592,10 @@ class ActionsPanel:
                 tag=combo_tag,
                 items=["Select an APK..."] + apk_files,
                 default_value="Select an APK...",
-                width=-1
+                width=-1,
+                callback=lambda: self._show_apk_details(details_tag, combo_tag)
             )
+            dpg.add_text("", tag=details_tag, color=(150, 150, 150))
                         
             dpg.add_spacer(height=10)
         
@@ -577,6 +607,96 @@ class ActionsPanel:
                     width=75
                 )
     
+    def _run_install_plan(self, data):
+        apk_name, devices, future = data
+        if future.exception():
+            self._log_message(f"Could not plan install of {apk_name}: {future.exception()}", "error")
+            return
+        
+        plan = future.result()
+        for device in devices:
+            device_id = device.get_id()
+            if device_id in plan.skip:
+                self._log_message(f"Skipping {device.get_display_name()}: {plan.skip[device_id]}", "info")
+            else:
+                self.server.install_planner.forget(device_id)
+        
+        if plan.skip:
+            self._log_message(
+                f"{apk_name}: installing on {len(plan.install)} devices, {len(plan.skip)} already up to date",
+                "success"
+            )
+        if not plan.install:
+            return
+        
+        entry = self.server.apk_server.store.get_entry(apk_name)
+        apk_url = self.server.apk_server.get_apk_url(apk_name)
+        rollout = self.server.rollouts.start(apk_name, apk_url, entry['size'] if entry else 0, plan.install)
+        self._log_message(
+            f"Rolling out {apk_name} to {len(plan.install)} devices, {rollout.window} at a time",
+            "info"
+        )
+    
+    def _on_rollout_updated(self, rollout: RolloutSnapshot):
+        logged = self._logged_rollout_results.get(rollout.rollout_id, 0)
+        for result in rollout.results[logged:]:
+            device = self.server.get_device_by_id(result.device_id)
+            name = device.get_display_name() if device else result.device_id
+            if result.state == DONE:
+                self._log_message(f"Installed {rollout.apk_name} on {name}", "success")
+            else:
+                self._log_message(f"{rollout.apk_name} failed on {name}: {result.error}", "error")
+        self._logged_rollout_results[rollout.rollout_id] = len(rollout.results)
+        
+        if rollout.finished:
+            del self._logged_rollout_results[rollout.rollout_id]
+            duration = rollout.finished_at - rollout.started_at
+            self._log_message(
+                f"{rollout.apk_name}: installed on {rollout.done}/{rollout.total} devices in {duration:.0f}s",
+                "success" if rollout.done == rollout.total else "warning"
+            )
+            dpg.set_value(self.rollout_status_tag, "")
+            return
+        
+        eta = rollout.eta
+        eta_text = f"{int(eta // 60)}m {int(eta % 60)}s" if eta is not None else "estimating"
+        dpg.set_value(
+            self.rollout_status_tag,
+            f"{rollout.apk_name}: {rollout.done}/{rollout.total} done, "
+            f"{rollout.downloading} downloading (window {rollout.window}), "
+            f"{rollout.throughput / (1024 * 1024):.1f} MB/s, ETA {eta_text}"
+        )
+    
+    def _show_apk_details(self, details_tag, combo_tag):
+        if not dpg.does_item_exist(details_tag):
+            return
+        
+        apk_name = dpg.get_value(combo_tag)
+        store = self.server.apk_server.store
+        entry = store.get_entry(apk_name)
+        if not entry:
+            dpg.set_value(details_tag, "")
+            return
+        
+        size_mb = entry['size'] / (1024 * 1024)
+        if not entry['hash']:
+            dpg.set_value(details_tag, f"{size_mb:.1f} MB, indexing...")
+            return
+        
+        future = store.load_metadata(apk_name)
+        if not future.done():
+            dpg.set_value(details_tag, f"{size_mb:.1f} MB, reading manifest...")
+            future.add_done_callback(lambda f: event_bus.gui_dispatcher.post(
+                lambda _: self._show_apk_details(details_tag, combo_tag)
+            ))
+            return
+        
+        metadata = future.result()
+        if metadata:
+            dpg.set_value(details_tag, f"{metadata.describe()}, {size_mb:.1f} MB")
+        else:
+            dpg.set_value(details_tag, f"{size_mb:.1f} MB, manifest unreadable")
+    
     def _power_action(self, action: str):
         if action != "restart":
             return
@@ -587,17 +707,22 @@ class ActionsPanel:
         
         self._log_message(f"Sending {action} command to {len(devices)} devices", "warning")
         
-        for device in devices:
-            device.send_shutdown_command(action)
-            self._log_message(f"Sent {action} command to {device.get_display_name()}", "warning")
+        broadcast = self.server.broadcast_command(
+            MessageType.SHUTDOWN_DEVICE, action, device_ids=[device.get_id() for device in devices]
+        )
+        broadcast.add_done_callback(
+            lambda b: event_bus.gui_dispatcher.post(lambda _: self._log_broadcast_summary(f"Power {action}", b))
+        )
 
     def _on_volume_changed(self, sender, value):
         devices = self._get_target_devices("volume control")
         if not devices:
             return
     
-        for device in devices:
-            device.send_volume_command(value)
+        # Tracked so the replies can't be taken for answers to other commands
+        self.server.broadcast_command(
+            MessageType.SET_VOLUME, int(value) & 0xFF, device_ids=[device.get_id() for device in devices]
+        )
     
         self._log_message(f"Setting volume to {value}% on {len(devices)} device(s)", "info")
 
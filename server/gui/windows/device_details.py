@@ -62,10 +62,10 @@ class DeviceDetailsPanel:
             )
     
     def _subscribe_events(self):
-        event_bus.subscribe(EventType.DEVICE_UPDATED, self._on_device_updated)
-        event_bus.subscribe(EventType.BATTERY_UPDATED, self._on_battery_updated)
-        event_bus.subscribe(EventType.COMMAND_EXECUTED, self._on_command_executed)
-        event_bus.subscribe(EventType.DEVICE_NAME_CHANGED, self._on_device_name_changed)
+        event_bus.subscribe(EventType.DEVICE_UPDATED, self._on_device_updated, event_bus.gui_dispatcher)
+        event_bus.subscribe(EventType.BATTERY_UPDATED, self._on_battery_updated, event_bus.gui_dispatcher)
+        event_bus.subscribe(EventType.COMMAND_EXECUTED, self._on_command_executed, event_bus.gui_dispatcher)
+        event_bus.subscribe(EventType.DEVICE_NAME_CHANGED, self._on_device_name_changed, event_bus.gui_dispatcher)
     
     def _on_device_updated(self, device: QuestDevice):
         if device and (not self.current_device or device.get_id() == self.current_device.get_id()):
@@ -82,8 +82,7 @@ class DeviceDetailsPanel:
             self._add_command_to_history(data.get('success'), data.get('message'))
     
     def _on_device_name_changed(self, data: dict):
-        device_id = data.get('device_id')
-        if device_id and self.current_device and device_id == self.current_device.get_id():
+        if self.current_device and self.current_device.get_id() in data.get('names', ()):
             self.current_device.invalidate_name_cache()
             dpg.set_value(self.detail_tags['name'], f"Device: {self.current_device.get_display_name()}")
     
@@ -140,7 +139,7 @@ class DeviceDetailsPanel:
         
         dpg.delete_item(self.detail_tags['command_history'], children_only=True)
         
-        for cmd in self.current_device.command_history[-10:]:  # Show last 10
+        for cmd in list(self.current_device.command_history)[-10:]:  # Show last 10
             self._add_command_to_history(cmd.success, cmd.message, False)
     
     def _add_command_to_history(self, success: bool, message: str, prepend: bool = True):
@@ -1,22 +1,73 @@
 import dearpygui.dearpygui as dpg
-from datetime import datetime
-from typing import Dict, Optional, Set
+import time
+from typing import Dict, List, Optional, Set
 
+from config.settings import Config
 from core.device import QuestDevice
 from core.server import QuestControlServer
+from gui.device_store import DeviceStore
 from gui.themes.dark_theme import get_status_colors
 from utils.event_bus import event_bus, EventType
 
+MIN_POOL_ROWS = 16
+
+
+class _RowSlot:
+    """One pooled table row, rebound to whichever device scrolls into it."""
+    
+    def __init__(self, row_tag, checkbox_tag, device_tag, ip_tag, battery_tag):
+        self.row_tag = row_tag
+        self.checkbox_tag = checkbox_tag
+        self.device_tag = device_tag
+        self.ip_tag = ip_tag
+        self.battery_tag = battery_tag
+        self.device_id: Optional[str] = None
+        self.values = (None,) * 6
+    
+    def paint(self, device_id: str, checked: bool, name: str, ip: str, battery: str, color):
+        previous = self.values
+        if previous[0] is None:
+            dpg.configure_item(self.row_tag, show=True)
+        if checked != previous[1]:
+            dpg.set_value(self.checkbox_tag, checked)
+        if name != previous[2]:
+            dpg.configure_item(self.device_tag, label=name)
+        if ip != previous[3]:
+            dpg.set_value(self.ip_tag, ip)
+        if battery != previous[4]:
+            dpg.set_value(self.battery_tag, battery)
+        if color and color != previous[5]:
+            dpg.configure_item(self.battery_tag, color=color)
+        
+        self.device_id = device_id
+        self.values = (device_id, checked, name, ip, battery, color)
+    
+    def hide(self):
+        if self.values[0] is not None:
+            dpg.configure_item(self.row_tag, show=False)
+        self.device_id = None
+        self.values = (None,) * 6
+
 
 class DeviceListPanel:
     def __init__(self, server: QuestControlServer, parent_tag: str):
         self.server = server
         self.parent_tag = parent_tag
         self.selected_device_ids: Set[str] = set()
-        self.device_rows: Dict[str, str] = {}
+        self.store = DeviceStore()
         self.table_tag = None
         self.colors = get_status_colors()
-        self.checkbox_tags: Dict[str, str] = {}  # device_id -> checkbox_tag
+        self._slots: List[_RowSlot] = []
+        self._column_keys: Dict[int, str] = {}  # column tag -> store sort key
+        self._top_spacer = None
+        self._bottom_spacer = None
+        self._row_height = Config.DEVICE_LIST_ROW_HEIGHT
+        self._first_row = -1
+        self._painted_version = -1
+        self._needs_paint = True
+        self._dirty: Dict[str, QuestDevice] = {}
+        self._render_interval = 1.0 / Config.REFRESH_RATE
+        self._last_render = 0.0
         
         self._setup_ui()
         self._subscribe_events()
@@ -39,8 +90,17 @@ class DeviceListPanel:
                 )
                 dpg.add_text("", tag="selected_count_text")
             
+            dpg.add_input_text(
+                hint="Filter by name or IP",
+                callback=lambda s, v: self._on_filter_changed(v),
+                width=-1
+            )
+            
             dpg.add_spacer(height=5)
             
+            # Only enough rows to fill the viewport exist as widgets. Spacer
+            # rows above and below stand in for the rest so the scrollbar
+            # still reflects the whole fleet.
             self.table_tag = dpg.generate_uuid()
             with dpg.table(
                 tag=self.table_tag,
@@ -56,149 +116,220 @@ class DeviceListPanel:
                 reorderable=True,
                 hideable=True,
                 sortable=True,
+                sort_callback=self._on_sort,
                 context_menu_in_body=True
             ):
-                dpg.add_table_column(label="Select", width_fixed=True, init_width_or_weight=50)
-                dpg.add_table_column(label="Device", width_stretch=True, init_width_or_weight=0.0)
-                dpg.add_table_column(label="IP", width_fixed=True, init_width_or_weight=120)
-                dpg.add_table_column(label="Battery", width_fixed=True, init_width_or_weight=80)
+                dpg.add_table_column(label="Select", width_fixed=True, init_width_or_weight=50, no_sort=True)
+                self._column_keys[dpg.add_table_column(
+                    label="Device", width_stretch=True, init_width_or_weight=0.0, default_sort=True
+                )] = 'name'
+                self._column_keys[dpg.add_table_column(
+                    label="IP", width_fixed=True, init_width_or_weight=120
+                )] = 'ip'
+                self._column_keys[dpg.add_table_column(
+                    label="Battery", width_fixed=True, init_width_or_weight=80
+                )] = 'battery'
+                
+                with dpg.table_row(show=False) as self._top_spacer:
+                    dpg.add_spacer(height=1)
+                with dpg.table_row(show=False) as self._bottom_spacer:
+                    dpg.add_spacer(height=1)
             
+            self._grow_pool(MIN_POOL_ROWS)
             self._update_selected_count()
     
     def _subscribe_events(self):
-        event_bus.subscribe(EventType.DEVICE_CONNECTED, self._on_device_connected)
-        event_bus.subscribe(EventType.DEVICE_DISCONNECTED, self._on_device_disconnected)
-        event_bus.subscribe(EventType.DEVICE_UPDATED, self._on_device_updated)
-        event_bus.subscribe(EventType.DEVICE_NAME_CHANGED, self._on_device_name_changed)
-        event_bus.subscribe(EventType.BATTERY_UPDATED, self._on_battery_updated)
-        event_bus.subscribe(EventType.SERVER_STOPPED, self._on_server_stopped)
+        event_bus.subscribe(EventType.DEVICE_CONNECTED, self._on_device_connected, event_bus.gui_dispatcher)
+        event_bus.subscribe(EventType.DEVICE_DISCONNECTED, self._on_device_disconnected, event_bus.gui_dispatcher)
+        event_bus.subscribe(EventType.DEVICE_UPDATED, self._on_device_updated, event_bus.gui_dispatcher)
+        event_bus.subscribe(EventType.DEVICE_NAME_CHANGED, self._on_device_name_changed, event_bus.gui_dispatcher)
+        event_bus.subscribe(EventType.BATTERY_UPDATED, self._on_battery_updated, event_bus.gui_dispatcher)
+        event_bus.subscribe(EventType.SERVER_STOPPED, self._on_server_stopped, event_bus.gui_dispatcher)
     
     def _on_device_connected(self, device: QuestDevice):
-        self._add_device_row(device)
+        self._dirty[device.get_id()] = device
     
     def _on_device_disconnected(self, device_id: str):
-        if device_id in self.device_rows:
-            dpg.delete_item(self.device_rows[device_id])
-            del self.device_rows[device_id]
+        self._dirty.pop(device_id, None)
+        if self.store.remove(device_id):
             self.selected_device_ids.discard(device_id)
-            if device_id in self.checkbox_tags:
-                del self.checkbox_tags[device_id]
+            self._needs_paint = True
             self._update_selected_count()
     
     def _on_device_updated(self, device: QuestDevice):
-        self._update_device_row(device)
+        self._dirty[device.get_id()] = device
     
     def _on_battery_updated(self, device: QuestDevice):
-        self._update_device_row(device)
+        self._dirty[device.get_id()] = device
     
     def _on_device_name_changed(self, data: dict):
-        device_id = data.get('device_id')
-        if device_id and device_id in self.device_rows:
-            device = self.server.get_device_by_id(device_id)
-            if device:
-                device.invalidate_name_cache()
-                self._update_device_row(device)
+        for device_id in data.get('names', ()):
+            if device_id in self.store:
+                device = self.server.get_device_by_id(device_id)
+                if device:
+                    device.invalidate_name_cache()
+                    self._dirty[device_id] = device
     
     def _on_server_stopped(self, data=None):
-        for row_tag in list(self.device_rows.values()):
-            dpg.delete_item(row_tag)
-        self.device_rows.clear()
+        self.store.clear()
         self.selected_device_ids.clear()
-        self.checkbox_tags.clear()
+        self._dirty.clear()
+        self._needs_paint = True
         self._update_selected_count()
     
-    def _add_device_row(self, device: QuestDevice):
-        device_id = device.get_id()
-        if device_id in self.device_rows:
+    def _on_filter_changed(self, text: str):
+        self.store.set_filter(text)
+    
+    def _on_sort(self, sender, sort_specs):
+        if not sort_specs:
             return
+        column, direction = sort_specs[0]
+        key = self._column_keys.get(column)
+        if key:
+            self.store.set_sort(key, descending=direction < 0)
+    
+    def render_frame(self):
+        now = time.monotonic()
+        if now - self._last_render < self._render_interval:
+            return
+        self._last_render = now
         
-        row_tag = dpg.generate_uuid()
-        self.device_rows[device_id] = row_tag
+        if self._dirty:
+            dirty, self._dirty = self._dirty, {}
+            added = False
+            for device_id, device in dirty.items():
+                added = added or device_id not in self.store
+                if self.store.set(device_id, *self._get_columns(device)):
+                    self._needs_paint = True
+            if added:
+                self._update_selected_count()
         
-        with dpg.table_row(parent=self.table_tag, tag=row_tag):
-            checkbox_tag = dpg.add_checkbox(
-                default_value=device_id in self.selected_device_ids,
-                callback=lambda s, v: self._on_device_checkbox_changed(device_id, v)
-            )
-            self.checkbox_tags[device_id] = checkbox_tag
-            
-            device_tag = dpg.add_selectable(
-                label=device.get_display_name(),
-                callback=lambda: self._on_device_clicked(device_id),
-                span_columns=True
-            )
-            
-            ip_tag = dpg.add_text(device.device_info.ip if device.device_info else "Unknown")
-            
-            battery_tag = dpg.add_text(self._get_battery_text(device))
-            
-            dpg.set_item_user_data(row_tag, {
-                'checkbox': checkbox_tag,
-                'device': device_tag,
-                'ip': ip_tag,
-                'battery': battery_tag
-            })
-    
-    def _update_device_row(self, device: QuestDevice):
-        device_id = device.get_id()
-        if device_id not in self.device_rows:
-            self._add_device_row(device)
-            return
+        view = self.store.view()
+        visible_rows = int(dpg.get_item_rect_size(self.table_tag)[1] // self._row_height) + 2
+        if visible_rows > len(self._slots):
+            self._grow_pool(visible_rows)
         
-        row_tag = self.device_rows[device_id]
-        tags = dpg.get_item_user_data(row_tag)
+        scroll = dpg.get_y_scroll(self.table_tag)
+        first = min(int(scroll // self._row_height), max(0, len(view) - len(self._slots)))
+        first = max(0, first)
         
-        if tags:
-            if 'device' in tags:
-                dpg.configure_item(tags['device'], label=device.get_display_name())
-            
-            if 'battery' in tags:
-                dpg.set_value(tags['battery'], self._get_battery_text(device))
+        if self._needs_paint or first != self._first_row or self.store.version != self._painted_version:
+            self._paint(view, first)
+    
+    def _paint(self, view: List[int], first: int):
+        store = self.store
+        count = len(view)
+        shown = min(len(self._slots), count - first)
+        
+        self._set_spacer(self._top_spacer, first)
+        self._set_spacer(self._bottom_spacer, count - first - shown)
+        
+        for index, slot in enumerate(self._slots):
+            if index >= shown:
+                slot.hide()
+                continue
             
-            if device.battery_info and 'battery' in tags:
-                level = device.battery_info.headset_level
-                if level < 20:
-                    color = self.colors['battery_critical']
-                elif level < 50:
-                    color = self.colors['battery_low']
-                else:
-                    color = self.colors['connected']
-                dpg.configure_item(tags['battery'], color=color)
-    
-    def _get_battery_text(self, device: QuestDevice) -> str:
-        if not device.battery_info:
+            row = view[first + index]
+            device_id = store.ids[row]
+            battery = store.battery[row]
+            slot.paint(
+                device_id,
+                device_id in self.selected_device_ids,
+                store.names[row],
+                store.ips[row],
+                self._get_battery_text(battery, store.charging[row]),
+                self._get_battery_color(battery)
+            )
+        
+        self._first_row = first
+        self._painted_version = store.version
+        self._needs_paint = False
+    
+    def _set_spacer(self, spacer, rows: int):
+        if rows > 0:
+            dpg.configure_item(spacer, show=True, height=rows * self._row_height)
+        else:
+            dpg.configure_item(spacer, show=False)
+    
+    def _grow_pool(self, size: int):
+        while len(self._slots) < size:
+            with dpg.table_row(
+                parent=self.table_tag,
+                before=self._bottom_spacer,
+                height=self._row_height,
+                show=False
+            ) as row_tag:
+                slot = _RowSlot(
+                    row_tag,
+                    dpg.add_checkbox(callback=self._on_slot_checkbox_changed),
+                    dpg.add_selectable(label="", callback=self._on_slot_clicked, span_columns=True),
+                    dpg.add_text(""),
+                    dpg.add_text("")
+                )
+            dpg.set_item_user_data(slot.checkbox_tag, slot)
+            dpg.set_item_user_data(slot.device_tag, slot)
+            self._slots.append(slot)
+        self._needs_paint = True
+    
+    def _get_columns(self, device: QuestDevice):
+        battery = device.battery_info
+        name = device.get_display_name()
+        return (
+            f"{name} (not responding)" if device.stale else name,
+            device.device_info.ip if device.device_info else "Unknown",
+            battery.headset_level if battery else -1,
+            battery.is_charging if battery else False
+        )
+    
+    def _get_battery_text(self, level: int, charging: bool) -> str:
+        if level < 0:
             return "N/A"
         
-        charging = " [C]" if device.battery_info.is_charging else ""
-        return f"{device.battery_info.headset_level}%{charging}"
+        suffix = " [C]" if charging else ""
+        return f"{level}%{suffix}"
     
-    def _on_device_checkbox_changed(self, device_id: str, checked: bool):
+    def _get_battery_color(self, level: int):
+        if level < 0:
+            return None
+        if level < 20:
+            return self.colors['battery_critical']
+        if level < 50:
+            return self.colors['battery_low']
+        return self.colors['connected']
+    
+    def _on_slot_checkbox_changed(self, sender, checked: bool, slot: _RowSlot):
+        if slot.device_id is None:
+            return
         if checked:
-            self.selected_device_ids.add(device_id)
+            self.selected_device_ids.add(slot.device_id)
         else:
-            self.selected_device_ids.discard(device_id)
+            self.selected_device_ids.discard(slot.device_id)
+        slot.values = slot.values[:1] + (checked,) + slot.values[2:]
         self._update_selected_count()
     
-    def _on_device_clicked(self, device_id: str):
-        device = self.server.get_device_by_id(device_id)
+    def _on_slot_clicked(self, sender, app_data, slot: _RowSlot):
+        # The highlight belongs to the slot, not the device, so don't keep it
+        dpg.set_value(sender, False)
+        if slot.device_id is None:
+            return
+        device = self.server.get_device_by_id(slot.device_id)
         if device:
             event_bus.emit(EventType.DEVICE_UPDATED, device)
     
     def _select_all(self):
-        for device_id, checkbox_tag in self.checkbox_tags.items():
-            dpg.set_value(checkbox_tag, True)
-            self.selected_device_ids.add(device_id)
+        store = self.store
+        self.selected_device_ids.update(store.ids[row] for row in store.view())
+        self._needs_paint = True
         self._update_selected_count()
     
     def _deselect_all(self):
-        for checkbox_tag in self.checkbox_tags.values():
-            dpg.set_value(checkbox_tag, False)
         self.selected_device_ids.clear()
+        self._needs_paint = True
         self._update_selected_count()
     
     def _update_selected_count(self):
         count = len(self.selected_device_ids)
-        total = len(self.device_rows)
+        total = len(self.store)
         text = f"Selected: {count}/{total}" if total > 0 else ""
         if dpg.does_item_exist("selected_count_text"):
             dpg.set_value("selected_count_text", text)
@@ -215,4 +346,4 @@ class DeviceListPanel:
             device = self.server.get_device_by_id(device_id)
             if device:
                 devices.append(device)
-        return devices
\ No newline at end of file
+        return devices
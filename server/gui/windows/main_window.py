@@ -7,6 +7,7 @@ from .device_details import DeviceDetailsPanel
 from .actions_panel import ActionsPanel
 from .dev_actions_panel import DevActionsPanel
 from utils.event_bus import event_bus, EventType
+from utils.profiler import profiler
 from config.settings import Config
 
 class MainWindow:
@@ -17,6 +18,7 @@ class MainWindow:
         self.actions_panel = None
         self.dev_actions_panel = None
         self.status_tag = None
+        self.profiler_menu_tag = None
         
         self._setup_ui()
         self._subscribe_events()
@@ -42,6 +44,9 @@ class MainWindow:
                 
                 with dpg.menu(label="Dev"):
                     dpg.add_menu_item(label="Toggle Developer Mode", callback=self._toggle_dev_mode)
+                    self.profiler_menu_tag = dpg.add_menu_item(
+                        label=self._profiler_label(), callback=self._toggle_profiler
+                    )
                 with dpg.menu(label="Help"):
                     dpg.add_menu_item(label="About", callback=self._show_about)
             
@@ -75,10 +80,15 @@ class MainWindow:
                                     dev_container
                                 )
     
+    def render_frame(self):
+        if self.device_list_panel:
+            self.device_list_panel.render_frame()
+    
     def _subscribe_events(self):
-        event_bus.subscribe(EventType.SERVER_STARTED, self._on_server_started)
-        event_bus.subscribe(EventType.SERVER_STOPPED, self._on_server_stopped)
-        event_bus.subscribe(EventType.ERROR_OCCURRED, self._on_error)
+        event_bus.subscribe(EventType.SERVER_STARTED, self._on_server_started, event_bus.gui_dispatcher)
+        event_bus.subscribe(EventType.SERVER_STOPPED, self._on_server_stopped, event_bus.gui_dispatcher)
+        event_bus.subscribe(EventType.ERROR_OCCURRED, self._on_error, event_bus.gui_dispatcher)
+        profiler.add_listener(lambda paths: event_bus.gui_dispatcher.post(self._on_profile_written, paths))
     
     def _on_server_started(self, data: dict):
         if self.status_tag and dpg.does_item_exist(self.status_tag):
@@ -123,6 +133,27 @@ class MainWindow:
                 if self.actions_panel:
                     self.actions_panel._log_message("Developer mode disabled", "info")
     
+    def _profiler_label(self) -> str:
+        if profiler.is_running():
+            return "Stop Profiler"
+        return f"Profile All Threads ({Config.PROFILER_DURATION:.0f}s)"
+    
+    def _toggle_profiler(self):
+        if profiler.is_running():
+            profiler.stop()
+            return
+        
+        profiler.start()
+        dpg.configure_item(self.profiler_menu_tag, label=self._profiler_label())
+        if self.actions_panel:
+            self.actions_panel._log_message(f"Profiling for {Config.PROFILER_DURATION:.0f}s...", "info")
+    
+    def _on_profile_written(self, paths):
+        if self.profiler_menu_tag and dpg.does_item_exist(self.profiler_menu_tag):
+            dpg.configure_item(self.profiler_menu_tag, label=self._profiler_label())
+        if self.actions_panel:
+            self.actions_panel._log_message(f"Profile saved: {', '.join(paths)}", "success")
+    
     def _start_server(self):
         if not self.server.running:
             self.server.start()
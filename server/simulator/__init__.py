@@ -0,0 +1,12 @@
+from .profiles import LatencyProfile, PROFILES
+from .headset import FleetStats, SimulationConfig, VirtualHeadset
+from .fleet import Fleet
+
+__all__ = [
+    'LatencyProfile',
+    'PROFILES',
+    'FleetStats',
+    'SimulationConfig',
+    'VirtualHeadset',
+    'Fleet'
+]
\ No newline at end of file
@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import Config
+from simulator.fleet import Fleet
+from simulator.headset import SimulationConfig
+from simulator.profiles import PROFILES
+
+
+def raise_file_limit(needed: int):
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        if target < needed:
+            print(f"Open file limit is {target}; some of the {needed} connections will fail")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m simulator", description="Simulate a fleet of headsets")
+    parser.add_argument("-n", "--count", type=int, default=500, help="number of virtual headsets")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=Config.DEFAULT_PORT)
+    parser.add_argument("--duration", type=float, default=0, help="seconds to run, 0 for until Ctrl+C")
+    parser.add_argument("--ramp", type=float, default=200.0, help="new connections per second")
+    parser.add_argument("--latency", choices=sorted(PROFILES), default="wifi")
+    parser.add_argument("--heartbeat", type=float, default=Config.HEARTBEAT_INTERVAL, help="heartbeat interval in seconds")
+    parser.add_argument("--battery-push", type=float, default=0, help="push BATTERY_STATUS every N seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of commands that fail")
+    parser.add_argument("--download-rate", type=float, default=0, help="per-headset download cap in MB/s")
+    parser.add_argument("--install-time", type=float, default=5.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="connection drops per headset per hour")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="silent stalls per headset per hour")
+    parser.add_argument("--reconnect-delay", type=float, default=5.0)
+    parser.add_argument("--serial-prefix", default="SIM")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--report", type=float, default=5.0, help="seconds between status lines")
+    args = parser.parse_args()
+
+    config = SimulationConfig(
+        host=args.host,
+        port=args.port,
+        heartbeat_interval=args.heartbeat,
+        battery_push_interval=args.battery_push,
+        latency=PROFILES[args.latency],
+        failure_rate=args.failure_rate,
+        download_rate=args.download_rate * 1024 * 1024,
+        install_time=args.install_time,
+        drop_rate=args.drop_rate,
+        stall_rate=args.stall_rate,
+        reconnect_delay=args.reconnect_delay,
+        serial_prefix=args.serial_prefix,
+        seed=args.seed
+    )
+
+    # One socket per headset plus one per concurrent download
+    raise_file_limit(args.count * 2 + 64)
+
+    fleet = Fleet(args.count, config, ramp_rate=args.ramp, report_interval=args.report)
+    try:
+        asyncio.run(fleet.run(args.duration or None))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
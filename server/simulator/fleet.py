@@ -0,0 +1,68 @@
+import asyncio
+import time
+from typing import List, Optional
+
+from .headset import FleetStats, SimulationConfig, VirtualHeadset
+
+
+class Fleet:
+    """N virtual headsets sharing one event loop.
+
+    Connections are opened at ramp_rate per second so the server sees a
+    realistic reconnect storm rather than one SYN flood, and a one-line
+    summary is printed every report_interval seconds.
+    """
+
+    def __init__(self, count: int, config: SimulationConfig, ramp_rate: float = 200.0,
+                 report_interval: float = 5.0):
+        self.config = config
+        self.stats = FleetStats()
+        self.headsets = [VirtualHeadset(index, config, self.stats) for index in range(count)]
+        self.ramp_rate = ramp_rate
+        self.report_interval = report_interval
+        self._tasks: List[asyncio.Task] = []
+
+    async def run(self, duration: Optional[float] = None):
+        started = time.monotonic()
+        reporter = asyncio.ensure_future(self._report(started))
+        try:
+            await self._ramp_up()
+            if duration:
+                await asyncio.sleep(max(0.0, duration - (time.monotonic() - started)))
+            else:
+                await asyncio.gather(*self._tasks)
+        finally:
+            reporter.cancel()
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._print_summary(started)
+
+    async def _ramp_up(self):
+        delay = 1.0 / self.ramp_rate if self.ramp_rate else 0.0
+        for headset in self.headsets:
+            self._tasks.append(asyncio.ensure_future(headset.run()))
+            if delay:
+                await asyncio.sleep(delay)
+
+    async def _report(self, started: float):
+        last_bytes = 0
+        last_time = started
+        while True:
+            await asyncio.sleep(self.report_interval)
+            now = time.monotonic()
+            stats = self.stats
+            rate = (stats.bytes_downloaded - last_bytes) / (now - last_time)
+            last_bytes, last_time = stats.bytes_downloaded, now
+            print(f"[{now - started:6.0f}s] connected {stats.connected}/{len(self.headsets)}  "
+                  f"connects {stats.connects}  drops {stats.disconnects}  "
+                  f"frames in/out {stats.frames_in}/{stats.frames_out}  commands {stats.commands}  "
+                  f"downloads {stats.downloads} ({stats.download_failures} failed, {rate / 1024 / 1024:.1f} MB/s)")
+
+    def _print_summary(self, started: float):
+        stats = self.stats
+        elapsed = time.monotonic() - started
+        print(f"Ran {len(self.headsets)} headsets for {elapsed:.0f}s: {stats.connects} connects, "
+              f"{stats.disconnects} disconnects, {stats.commands} commands answered, "
+              f"{stats.downloads} downloads ({stats.bytes_downloaded / 1024 / 1024:.1f} MB), "
+              f"{stats.download_failures} failed downloads")
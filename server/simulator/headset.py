@@ -0,0 +1,290 @@
+import asyncio
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from core.codec import SCHEMAS, U32, encode_message
+from core.models import MessageType
+from core.packet import FRAME_HEADER_SIZE
+from core.rollout import STAGE_COMPLETED, STAGE_FAILED, STAGE_IN_PROGRESS, STAGE_STARTED
+from .profiles import LatencyProfile, PROFILES
+
+MODELS = ("Quest 2", "Quest 3", "Quest 3S", "Quest Pro")
+BASE_APPS = {"com.b3n00n.snorlax": 7, "com.oculus.browser": 3400, "com.combatica.arena": 120}
+
+DOWNLOAD_CHUNK = 256 * 1024
+PROGRESS_INTERVAL = 1.0
+
+
+@dataclass
+class SimulationConfig:
+    host: str = "127.0.0.1"
+    port: int = 8888
+    heartbeat_interval: float = 15.0
+    battery_push_interval: float = 0.0  # 0: only answer REQUEST_BATTERY
+    battery_drain: float = 8.0  # percent per hour
+    latency: LatencyProfile = field(default_factory=lambda: PROFILES['wifi'])
+    failure_rate: float = 0.0  # fraction of commands answered with success=False
+    download_rate: float = 0.0  # bytes/s per headset, 0 for unlimited
+    install_time: float = 5.0
+    drop_rate: float = 0.0  # connection drops per headset per hour
+    stall_rate: float = 0.0  # silent-but-open stalls per headset per hour
+    reconnect_delay: float = 5.0
+    serial_prefix: str = "SIM"
+    seed: Optional[int] = None
+
+
+class FleetStats:
+    def __init__(self):
+        self.connected = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.frames_in = 0
+        self.frames_out = 0
+        self.commands = 0
+        self.downloads = 0
+        self.download_failures = 0
+        self.bytes_downloaded = 0
+
+
+def split_request_id(message_type: MessageType, frame: bytes) -> Tuple[object, Optional[int]]:
+    """Decode a server command and pull off the u32 request ID it may carry."""
+    message = SCHEMAS[message_type].decode(memoryview(frame))
+    body_size = len(SCHEMAS[message_type].encode(*message))
+    if len(frame) - body_size >= U32.size:
+        return message, U32.unpack_from(frame, body_size)[0]
+    return message, None
+
+
+class VirtualHeadset:
+    """One simulated headset speaking the server protocol over TCP.
+
+    Connects, says DEVICE_CONNECTED, sends heartbeats at a random phase,
+    answers commands after a delay drawn from the latency profile (echoing
+    request IDs), and downloads APKs from the HTTP server while reporting
+    progress. Reconnects after drops, like the real client.
+    """
+
+    def __init__(self, index: int, config: SimulationConfig, stats: FleetStats):
+        self.config = config
+        self.stats = stats
+        self.rng = random.Random(None if config.seed is None else f"{config.seed}:{index}")
+        self.serial = f"{config.serial_prefix}{index:05d}"
+        self.model = self.rng.choice(MODELS)
+        self.battery = self.rng.uniform(20, 100)
+        self.charging = self.rng.random() < 0.2
+        self.installed: Dict[str, int] = dict(BASE_APPS)
+        self.volume = 50
+        self.stalled = False
+        self._battery_at = time.monotonic()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def run(self):
+        while True:
+            try:
+                await self._session()
+            except (OSError, asyncio.IncompleteReadError):
+                pass
+            finally:
+                self._close()
+            await asyncio.sleep(self.config.reconnect_delay * self.rng.uniform(0.5, 1.5))
+
+    async def _session(self):
+        reader, self._writer = await asyncio.open_connection(self.config.host, self.config.port)
+        self.stalled = False
+        self.stats.connects += 1
+        self.stats.connected += 1
+        self.send(MessageType.DEVICE_CONNECTED, self.model, self.serial)
+
+        self._spawn(self._heartbeats())
+        if self.config.battery_push_interval:
+            self._spawn(self._battery_pushes())
+        if self.config.drop_rate:
+            self._spawn(self._fault(self.config.drop_rate, stall=False))
+        if self.config.stall_rate:
+            self._spawn(self._fault(self.config.stall_rate, stall=True))
+
+        while True:
+            header = await reader.readexactly(FRAME_HEADER_SIZE)
+            payload = await reader.readexactly((header[1] << 8) | header[2])
+            self.stats.frames_in += 1
+            if not self.stalled:
+                self._spawn(self._handle(header + payload))
+
+    def _close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        if self._writer:
+            self.stats.connected -= 1
+            self.stats.disconnects += 1
+            self._writer.transport.abort()
+            self._writer = None
+
+    def _spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def send(self, message_type: MessageType, *values, request_id: Optional[int] = None):
+        if self._writer is None or self.stalled:
+            return
+        self._writer.write(encode_message(message_type, *values, request_id=request_id))
+        self.stats.frames_out += 1
+
+    def respond(self, success: bool, message: str, request_id: Optional[int]):
+        if success and self.config.failure_rate and self.rng.random() < self.config.failure_rate:
+            success, message = False, "Simulated failure"
+        self.send(MessageType.COMMAND_RESPONSE, success, message, request_id=request_id)
+
+    async def _heartbeats(self):
+        interval = self.config.heartbeat_interval
+        await asyncio.sleep(self.rng.uniform(0, interval))
+        while True:
+            self.send(MessageType.HEARTBEAT)
+            await asyncio.sleep(interval)
+
+    async def _battery_pushes(self):
+        interval = self.config.battery_push_interval
+        await asyncio.sleep(self.rng.uniform(0, interval))
+        while True:
+            self._send_battery()
+            await asyncio.sleep(interval)
+
+    async def _fault(self, rate_per_hour: float, stall: bool):
+        await asyncio.sleep(self.rng.expovariate(rate_per_hour / 3600.0))
+        if stall:
+            # Socket stays open but nothing comes back, like a headset that went to sleep
+            self.stalled = True
+        elif self._writer:
+            self._writer.transport.abort()
+
+    def _send_battery(self):
+        now = time.monotonic()
+        drift = self.config.battery_drain * (now - self._battery_at) / 3600.0
+        self.battery = min(100.0, self.battery + drift) if self.charging else max(0.0, self.battery - drift)
+        self._battery_at = now
+        self.send(MessageType.BATTERY_STATUS, int(self.battery), self.charging)
+
+    async def _handle(self, frame: bytes):
+        try:
+            message_type = MessageType(frame[0])
+            message, request_id = split_request_id(message_type, frame)
+        except (ValueError, KeyError):
+            self.send(MessageType.ERROR, f"Unknown message 0x{frame[0]:02x}")
+            return
+
+        delay = self.config.latency.sample(self.rng)
+        if delay:
+            await asyncio.sleep(delay)
+        self.stats.commands += 1
+
+        if message_type == MessageType.REQUEST_BATTERY:
+            self._send_battery()
+        elif message_type == MessageType.GET_VOLUME:
+            self.send(MessageType.VOLUME_STATUS, self.volume, self.volume * 15 // 100, 15)
+        elif message_type == MessageType.SET_VOLUME:
+            self.volume = min(message.percentage, 100)
+            self.respond(True, f"Volume set to {self.volume}%", request_id)
+        elif message_type == MessageType.GET_INSTALLED_APPS:
+            apps = ",".join(f"{package}:{version}" for package, version in self.installed.items())
+            self.respond(True, apps, request_id)
+        elif message_type == MessageType.UNINSTALL_APP:
+            removed = self.installed.pop(message.package_name, None) is not None
+            self.respond(removed, "Uninstalled" if removed else "Package not installed", request_id)
+        elif message_type == MessageType.GET_DEVICE_INFO:
+            self.respond(True, f"{self.model} {self.serial}", request_id)
+        elif message_type == MessageType.PING:
+            self.respond(True, "pong", request_id)
+        elif message_type in (MessageType.INSTALL_LOCAL_APK, MessageType.DOWNLOAD_AND_INSTALL_APK):
+            await self._install(message.url, request_id)
+        elif message_type == MessageType.SHUTDOWN_DEVICE:
+            self.respond(True, f"{message.action} scheduled", request_id)
+            await asyncio.sleep(0.1)
+            if self._writer:
+                self._writer.transport.abort()
+        else:
+            self.respond(True, "OK", request_id)
+
+    async def _install(self, url: str, request_id: Optional[int]):
+        operation_id = uuid.uuid4().bytes
+        self.send(MessageType.APK_DOWNLOAD_PROGRESS, operation_id, STAGE_STARTED, 0.0)
+        try:
+            await self._download(url, operation_id)
+        except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+            self.stats.download_failures += 1
+            self.send(MessageType.APK_DOWNLOAD_PROGRESS, operation_id, STAGE_FAILED, 0.0)
+            self.respond(False, f"Download failed: {e}", request_id)
+            return
+
+        self.stats.downloads += 1
+        self.send(MessageType.APK_DOWNLOAD_PROGRESS, operation_id, STAGE_COMPLETED, 100.0)
+        self.send(MessageType.APK_INSTALL_PROGRESS, operation_id, STAGE_STARTED, 0.0)
+        steps = 4
+        for step in range(1, steps):
+            await asyncio.sleep(self.config.install_time / steps)
+            self.send(MessageType.APK_INSTALL_PROGRESS, operation_id, STAGE_IN_PROGRESS, 100.0 * step / steps)
+        await asyncio.sleep(self.config.install_time / steps)
+
+        # The real package name is inside the APK; the file name is close enough here
+        package = "sim." + url.rsplit('/', 1)[-1].rsplit('.', 1)[0]
+        self.installed[package] = self.installed.get(package, 0) + 1
+        self.send(MessageType.APK_INSTALL_PROGRESS, operation_id, STAGE_COMPLETED, 100.0)
+        self.respond(True, "Installed", request_id)
+
+    async def _download(self, url: str, operation_id: bytes):
+        parts = urlsplit(url)
+        while True:
+            reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+            try:
+                path = parts.path + (f"?{parts.query}" if parts.query else "")
+                writer.write(f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: close\r\n\r\n".encode('ascii'))
+                status, headers = await self._read_head(reader)
+
+                if status == 503:
+                    retry_after = float(headers.get('retry-after', 5))
+                    await asyncio.sleep(retry_after * self.rng.uniform(0.8, 1.2))
+                    continue
+                if status != 200:
+                    raise ValueError(f"HTTP {status}")
+
+                await self._read_body(reader, int(headers['content-length']), operation_id)
+                return
+            finally:
+                writer.transport.abort()
+
+    async def _read_head(self, reader: asyncio.StreamReader):
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode('latin-1').split("\r\n")
+        status = int(lines[0].split()[1])
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        return status, headers
+
+    async def _read_body(self, reader: asyncio.StreamReader, size: int, operation_id: bytes):
+        received = 0
+        started = last_report = time.monotonic()
+        rate = self.config.download_rate
+        while received < size:
+            chunk = await reader.read(min(DOWNLOAD_CHUNK, size - received))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b'', size - received)
+            received += len(chunk)
+            self.stats.bytes_downloaded += len(chunk)
+
+            now = time.monotonic()
+            if rate:
+                ahead = received / rate - (now - started)
+                if ahead > 0:
+                    await asyncio.sleep(ahead)
+                    now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                self.send(MessageType.APK_DOWNLOAD_PROGRESS, operation_id, STAGE_IN_PROGRESS, 100.0 * received / size)
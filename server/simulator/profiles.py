@@ -0,0 +1,31 @@
+import random
+from dataclasses import dataclass
+from typing import Dict
+
+
+@dataclass
+class LatencyProfile:
+    """How long a virtual headset takes to act on a command.
+
+    Delays are log-normal around the median, plus an occasional spike to
+    mimic Wi-Fi retries and a busy headset.
+    """
+    name: str
+    median: float
+    sigma: float = 0.0
+    spike_chance: float = 0.0
+    spike_delay: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        delay = self.median * rng.lognormvariate(0.0, self.sigma) if self.sigma else self.median
+        if self.spike_chance and rng.random() < self.spike_chance:
+            delay += self.spike_delay
+        return delay
+
+
+PROFILES: Dict[str, LatencyProfile] = {profile.name: profile for profile in (
+    LatencyProfile('instant', 0.0),
+    LatencyProfile('lan', 0.005, 0.3),
+    LatencyProfile('wifi', 0.03, 0.6, 0.01, 0.5),
+    LatencyProfile('congested', 0.15, 0.9, 0.05, 2.0),
+)}
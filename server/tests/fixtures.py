@@ -0,0 +1,75 @@
+import asyncio
+import tempfile
+
+from core.battery_poller import BatteryPoller
+from core.codec import encode_message
+from core.device import QuestDevice
+from core.liveness import LivenessMonitor
+from core.models import MessageType
+from core.server import QuestControlServer
+
+
+class FakeTransport:
+    """Accepts writes and keeps them, in place of a socket."""
+
+    def __init__(self):
+        self.written = []
+        self.closing = False
+
+    def write(self, data):
+        self.written.append(bytes(data))
+
+    def writelines(self, buffers):
+        self.written.append(b''.join(bytes(data) for data in buffers))
+
+    def is_closing(self) -> bool:
+        return self.closing
+
+    def abort(self):
+        self.closing = True
+
+    def get_extra_info(self, name, default=None):
+        return default
+
+    def get_write_buffer_size(self) -> int:
+        return 0
+
+
+class OfflineServer:
+    """A QuestControlServer wired to a loop that tests step by hand.
+
+    run_pending() runs whatever the server scheduled, so tests drive the
+    network-loop code on their own thread without sockets.
+    """
+
+    def __init__(self, device_count: int = 0):
+        self.apk_directory = tempfile.TemporaryDirectory(prefix="test-apks-")
+        self.server = QuestControlServer(host='127.0.0.1', port=0, apk_directory=self.apk_directory.name)
+        self.loop = asyncio.new_event_loop()
+        server = self.server
+        server.loop = self.loop
+        server.broadcaster.bind(self.loop)
+        server.liveness = LivenessMonitor(self.loop)
+        server.battery_poller = BatteryPoller(self.loop)
+        server.running = True
+        self.devices = [self.connect(f"TEST{index:04d}") for index in range(device_count)]
+
+    def connect(self, serial: str) -> QuestDevice:
+        device = QuestDevice(FakeTransport(), ('127.0.0.1', 0), self.loop)
+        self.server._connections.add(device)
+        self.receive(device, MessageType.DEVICE_CONNECTED, "Quest 3", serial)
+        return device
+
+    def receive(self, device: QuestDevice, message_type: MessageType, *values, request_id=None):
+        frame = encode_message(message_type, *values, request_id=request_id)
+        self.server._process_message(device, memoryview(frame))
+
+    def run_pending(self, rounds: int = 2):
+        for _ in range(rounds):
+            self.loop.call_soon(self.loop.stop)
+            self.loop.run_forever()
+
+    def close(self):
+        self.server.battery_poller.stop()
+        self.loop.close()
+        self.apk_directory.cleanup()
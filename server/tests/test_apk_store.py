@@ -0,0 +1,105 @@
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from core.apk_store import APKStore, file_sha256
+
+
+class APKStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+        self.directory = os.path.join(self.temp, "apks")
+        os.makedirs(self.directory)
+        self.store = APKStore(self.directory)
+
+    def tearDown(self):
+        self.store.stop()
+        shutil.rmtree(self.temp, ignore_errors=True)
+
+    def write(self, name: str, content: bytes) -> str:
+        path = os.path.join(self.temp, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def touch_later(self, name: str):
+        # Same-size rewrites inside one mtime tick would look unchanged
+        st = os.stat(self.path(name))
+        os.utime(self.path(name), ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    def blobs(self):
+        return [
+            os.path.join(root, name) for root, _, names in os.walk(self.store.store_directory)
+            for name in names if len(name) == 64
+        ]
+
+    def test_import_stores_identical_content_once(self):
+        source = self.write("build.apk", b"A" * 4096)
+        first = self.store.import_file(source, "a.apk")
+        second = self.store.import_file(source, "b.apk")
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.blobs()), 1)
+        self.assertEqual(self.store.list_names(), ["a.apk", "b.apk"])
+        self.assertTrue(os.path.samefile(self.path("a.apk"), self.path("b.apk")))
+        self.assertTrue(os.path.samefile(self.path("a.apk"), self.blobs()[0]))
+        self.assertFalse(os.stat(self.path("a.apk")).st_mode & stat.S_IWRITE)
+
+    def test_replaced_file_is_reindexed(self):
+        source = self.write("build.apk", b"A" * 4096)
+        old_digest = self.store.import_file(source, "a.apk")
+        self.store.import_file(source, "b.apk")
+        self.store.refresh()
+
+        os.replace(self.write("new.apk", b"B" * 4096), self.path("a.apk"))
+        self.touch_later("a.apk")
+
+        with open(self.path("b.apk"), 'rb') as f:
+            self.assertEqual(f.read(), b"A" * 4096)
+        self.assertTrue(self.store.refresh())
+        self.store.hash_pending()
+
+        self.assertEqual(self.store.get_entry("a.apk")['hash'], file_sha256(self.path("a.apk")))
+        self.assertEqual(self.store.get_entry("b.apk")['hash'], old_digest)
+        self.assertEqual(len(self.blobs()), 2)
+        for blob in self.blobs():
+            self.assertEqual(file_sha256(blob), os.path.basename(blob))
+
+    def test_forced_in_place_rewrite_rehashes_every_linked_name(self):
+        source = self.write("build.apk", b"A" * 4096)
+        self.store.import_file(source, "a.apk")
+        self.store.import_file(source, "b.apk")
+        self.store.refresh()
+
+        os.chmod(self.path("a.apk"), stat.S_IREAD | stat.S_IWRITE)
+        with open(self.path("a.apk"), 'r+b') as f:
+            f.write(b"B" * 4096)
+        self.touch_later("a.apk")
+        self.assertTrue(self.store.refresh())
+        self.store.hash_pending()
+
+        new_digest = file_sha256(self.path("a.apk"))
+        self.assertEqual(self.store.get_entry("a.apk")['hash'], new_digest)
+        self.assertEqual(self.store.get_entry("b.apk")['hash'], new_digest)
+        self.assertEqual([os.path.basename(blob) for blob in self.blobs()], [new_digest])
+        self.assertFalse(os.stat(self.path("a.apk")).st_mode & stat.S_IWRITE)
+
+    def test_dropped_file_is_adopted_and_removed(self):
+        shutil.copyfile(self.write("drop.apk", b"C" * 1024), self.path("drop.apk"))
+        self.assertTrue(self.store.refresh())
+        self.store.hash_pending()
+        self.assertEqual(self.store.get_entry("drop.apk")['hash'], file_sha256(self.path("drop.apk")))
+        self.assertEqual(len(self.blobs()), 1)
+
+        self.assertTrue(self.store.remove("drop.apk"))
+        self.assertEqual(self.store.list_names(), [])
+        self.assertEqual(self.blobs(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+
+from core.broadcast import Broadcast
+from core.models import MessageType
+from tests.fixtures import OfflineServer
+
+
+class RequestCorrelationTest(unittest.TestCase):
+    def setUp(self):
+        self.offline = OfflineServer(device_count=1)
+        self.server = self.offline.server
+        self.device = self.offline.devices[0]
+        self.serial = self.device.get_id()
+
+    def tearDown(self):
+        self.offline.close()
+
+    def send(self, message_type: MessageType = MessageType.LAUNCH_APP, command="com.example") -> Broadcast:
+        broadcast = self.server.broadcast_command(message_type, command, device_ids=[self.serial])
+        self.offline.run_pending()
+        return broadcast
+
+    def respond(self, message: str, request_id=None):
+        self.offline.receive(self.device, MessageType.COMMAND_RESPONSE, True, message, request_id=request_id)
+
+    def result(self, broadcast: Broadcast):
+        return broadcast.futures[self.serial].result(0)
+
+    def test_without_echo_resolves_oldest_first(self):
+        first = self.send()
+        second = self.send()
+
+        self.respond("first")
+        self.assertEqual(self.result(first).message, "first")
+        self.assertFalse(second.done())
+
+        self.respond("second")
+        self.assertEqual(self.result(second).message, "second")
+
+    def test_without_echo_skips_replies_to_untracked_commands(self):
+        self.device.send_volume_command(50)
+        apps = self.send(MessageType.GET_INSTALLED_APPS, "")
+        self.device.send_message(MessageType.PING)
+        launch = self.send()
+        self.offline.run_pending()
+
+        self.respond("Volume set to 50")
+        self.assertFalse(apps.done())
+
+        self.respond("com.example:1")
+        self.assertEqual(self.result(apps).message, "com.example:1")
+
+        self.respond("pong")
+        self.assertFalse(launch.done())
+
+        self.respond("launched")
+        self.assertEqual(self.result(launch).message, "launched")
+
+    def test_commands_without_a_response_are_not_awaited(self):
+        self.device.send_message(MessageType.REQUEST_BATTERY)
+        launch = self.send()
+
+        self.respond("launched")
+        self.assertEqual(self.result(launch).message, "launched")
+
+    def test_echoed_ids_match_exactly(self):
+        first = self.send()
+        second = self.send()
+
+        self.respond("second", request_id=second.request_id)
+        self.assertEqual(self.result(second).message, "second")
+        self.assertFalse(first.done())
+
+        self.respond("first", request_id=first.request_id)
+        self.assertEqual(self.result(first).message, "first")
+
+    def test_untracked_reply_is_ignored_once_ids_are_echoed(self):
+        warmup = self.send()
+        self.respond("warmup", request_id=warmup.request_id)
+        self.assertTrue(self.device.echoes_request_ids)
+
+        launch = self.send()
+        # Flushing an untracked command must not reset echo detection
+        self.device.send_volume_command(50)
+        self.offline.run_pending()
+        self.assertTrue(self.device.echoes_request_ids)
+
+        self.respond("Volume set to 50")
+        self.assertFalse(launch.done())
+
+        self.respond("launched", request_id=launch.request_id)
+        self.assertEqual(self.result(launch).message, "launched")
+
+    def test_cancelled_futures_are_dropped_quietly(self):
+        answered = self.send()
+        self.assertTrue(answered.futures[self.serial].cancel())
+        self.respond("launched")
+        self.assertEqual(self.server.broadcaster.get_in_flight_count(self.device), 0)
+
+        disconnected = self.send()
+        disconnected.futures[self.serial].cancel()
+        self.server.broadcaster.fail_all(self.device, ConnectionError("gone"))
+
+        expired = self.server.broadcaster.send(MessageType.LAUNCH_APP, ("com.example",), {self.serial: self.device}, timeout=0)
+        self.offline.run_pending()
+        expired.futures[self.serial].cancel()
+        self.offline.run_pending()
+        self.assertEqual(self.server.broadcaster.get_in_flight_count(self.device), 0)
+
+        unsent = self.server.broadcaster.send(MessageType.LAUNCH_APP, ("com.example",), {self.serial: self.device})
+        unsent.futures[self.serial].cancel()
+        self.offline.run_pending()
+        self.assertEqual(self.server.broadcaster.get_in_flight_count(self.device), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
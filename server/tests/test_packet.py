@@ -0,0 +1,54 @@
+import unittest
+
+from core.codec import encode_message
+from core.models import MessageType
+from core.packet import FrameDecoder
+
+
+def feed(decoder: FrameDecoder, data: bytes, chunk_size: int):
+    frames = []
+    for offset in range(0, len(data), chunk_size):
+        chunk = data[offset:offset + chunk_size]
+        buffer = decoder.get_buffer()
+        while len(buffer) < len(chunk):
+            # Fill what fits, let the decoder make room, then continue
+            buffer[:] = chunk[:len(buffer)]
+            decoder.buffer_updated(len(buffer))
+            frames.extend(bytes(frame) for frame in decoder.frames())
+            chunk = chunk[len(buffer):]
+            buffer = decoder.get_buffer()
+        buffer[:len(chunk)] = chunk
+        decoder.buffer_updated(len(chunk))
+        frames.extend(bytes(frame) for frame in decoder.frames())
+    return frames
+
+
+class FrameDecoderTest(unittest.TestCase):
+    def setUp(self):
+        self.frames = [
+            encode_message(MessageType.DEVICE_CONNECTED, "Quest 3", "SERIAL1"),
+            encode_message(MessageType.HEARTBEAT),
+            encode_message(MessageType.COMMAND_RESPONSE, True, "x" * 5000, request_id=7),
+            encode_message(MessageType.BATTERY_STATUS, 80, True),
+        ]
+        self.stream = b''.join(self.frames)
+
+    def test_coalesced_read(self):
+        self.assertEqual(feed(FrameDecoder(), self.stream, len(self.stream)), self.frames)
+
+    def test_split_reads(self):
+        for chunk_size in (1, 2, 3, 7, 100):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(feed(FrameDecoder(), self.stream, chunk_size), self.frames)
+
+    def test_frame_larger_than_buffer(self):
+        self.assertEqual(feed(FrameDecoder(capacity=64), self.stream, 1000), self.frames)
+
+    def test_partial_frame_is_held_back(self):
+        decoder = FrameDecoder()
+        self.assertEqual(feed(decoder, self.frames[0][:-1], 1000), [])
+        self.assertEqual(feed(decoder, self.frames[0][-1:], 1000), [self.frames[0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
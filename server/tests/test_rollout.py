@@ -0,0 +1,98 @@
+import threading
+import unittest
+
+from config.settings import Config
+from core.models import MessageType
+from core.rollout import DONE, DOWNLOADING, FAILED, PENDING
+from tests.fixtures import OfflineServer
+from utils.event_bus import Dispatcher, EventType, event_bus
+
+
+class RolloutTest(unittest.TestCase):
+    def setUp(self):
+        self.window = Config.ROLLOUT_INITIAL_WINDOW
+        Config.ROLLOUT_INITIAL_WINDOW = 1
+        self.offline = OfflineServer(device_count=3)
+        self.server = self.offline.server
+        self.serials = [device.get_id() for device in self.offline.devices]
+        self.snapshots = []
+        self.dispatcher = Dispatcher("test")
+        event_bus.subscribe(EventType.ROLLOUT_UPDATED, self.snapshots.append, self.dispatcher)
+        snapshot = self.server.rollouts.start("app.apk", "http://127.0.0.1/app.apk", 1000, self.serials)
+        self.offline.run_pending()
+        self.rollout = self.server.rollouts.rollouts[snapshot.rollout_id]
+
+    def tearDown(self):
+        event_bus.unsubscribe(EventType.ROLLOUT_UPDATED, self.snapshots.append)
+        Config.ROLLOUT_INITIAL_WINDOW = self.window
+        self.offline.close()
+
+    def states(self):
+        return [self.rollout.devices[serial].state for serial in self.serials]
+
+    def disconnect(self, device):
+        # Run off the test thread so a deadlock fails the test instead of hanging it
+        thread = threading.Thread(target=self.server._on_connection_lost, args=(device,), daemon=True)
+        thread.start()
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive(), "disconnect deadlocked")
+        self.offline.run_pending()
+
+    def respond(self, device, success: bool, message: str):
+        self.offline.receive(device, MessageType.COMMAND_RESPONSE, success, message)
+        self.offline.run_pending()
+
+    def test_install_is_a_tracked_command(self):
+        self.assertEqual(self.server.broadcaster.get_in_flight_count(self.offline.devices[0]), 1)
+
+    def test_disconnect_moves_the_window_on(self):
+        self.assertEqual(self.states(), [DOWNLOADING, PENDING, PENDING])
+
+        self.disconnect(self.offline.devices[0])
+        self.assertEqual(self.states(), [FAILED, DOWNLOADING, PENDING])
+        self.assertEqual(self.rollout.devices[self.serials[0]].error, "Device disconnected")
+
+        for device in self.offline.devices[1:]:
+            self.disconnect(device)
+        self.assertEqual(self.states(), [FAILED, FAILED, FAILED])
+        self.assertTrue(self.rollout.done())
+        self.assertNotIn(self.rollout.rollout_id, self.server.rollouts.rollouts)
+
+    def test_failed_install_response_frees_the_slot(self):
+        self.respond(self.offline.devices[0], False, "INSTALL_FAILED_INSUFFICIENT_STORAGE")
+        self.assertEqual(self.states(), [FAILED, DOWNLOADING, PENDING])
+        self.assertEqual(self.rollout.devices[self.serials[0]].error, "INSTALL_FAILED_INSUFFICIENT_STORAGE")
+
+    def test_successful_install_response_finishes_the_device(self):
+        for device in self.offline.devices:
+            self.respond(device, True, "Installed")
+        self.assertEqual(self.states(), [DONE, DONE, DONE])
+        self.assertTrue(self.rollout.done())
+
+    def test_updates_carry_a_snapshot(self):
+        self.respond(self.offline.devices[0], False, "INSTALL_FAILED_INSUFFICIENT_STORAGE")
+        self.dispatcher.drain()
+        snapshot = self.snapshots[-1]
+        self.assertEqual(self.dispatcher.pending_count(), 0)
+
+        self.respond(self.offline.devices[1], True, "Installed")
+        self.assertEqual((snapshot.failed, snapshot.done, snapshot.downloading), (1, 0, 1))
+        self.assertEqual([(result.device_id, result.error) for result in snapshot.results],
+                         [(self.serials[0], "INSTALL_FAILED_INSUFFICIENT_STORAGE")])
+        self.assertEqual([device_id for device_id, _ in snapshot.download_etas], [self.serials[1]])
+
+        self.respond(self.offline.devices[2], True, "Installed")
+        self.dispatcher.drain()
+        self.assertTrue(self.snapshots[-1].finished)
+        self.assertEqual([result.state for result in self.snapshots[-1].results], [FAILED, DONE, DONE])
+        self.assertEqual(self.server.rollouts.get_active_rollouts(), [])
+
+    def test_tick_survives_a_failing_rollout(self):
+        self.rollout.devices = None
+        with self.assertLogs("quest_control", "ERROR"):
+            self.server.rollouts._tick()
+        self.assertIsNotNone(self.server.rollouts._tick_handle)
+
+
+if __name__ == '__main__':
+    unittest.main()
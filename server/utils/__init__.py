@@ -1,13 +1,20 @@
-from .event_bus import EventBus, EventType, event_bus
+from .event_bus import EventBus, EventType, Dispatcher, event_bus
 from .logger import logger, setup_logger
+from .metrics import Registry, metrics
+from .profiler import SamplingProfiler, profiler
 from .device_names import DeviceNameManager, device_name_manager
 
 __all__ = [
     'EventBus',
     'EventType',
+    'Dispatcher',
     'event_bus',
     'logger',
     'setup_logger',
+    'Registry',
+    'metrics',
+    'SamplingProfiler',
+    'profiler',
     'DeviceNameManager',
     'device_name_manager'
 ]
\ No newline at end of file
@@ -1,12 +1,31 @@
+import atexit
 import json
 import os
+import threading
 from typing import Dict, Optional
 
+from config.settings import Config
+from .event_bus import event_bus, EventType
+from .logger import logger
 
-class DeviceNameManager:    
-    def __init__(self, filename: str = "device_names.json"):
+
+class DeviceNameManager:
+    """Custom device names, persisted to a JSON file.
+    
+    Changes apply in memory right away and are written out in one batch
+    after save_delay seconds, so renaming a whole fleet costs one write.
+    Writes go to a temporary file that replaces the real one, so a crash
+    mid-save never leaves a truncated file behind.
+    """
+    
+    def __init__(self, filename: str = Config.DEVICE_NAMES_FILE, save_delay: float = Config.DEVICE_NAMES_SAVE_DELAY):
         self.filename = filename
+        self.save_delay = save_delay
         self.names: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # one writer at a time, so an older snapshot can't land last
+        self._save_timer: Optional[threading.Timer] = None
+        self._dirty = False
         self.load()
     
     def load(self):
@@ -15,32 +34,86 @@ class DeviceNameManager:
                 with open(self.filename, 'r') as f:
                     self.names = json.load(f)
             except Exception as e:
-                print(f"Error loading device names: {e}")
+                logger.error("Error loading device names: %s", e)
                 self.names = {}
     
     def save(self):
-        try:
-            with open(self.filename, 'w') as f:
-                json.dump(self.names, f, indent=2)
-        except Exception as e:
-            print(f"Error saving device names: {e}")
+        with self._write_lock:
+            with self._lock:
+                if self._save_timer:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                self._dirty = False
+                data = json.dumps(self.names, indent=2)
+            
+            temp_path = f"{self.filename}.tmp"
+            try:
+                with open(temp_path, 'w') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.filename)
+            except Exception as e:
+                logger.error("Error saving device names: %s", e)
+                with self._lock:
+                    self._dirty = True
+    
+    def flush(self):
+        """Write pending changes now; called on shutdown."""
+        if self._dirty:
+            self.save()
+    
+    def _schedule_save(self):
+        self._dirty = True
+        if self.save_delay <= 0:
+            self._save_timer = None
+            return True
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.name = "device-names"
+            self._save_timer.daemon = True
+            self._save_timer.start()
+        return False
     
     def get_name(self, serial: str) -> Optional[str]:
         return self.names.get(serial)
     
+    def set_names(self, names: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+        """Apply serial -> name changes at once; empty names remove the entry.
+        
+        Emits a single DEVICE_NAME_CHANGED with the serials that actually
+        changed and returns them.
+        """
+        changes: Dict[str, Optional[str]] = {}
+        save_now = False
+        with self._lock:
+            for serial, name in names.items():
+                name = (name or "").strip() or None
+                if self.names.get(serial) == name:
+                    continue
+                if name:
+                    self.names[serial] = name
+                else:
+                    del self.names[serial]
+                changes[serial] = name
+            if changes:
+                save_now = self._schedule_save()
+        
+        if save_now:
+            self.save()
+        if changes:
+            event_bus.emit(EventType.DEVICE_NAME_CHANGED, {'names': changes})
+        return changes
+    
     def set_name(self, serial: str, name: str):
-        if name.strip():
-            self.names[serial] = name.strip()
-        else:
-            self.names.pop(serial, None)
-        self.save()
+        self.set_names({serial: name})
     
     def remove_name(self, serial: str):
-        self.names.pop(serial, None)
-        self.save()
+        self.set_names({serial: None})
     
     def get_all_names(self) -> Dict[str, str]:
         return self.names.copy()
 
 
-device_name_manager = DeviceNameManager()
\ No newline at end of file
+device_name_manager = DeviceNameManager()
+atexit.register(device_name_manager.flush)
@@ -1,6 +1,12 @@
-from typing import Dict, List, Callable, Any
+from typing import Dict, Callable, Any, Optional, Tuple
+from collections import OrderedDict
 from enum import Enum, auto
+import itertools
 import threading
+import time
+
+from .logger import logger
+from .metrics import metrics
 
 class EventType(Enum):
     DEVICE_CONNECTED = auto()
@@ -12,32 +18,117 @@ class EventType(Enum):
     ERROR_OCCURRED = auto()
     SERVER_STARTED = auto()
     SERVER_STOPPED = auto()
+    ROLLOUT_UPDATED = auto()
+
+
+# Only the latest state matters for these, so pending deliveries for the
+# same subscriber and device are replaced instead of queued
+COALESCED_EVENTS = {EventType.DEVICE_UPDATED, EventType.BATTERY_UPDATED, EventType.ROLLOUT_UPDATED}
+
+DISPATCH_SECONDS = metrics.histogram(
+    "quest_event_dispatch_seconds", "Delay between emitting an event and its handler running", ("dispatcher",),
+    max_seconds=60.0
+)
+
+
+class Dispatcher:
+    """Pending deliveries for a group of subscribers, run by drain().
+
+    The GUI owns one of these and drains it once per frame, so handlers
+    that touch widgets always run on the GUI thread.
+    """
+
+    def __init__(self, name: str = "gui"):
+        self.name = name
+        self._pending: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._latency = DISPATCH_SECONDS.labels(name)
+
+    def put(self, event_type: EventType, callback: Callable, data: Any):
+        if event_type in COALESCED_EVENTS and data is not None:
+            key = (callback, event_type, data)
+        else:
+            key = next(self._sequence)
+
+        now = time.perf_counter_ns()
+        with self._lock:
+            # A coalesced delivery keeps the time it was first queued
+            pending = self._pending.get(key)
+            self._pending[key] = (callback, data, pending[2] if pending else now)
+        self._notify()
+
+    def post(self, callback: Callable, data: Any = None):
+        now = time.perf_counter_ns()
+        with self._lock:
+            self._pending[next(self._sequence)] = (callback, data, now)
+        self._notify()
+
+    def _notify(self):
+        pass
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def drain(self) -> int:
+        with self._lock:
+            if not self._pending:
+                return 0
+            items = list(self._pending.values())
+            self._pending.clear()
+
+        latency = self._latency
+        for callback, data, queued_at in items:
+            latency.record(time.perf_counter_ns() - queued_at)
+            try:
+                callback(data)
+            except Exception as e:
+                logger.exception("Error in event handler: %s", e)
+        return len(items)
+
+
+class ThreadDispatcher(Dispatcher):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _notify(self):
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self.drain()
 
 
 class EventBus:
     def __init__(self):
-        self._subscribers: Dict[EventType, List[Callable]] = {}
+        self._subscribers: Dict[EventType, Tuple[Tuple[Callable, Dispatcher], ...]] = {}
         self._lock = threading.Lock()
-    
-    def subscribe(self, event_type: EventType, callback: Callable):
+        self.gui_dispatcher = Dispatcher("gui")
+        self._default_dispatcher: Optional[ThreadDispatcher] = None
+
+    def subscribe(self, event_type: EventType, callback: Callable, dispatcher: Optional[Dispatcher] = None):
         with self._lock:
-            if event_type not in self._subscribers:
-                self._subscribers[event_type] = []
-            self._subscribers[event_type].append(callback)
-    
+            if dispatcher is None:
+                if self._default_dispatcher is None:
+                    self._default_dispatcher = ThreadDispatcher("event-dispatch")
+                dispatcher = self._default_dispatcher
+            self._subscribers[event_type] = self._subscribers.get(event_type, ()) + ((callback, dispatcher),)
+
     def unsubscribe(self, event_type: EventType, callback: Callable):
         with self._lock:
             if event_type in self._subscribers:
-                self._subscribers[event_type].remove(callback)
-    
+                self._subscribers[event_type] = tuple(
+                    entry for entry in self._subscribers[event_type] if entry[0] != callback
+                )
+
     def emit(self, event_type: EventType, data: Any = None):
-        with self._lock:
-            if event_type in self._subscribers:
-                for callback in self._subscribers[event_type]:
-                    try:
-                        callback(data)
-                    except Exception as e:
-                        print(f"Error in event handler: {e}")
+        for callback, dispatcher in self._subscribers.get(event_type, ()):
+            dispatcher.put(event_type, callback, data)
 
 
-event_bus = EventBus()
\ No newline at end of file
+event_bus = EventBus()
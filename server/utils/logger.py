@@ -1,28 +1,92 @@
+import atexit
+import json
 import logging
+import queue
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict
+
 from config.settings import Config
 
+_listeners: Dict[str, QueueListener] = {}
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queues the record as is, so formatting happens on the listener thread.
+
+    The stock QueueHandler formats in the calling thread to make records
+    safe to pickle; these never leave the process. Arguments are rendered
+    when the record is written, so log values rather than objects that are
+    about to change.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'where': f"{record.module}.{record.funcName}:{record.lineno}",
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
 
 def setup_logger(name: str = "quest_control") -> logging.Logger:
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, Config.LOG_LEVEL))
+    logger.propagate = False
     
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
+    previous = _listeners.pop(name, None)
+    if previous:
+        previous.stop()
     
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     console_handler.setFormatter(console_format)
-    logger.addHandler(console_handler)
     
-    file_handler = logging.FileHandler(Config.LOG_FILE)
+    file_handler = RotatingFileHandler(
+        Config.LOG_FILE, maxBytes=Config.LOG_MAX_BYTES, backupCount=Config.LOG_BACKUP_COUNT,
+        encoding='utf-8', delay=True
+    )
     file_handler.setLevel(logging.DEBUG)
     file_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s')
     file_handler.setFormatter(file_format)
-    logger.addHandler(file_handler)
+    
+    json_handler = RotatingFileHandler(
+        Config.LOG_JSON_FILE, maxBytes=Config.LOG_MAX_BYTES, backupCount=Config.LOG_BACKUP_COUNT,
+        encoding='utf-8', delay=True
+    )
+    json_handler.setLevel(logging.DEBUG)
+    json_handler.setFormatter(JsonLinesFormatter())
+    
+    # Callers only enqueue; console and disk writes happen on the listener thread
+    records = queue.SimpleQueue()
+    logger.addHandler(_DeferredQueueHandler(records))
+    listener = QueueListener(records, console_handler, file_handler, json_handler, respect_handler_level=True)
+    listener.start()
+    _listeners[name] = listener
     
     return logger
 
 
-logger = setup_logger()
\ No newline at end of file
+def shutdown_logging():
+    """Flush queued records and stop the listener threads."""
+    for listener in list(_listeners.values()):
+        listener.stop()
+    _listeners.clear()
+
+
+atexit.register(shutdown_logging)
+
+logger = setup_logger()
@@ -0,0 +1,279 @@
+import threading
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# HDR histogram layout: values below 2**SUB_BUCKET_BITS are counted exactly,
+# larger ones in 2**(SUB_BUCKET_BITS - 1) linear steps per power of two,
+# so any recorded value is off by less than 1 / 64
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self.labels()
+
+    def labels(self, *values) -> object:
+        """Child metric for one label combination; keep it around on hot paths."""
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _default(self):
+        return self.labels()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class _CounterChild:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    # Counters are bumped from the loop, the HTTP threads and the GUI; += alone can lose updates
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ('value', 'function', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self.function: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        self.value = value
+
+    # Locked, since a lost update would leave the gauge off for good
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from function at scrape time instead."""
+        self.function = function
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def dec(self, amount=1):
+        self._default().dec(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        self._default().set_function(function)
+
+    def _render_child(self, values, child) -> List[str]:
+        value = child.value
+        if child.function is not None:
+            try:
+                value = child.function()
+            except Exception:
+                return []
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"]
+
+
+class HdrHistogram:
+    """Log-linear histogram of non-negative integers with bounded relative error.
+
+    Recording is an index computation and one array increment, so it is
+    cheap enough for per-message paths. Counts are not locked: a
+    concurrent increment can very rarely be lost, which is fine here.
+    """
+
+    def __init__(self, max_value: int):
+        self.max_value = max_value
+        self.counts = array('Q', [0]) * (self._index(max_value) + 1)
+        self.total = 0
+        self.count = 0
+
+    @staticmethod
+    def _index(value: int) -> int:
+        if value < SUB_BUCKET_COUNT:
+            return value
+        shift = value.bit_length() - SUB_BUCKET_BITS
+        return shift * SUB_BUCKET_HALF + (value >> shift)
+
+    @staticmethod
+    def _upper_bound(index: int) -> int:
+        """Largest value counted in bucket index."""
+        if index < SUB_BUCKET_COUNT:
+            return index
+        shift = index // SUB_BUCKET_HALF - 1
+        return ((index - shift * SUB_BUCKET_HALF + 1) << shift) - 1
+
+    def record(self, value: int):
+        if value < 0:
+            value = 0
+        elif value > self.max_value:
+            value = self.max_value
+        self.counts[self._index(value)] += 1
+        self.total += value
+        self.count += 1
+
+    def percentile(self, percentile: float) -> int:
+        if not self.count:
+            return 0
+        target = max(1, round(self.count * percentile / 100.0))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self._upper_bound(index)
+        return self.max_value
+
+    def cumulative(self, bounds: Iterable[int]) -> List[int]:
+        """Number of recorded values <= each bound, for ascending bounds."""
+        result = []
+        counts = self.counts
+        seen = 0
+        index = 0
+        for bound in bounds:
+            last = min(self._index(min(bound, self.max_value)), len(counts) - 1)
+            # Only whole buckets that end at or below the bound count
+            if self._upper_bound(last) > bound:
+                last -= 1
+            while index <= last:
+                seen += counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+
+class Histogram(Metric):
+    """Latency histogram in seconds, recorded in integer nanoseconds.
+
+    Exported with power-of-two nanosecond bucket bounds from 1us up to
+    max_seconds, which line up exactly with HDR bucket edges.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), max_seconds: float = 3600.0):
+        self.max_value = int(max_seconds * 1e9)
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return HdrHistogram(self.max_value)
+
+    def observe_ns(self, nanoseconds: int):
+        self._default().record(nanoseconds)
+
+    def _render_child(self, values, child: HdrHistogram) -> List[str]:
+        labels = _format_labels(self.labelnames, values)
+        bounds = []
+        bound = 1 << 10
+        while True:
+            bounds.append(bound - 1)
+            if bound > self.max_value:
+                break
+            bound <<= 1
+
+        lines = []
+        for bound, count in zip(bounds, child.cumulative(bounds)):
+            le = _format_labels(self.labelnames, values, f'le="{(bound + 1) / 1e9:.9g}"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+        infinity = _format_labels(self.labelnames, values, 'le="+Inf"')
+        lines.append(f"{self.name}_bucket{infinity} {child.count}")
+        lines.append(f"{self.name}_sum{labels} {child.total / 1e9:.9g}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), max_seconds: float = 3600.0) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, max_seconds))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = Registry()
@@ -0,0 +1,175 @@
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config.settings import Config
+from .logger import logger
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler for every thread in the process.
+
+    A background thread snapshots sys._current_frames() every interval and
+    counts identical stacks, so the cost is one stack walk per thread per
+    sample and nothing at all while it is off. When the window ends (or
+    stop() is called) the counts are written as a collapsed-stack file for
+    flamegraph.pl and a speedscope JSON file.
+    """
+
+    def __init__(self, interval: float = Config.PROFILER_INTERVAL, output_dir: str = Config.PROFILER_DIRECTORY):
+        self.interval = interval
+        self.output_dir = output_dir
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[List[str]], None]] = []
+        self._toggle_requested = threading.Event()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_listener(self, callback: Callable[[List[str]], None]):
+        """Called from the profiler thread with the written paths."""
+        self._callbacks.append(callback)
+
+    def start(self, duration: float = Config.PROFILER_DURATION) -> bool:
+        with self._lock:
+            if self.is_running():
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(duration,), name="profiler", daemon=True)
+            self._thread.start()
+        logger.info("Profiling all threads for %.0fs", duration)
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def toggle(self, duration: float = Config.PROFILER_DURATION):
+        if self.is_running():
+            self.stop()
+        else:
+            self.start(duration)
+
+    def install_signal_handler(self, signum: Optional[int] = getattr(signal, 'SIGUSR1', None)):
+        """Toggle profiling on signum (SIGUSR1 by default; unavailable on Windows).
+
+        The handler only raises a flag; the owner of the main loop calls
+        poll_signal() to act on it. Toggling inside the handler could
+        deadlock on _lock if the signal interrupts start() on that thread.
+        """
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return
+        signal.signal(signum, lambda *_: self._toggle_requested.set())
+
+    def poll_signal(self):
+        if self._toggle_requested.is_set():
+            self._toggle_requested.clear()
+            self.toggle()
+
+    def _run(self, duration: float):
+        stacks: Counter = Counter()
+        own_id = threading.get_ident()
+        started = time.perf_counter()
+        deadline = started + duration
+        samples = 0
+
+        while not self._stop.is_set():
+            sample_start = time.perf_counter()
+            if sample_start >= deadline:
+                break
+
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                depth = 0
+                while frame is not None and depth < Config.PROFILER_MAX_DEPTH:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                    depth += 1
+                stacks[(names.get(thread_id, str(thread_id)), tuple(reversed(stack)))] += 1
+            samples += 1
+
+            self._stop.wait(max(0.0, self.interval - (time.perf_counter() - sample_start)))
+
+        elapsed = time.perf_counter() - started
+        try:
+            paths = self._write(stacks, samples, elapsed)
+        except OSError as e:
+            logger.error("Failed to write profile: %s", e)
+            return
+
+        logger.info("Profile of %s samples over %.1fs written to %s", samples, elapsed, paths[0])
+        for callback in self._callbacks:
+            try:
+                callback(paths)
+            except Exception as e:
+                logger.error("Error in profiler listener: %s", e)
+
+    def _write(self, stacks: Counter, samples: int, elapsed: float) -> List[str]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"profile-{datetime.now():%Y%m%d-%H%M%S}")
+
+        collapsed_path = base + ".collapsed"
+        with open(collapsed_path, 'w', encoding='utf-8') as f:
+            for (thread_name, stack), count in stacks.most_common():
+                frames = [thread_name.replace(';', ':')] + [_frame_name(code).replace(';', ':') for code in stack]
+                f.write(f"{';'.join(frames)} {count}\n")
+
+        speedscope_path = base + ".speedscope.json"
+        with open(speedscope_path, 'w', encoding='utf-8') as f:
+            json.dump(_speedscope(stacks, self.interval, elapsed, samples), f)
+
+        return [collapsed_path, speedscope_path]
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _speedscope(stacks: Counter, interval: float, elapsed: float, samples: int) -> dict:
+    frames: List[dict] = []
+    frame_index: Dict[object, int] = {}
+    by_thread: Dict[str, List[Tuple[List[int], int]]] = {}
+
+    for (thread_name, stack), count in stacks.items():
+        indices = []
+        for code in stack:
+            index = frame_index.get(code)
+            if index is None:
+                index = frame_index[code] = len(frames)
+                frames.append({'name': code.co_name, 'file': code.co_filename, 'line': code.co_firstlineno})
+            indices.append(index)
+        by_thread.setdefault(thread_name, []).append((indices, count))
+
+    profiles = []
+    for thread_name, entries in sorted(by_thread.items()):
+        total = sum(count for _, count in entries) * interval * 1000
+        profiles.append({
+            'type': 'sampled',
+            'name': thread_name,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': total,
+            'samples': [indices for indices, _ in entries],
+            'weights': [count * interval * 1000 for _, count in entries],
+        })
+
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': f"{Config.APP_NAME} ({samples} samples over {elapsed:.1f}s)",
+        'exporter': f"{Config.APP_NAME} {Config.APP_VERSION}",
+        'shared': {'frames': frames},
+        'profiles': profiles,
+    }
+
+
+profiler = SamplingProfiler()